@@ -0,0 +1,260 @@
+import os
+import zlib
+import zipfile
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+from apk_utils.file import File, AndroidManifest
+from apk_utils.dexFile import DalvikVMFormat
+from apk_utils.arsc import ResourceTable
+from apk_utils.options import record
+
+LOCAL_FILE_HEADER_MAGIC = 0x04034b50
+
+LOCAL_FILE_HEADER = record("LOCAL_FILE_HEADER", [
+    ("signature", "I"),
+    ("version", "H"),
+    ("flags", "H"),
+    ("compression", "H"),
+    ("modTime", "H"),
+    ("modDate", "H"),
+    ("crc32", "I"),
+    ("compressedSize", "I"),
+    ("uncompressedSize", "I"),
+    ("nameLength", "H"),
+    ("extraLength", "H"),
+])
+
+class APK:
+    """
+        A lazy view over an APK archive
+
+        Entries are only decompressed when they are requested, nothing is
+        written to disk unless `extract` is called.
+
+        :param fileInfo: the APK itself
+        :type fileInfo: :class:`File`
+    """
+    def __init__(self, fileInfo):
+        self.__fileInfo = fileInfo
+        self.__resources = None
+        self.__zip = zipfile.ZipFile(fileInfo.getFilePath(), 'r')
+        self.__entries = dict((info.filename, info) for info in self.__zip.infolist())
+
+    def getFileInfo(self):
+        return self.__fileInfo
+
+    def getFiles(self):
+        """
+            Return the names of every entry of the archive
+
+            :rtype: a list of string
+        """
+        return list(self.__entries)
+
+    def getDexNames(self):
+        """
+            Return the names of the dex files at the root of the archive
+            (classes.dex, classes2.dex, ...)
+
+            :rtype: a list of string
+        """
+        return sorted((name for name in self.__entries
+                       if name.startswith("classes") and name.endswith(".dex") and "/" not in name),
+                      key=lambda name: (len(name), name))
+
+    def getInfo(self, name):
+        """
+            Return the zip header of an entry
+
+            :rtype: :class:`zipfile.ZipInfo`
+        """
+        return self.__entries[name]
+
+    def hasFile(self, name):
+        return name in self.__entries
+
+    def isStored(self, name):
+        return self.__entries[name].compress_type == zipfile.ZIP_STORED
+
+    def getBuffer(self, name):
+        """
+            Return the content of an entry
+
+            A STORED entry is served as a memoryview over the APK buffer
+            (the mapping when the APK is mapped), only compressed entries
+            are read through zipfile.
+
+            :rtype: memoryview or bytes
+        """
+        info = self.__entries[name]
+        if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+            view = self.__getStoredView(info)
+            if view is not None:
+                return view
+        return self.__zip.read(info)
+
+    def __getStoredView(self, info):
+        rawBinary = self.__fileInfo.getRawBinary()
+        if rawBinary is None:
+            return None
+
+        rawBinary = memoryview(rawBinary)
+        if info.header_offset + LOCAL_FILE_HEADER._size > len(rawBinary):
+            return None
+
+        header = LOCAL_FILE_HEADER._unpack_from(rawBinary, info.header_offset)
+        if header.signature != LOCAL_FILE_HEADER_MAGIC:
+            return None
+
+        # the local header may carry a different extra field than the central directory
+        start = info.header_offset + LOCAL_FILE_HEADER._size + header.nameLength + header.extraLength
+        end = start + info.file_size
+        if end > len(rawBinary):
+            return None
+        return rawBinary[start:end]
+
+    def openStream(self, name):
+        """
+            Return a file-like object which decompresses the entry as it is read
+        """
+        return self.__zip.open(self.__entries[name], 'r')
+
+    def getFile(self, name):
+        """
+            Return an entry as a :class:`File`
+
+            :rtype: :class:`File`
+        """
+        return File(name, rawBinary=self.getBuffer(name))
+
+    def getAndroidManifest(self, budget=None):
+        return AndroidManifest(self.getFile("AndroidManifest.xml"), budget)
+
+    def getManifestSummary(self, components=True, budget=None):
+        """
+            Return the package, versions, sdk levels, permissions and exported
+            components without decoding the whole manifest
+
+            :param budget: the limits of the parse, see :class:`ParseBudget`
+
+            :rtype: :class:`ManifestSummary`
+        """
+        return self.getAndroidManifest(budget).summarize(components)
+
+    def getResources(self, budget=None):
+        """
+            Return the resource table (resources.arsc), indexed on the first call
+
+            :param budget: the limits of the parse, see :class:`ParseBudget`
+
+            :rtype: :class:`ResourceTable` or None
+        """
+        if self.__resources is None and self.hasFile("resources.arsc"):
+            self.__resources = ResourceTable(self.getFile("resources.arsc"), budget)
+        return self.__resources
+
+    def getDalvikVMFormat(self, name="classes.dex"):
+        return DalvikVMFormat(self.getFile(name))
+
+    def extract(self, outDir, names=None, include=None, exclude=None, maxSize=None, workers=None, skipUnchanged=True):
+        """
+            Write entries (every entry by default) under outDir
+
+            Entries are decompressed on a thread pool, zlib releases the GIL
+            so this scales with the number of cores. The CRC of the files
+            already present is checked on the same pool.
+
+            :param outDir: the destination directory
+            :type outDir: string
+            :param names: the entries to extract
+            :type names: a list of string
+            :param include: glob patterns, only matching entries are extracted
+            :type include: a list of string
+            :param exclude: glob patterns, matching entries are skipped
+            :type exclude: a list of string
+            :param maxSize: budget in bytes for the total uncompressed size of the entries to write, checked before anything is written
+            :type maxSize: int
+            :param workers: number of threads (os.cpu_count() by default)
+            :type workers: int
+            :param skipUnchanged: don't rewrite files already present with the same size and CRC
+            :type skipUnchanged: bool
+
+            :rtype: a list of the extracted entries
+        """
+        if names is None:
+            names = self.getFiles()
+
+        infos = [self.__entries[name] for name in names
+                 if self.__isSelected(name, include, exclude)]
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        pool = None
+        if workers > 1 and len(infos) > 1:
+            pool = ThreadPoolExecutor(max_workers=workers)
+        mapper = map if pool is None else pool.map
+
+        try:
+            # hashing the files already there costs as much as extracting
+            # them, it runs on the pool too
+            if skipUnchanged:
+                unchanged = list(mapper(lambda info: not info.is_dir() and
+                                        self.__isUnchanged(info, self.__getTargetPath(info, outDir)), infos))
+                infos = [info for info, skip in zip(infos, unchanged) if not skip]
+
+            # only what will actually be written counts against the budget
+            if maxSize is not None:
+                totalSize = sum(info.file_size for info in infos)
+                if totalSize > maxSize:
+                    raise ValueError("extracting %d bytes exceeds the budget of %d bytes" % (totalSize, maxSize))
+
+            # create the tree up front, the workers would race on it otherwise
+            for info in infos:
+                target = self.__getTargetPath(info, outDir)
+                directory = target if info.is_dir() else os.path.dirname(target)
+                if not os.path.isdir(directory):
+                    os.makedirs(directory, exist_ok=True)
+
+            for _ in mapper(lambda info: self.__zip.extract(info, outDir), infos):
+                pass
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        return [info.filename for info in infos]
+
+    @staticmethod
+    def __isSelected(name, include, exclude):
+        if include and not any(fnmatch.fnmatchcase(name, pattern) for pattern in include):
+            return False
+        if exclude and any(fnmatch.fnmatchcase(name, pattern) for pattern in exclude):
+            return False
+        return True
+
+    @staticmethod
+    def __getTargetPath(info, outDir):
+        # same sanitizing as zipfile.ZipFile.extract
+        arcname = info.filename.replace('/', os.path.sep)
+        if os.path.altsep:
+            arcname = arcname.replace(os.path.altsep, os.path.sep)
+        arcname = os.path.splitdrive(arcname)[1]
+        parts = [x for x in arcname.split(os.path.sep) if x not in ('', os.path.curdir, os.path.pardir)]
+        return os.path.join(outDir, *parts)
+
+    @staticmethod
+    def __isUnchanged(info, target):
+        if not os.path.isfile(target) or os.path.getsize(target) != info.file_size:
+            return False
+
+        crc = 0
+        with open(target, "rb") as fd:
+            while True:
+                chunk = fd.read(1 << 20)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+        return crc == info.CRC
+
+    def close(self):
+        self.__zip.close()
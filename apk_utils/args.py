@@ -27,6 +27,7 @@ class Args:
         parser.add_argument("-a", "--androidmanifest", action="store_true",           help="AndroidManifest")
         parser.add_argument("-d", "--dex",          type=str, metavar="dex file",       help="Dex file")
         parser.add_argument("-o", "--out",          type=str, metavar="<out dir>",      help="output dir-name")
+        parser.add_argument("-m", "--mmap",         action="store_true",                help="map the input file instead of reading it")
 
         self.__args = parser.parse_args(arguments)
 
@@ -56,6 +57,11 @@ class Args:
         else:
             self.result["dex"] = False
 
+        if self.__args.mmap:
+            self.result["mmap"] = True
+        else:
+            self.result["mmap"] = False
+
     def getResult(self):
         return self.result
 
@@ -0,0 +1,425 @@
+import struct
+import sys
+from bisect import bisect_left
+from array import array
+from collections import namedtuple
+from apk_utils.options import record
+from apk_utils.file import AndroidManifest, StringPool, ParseError, STRING_CHUNK, decodeValue
+
+RES_STRING_POOL_TYPE    = 0x0001
+RES_TABLE_TYPE          = 0x0002
+RES_TABLE_PACKAGE_TYPE  = 0x0200
+RES_TABLE_TYPE_TYPE     = 0x0201
+RES_TABLE_TYPE_SPEC_TYPE = 0x0202
+RES_TABLE_LIBRARY_TYPE  = 0x0203
+
+NO_ENTRY   = 0xffffffff
+NO_ENTRY16 = 0xffff
+
+# flags of a type chunk and of an entry
+FLAG_SPARSE   = 0x01
+FLAG_OFFSET16 = 0x02
+FLAG_COMPLEX  = 0x0001
+FLAG_COMPACT  = 0x0008
+
+TABLE_HEADER = record("TABLE_HEADER", [
+    ("type", "H"),
+    ("headerSize", "H"),
+    ("size", "I"),
+    ("packageCount", "I"),
+])
+
+PACKAGE_HEADER = record("PACKAGE_HEADER", [
+    ("type", "H"),
+    ("headerSize", "H"),
+    ("size", "I"),
+    ("id", "I"),
+    ("name", "256s"),
+    ("typeStrings", "I"),
+    ("lastPublicType", "I"),
+    ("keyStrings", "I"),
+    ("lastPublicKey", "I"),
+])
+
+TYPE_HEADER = record("TYPE_HEADER", [
+    ("type", "H"),
+    ("headerSize", "H"),
+    ("size", "I"),
+    ("id", "B"),
+    ("flags", "B"),
+    ("reserved", "H"),
+    ("entryCount", "I"),
+    ("entriesStart", "I"),
+])
+
+# the leading fields of ResTable_config, every version of the format has them
+RES_TABLE_CONFIG = record("RES_TABLE_CONFIG", [
+    ("size", "I"),
+    ("mcc", "H"),
+    ("mnc", "H"),
+    ("language", "2s"),
+    ("country", "2s"),
+    ("orientation", "B"),
+    ("touchscreen", "B"),
+    ("density", "H"),
+    ("keyboard", "B"),
+    ("navigation", "B"),
+    ("inputFlags", "B"),
+    ("inputPad0", "B"),
+    ("screenWidth", "H"),
+    ("screenHeight", "H"),
+    ("sdkVersion", "H"),
+    ("minorVersion", "H"),
+])
+
+ENTRY_HEADER = record("ENTRY_HEADER", [
+    ("size", "H"),
+    ("flags", "H"),
+    ("key", "I"),
+])
+
+# an entry with FLAG_COMPACT: the key index and the value are in the header,
+# the type of the value is the high byte of flags
+COMPACT_ENTRY = record("COMPACT_ENTRY", [
+    ("key", "H"),
+    ("flags", "H"),
+    ("data", "I"),
+])
+
+RES_VALUE = record("RES_VALUE", [
+    ("size", "H"),
+    ("res0", "B"),
+    ("dataType", "B"),
+    ("data", "I"),
+])
+
+MAP_ENTRY = record("MAP_ENTRY", [
+    ("parent", "I"),
+    ("count", "I"),
+])
+
+MAP_ITEM = record("MAP_ITEM", [
+    ("name", "I"),
+    ("size", "H"),
+    ("res0", "B"),
+    ("dataType", "B"),
+    ("data", "I"),
+])
+
+# a resolved entry, value is a python value for a simple entry and a list of
+# (attribute id, value) for a complex one (a style, a plural, ...)
+ResourceEntry = namedtuple("ResourceEntry", ["id", "type", "name", "value", "isComplex"])
+
+def _malformed(budget, reason):
+    """
+        Report a layout the table breaks: a :class:`ParseError` with a budget,
+        an error message without one (the caller then skips the part)
+    """
+    if budget is not None:
+        budget.fail(reason)
+    print("[Error] %s" % reason)
+
+def decodeConfig(rawConfig):
+    """
+        Decode the leading fields of a ResTable_config
+
+        language and country are strings ("" when not set).
+
+        :rtype: a dict
+    """
+    rawConfig = bytes(rawConfig[:RES_TABLE_CONFIG._size]).ljust(RES_TABLE_CONFIG._size, b"\x00")
+    config = RES_TABLE_CONFIG._unpack_from(rawConfig)._asdict()
+    config["language"] = config["language"].rstrip(b"\x00").decode("ascii", "replace")
+    config["country"] = config["country"].rstrip(b"\x00").decode("ascii", "replace")
+    return config
+
+class ResTableType:
+    """
+        A type chunk: the entries of one type for one configuration
+
+        Only the position of the chunk is kept, the config is decoded on the
+        first match and an entry only when it is requested.
+    """
+    def __init__(self, chunk):
+        self.__chunk = chunk
+        self.header = TYPE_HEADER._unpack_from(chunk)
+        self.__config = None
+        self.__sparse = None
+
+    def getConfig(self):
+        if self.__config is None:
+            self.__config = decodeConfig(self.__chunk[TYPE_HEADER._size:self.header.headerSize])
+        return self.__config
+
+    def isDefault(self):
+        config = self.getConfig()
+        return all(not value for key, value in config.items() if key != "size")
+
+    def matches(self, config):
+        """
+            Check the fields of config (a dict) against the config of the chunk
+
+            :rtype: bool
+        """
+        own = self.getConfig()
+        return all(own.get(key) == value for key, value in config.items())
+
+    def getEntryOffset(self, idx):
+        """
+            Return the offset of an entry in the chunk or None if the type has no such entry
+
+            :rtype: int
+        """
+        header = self.header
+        if header.flags & FLAG_SPARSE:
+            # sorted (index, offset / 4) pairs
+            if self.__sparse is None:
+                pairs = array('H')
+                pairs.frombytes(self.__chunk[header.headerSize:header.headerSize + 4 * header.entryCount])
+                if sys.byteorder != "little":
+                    pairs.byteswap()
+                self.__sparse = (pairs[0::2], pairs[1::2])
+            indexes, offsets = self.__sparse
+            pos = bisect_left(indexes, idx)
+            if pos == len(indexes) or indexes[pos] != idx:
+                return None
+            return header.entriesStart + offsets[pos] * 4
+
+        if idx >= header.entryCount:
+            return None
+
+        if header.flags & FLAG_OFFSET16:
+            off = struct.unpack_from("<H", self.__chunk, header.headerSize + 2 * idx)[0]
+            if off == NO_ENTRY16:
+                return None
+            return header.entriesStart + off * 4
+
+        off = struct.unpack_from("<I", self.__chunk, header.headerSize + 4 * idx)[0]
+        if off == NO_ENTRY:
+            return None
+        return header.entriesStart + off
+
+    def getChunk(self):
+        return self.__chunk
+
+class ResTablePackage:
+    """
+        A package chunk, its type and type spec chunks are indexed by type id
+    """
+    def __init__(self, chunk, budget=None):
+        self.budget = budget
+        self.header = PACKAGE_HEADER._unpack_from(chunk)
+        self.id = self.header.id
+        self.name = bytes(self.header.name).decode("utf-16-le", "replace").split("\x00")[0]
+
+        # both pools are located by the header, not by their order
+        self.typeStrings = self.__readPool(chunk, self.header.typeStrings)
+        self.keyStrings = self.__readPool(chunk, self.header.keyStrings)
+        self.typeSpecs = {}
+        self.types = {}
+
+        switcher = {
+            RES_TABLE_TYPE_SPEC_TYPE: self.readTypeSpecChunk,
+            RES_TABLE_TYPE_TYPE: self.readTypeChunk,
+        }
+
+        headerSize = self.header.headerSize
+        if headerSize < PACKAGE_HEADER._size or headerSize > len(chunk):
+            _malformed(budget, "bad package header size %d" % headerSize)
+            return
+
+        for chunkType, sub in AndroidManifest.iterChunks(chunk, headerSize, budget):
+            switcher.get(chunkType & 0xffff, self.readBreak)(sub)
+
+    def __readPool(self, chunk, off):
+        if not off:
+            return []
+        if off + STRING_CHUNK._size > len(chunk):
+            _malformed(self.budget, "string pool at %#x outside of the package" % off)
+            return []
+        return StringPool(chunk[off:], self.budget)
+
+    def readTypeSpecChunk(self, chunk):
+        if len(chunk) < 16:
+            _malformed(self.budget, "truncated type spec chunk")
+            return
+        self.typeSpecs[chunk[8]] = chunk
+
+    def readTypeChunk(self, chunk):
+        if len(chunk) < TYPE_HEADER._size:
+            _malformed(self.budget, "truncated type chunk")
+            return
+
+        # the entry offsets sit between the header and the entries
+        header = TYPE_HEADER._unpack_from(chunk)
+        width = 2 if header.flags & FLAG_OFFSET16 and not header.flags & FLAG_SPARSE else 4
+        if header.headerSize < TYPE_HEADER._size or header.entriesStart > len(chunk) or \
+                header.headerSize + width * header.entryCount > header.entriesStart:
+            _malformed(self.budget, "bad layout of type chunk %d (%d entries)" % (header.id, header.entryCount))
+            return
+
+        resType = ResTableType(chunk)
+        self.types.setdefault(resType.header.id, []).append(resType)
+
+    def readBreak(self, chunk):
+        pass
+
+    def getTypeName(self, typeId):
+        if 0 < typeId <= len(self.typeStrings):
+            return self.typeStrings[typeId - 1]
+        return None
+
+class ResourceTable:
+    """
+        A resources.arsc file
+
+        Only the chunk headers are read when the object is built: the global
+        string pool, the packages and, per package, the type chunks indexed by
+        type id. An entry is decoded by resolve() only.
+
+        :param fileInfo: the resources.arsc file
+        :type fileInfo: :class:`File`
+        :param budget: the limits for an untrusted file, a malformed part is skipped without it
+        :type budget: :class:`ParseBudget`
+    """
+    def __init__(self, fileInfo, budget=None):
+        self.__fileInfo = fileInfo
+        self.budget = budget
+        self.strTable = []
+        self.packages = {}
+
+        rawBinary = memoryview(fileInfo.getRawBinary())
+        if budget is not None:
+            budget.start()
+            if len(rawBinary) < TABLE_HEADER._size:
+                budget.fail("file too small")
+        self.header = TABLE_HEADER._unpack_from(rawBinary)
+        if self.header.headerSize < TABLE_HEADER._size:
+            _malformed(budget, "bad table header size %d" % self.header.headerSize)
+            return
+
+        switcher = {
+            RES_STRING_POOL_TYPE: self.readStringChunk,
+            RES_TABLE_PACKAGE_TYPE: self.readPackageChunk,
+        }
+
+        for chunkType, chunk in AndroidManifest.iterChunks(rawBinary, self.header.headerSize, budget):
+            switcher.get(chunkType & 0xffff, self.readBreak)(chunk)
+
+    def readStringChunk(self, chunk):
+        if len(chunk) < STRING_CHUNK._size:
+            _malformed(self.budget, "truncated string pool")
+            return
+        self.strTable = StringPool(chunk, self.budget)
+
+    def readPackageChunk(self, chunk):
+        if len(chunk) < PACKAGE_HEADER._size:
+            _malformed(self.budget, "truncated package chunk")
+            return
+        package = ResTablePackage(chunk, self.budget)
+        self.packages[package.id] = package
+
+    def readBreak(self, chunk):
+        pass
+
+    def getPackage(self, packageId):
+        return self.packages.get(packageId)
+
+    def getResourceName(self, resId):
+        """
+            Return the name of a resource as "type/name"
+
+            :rtype: string or None
+        """
+        entry = self.resolve(resId)
+        if entry is None:
+            return None
+        return "%s/%s" % (entry.type, entry.name)
+
+    def resolve(self, resId, config=None):
+        """
+            Decode the entry of a resource id
+
+            The type chunks whose configuration matches every field of config
+            are tried first, then the default configuration, then any other.
+
+            :param resId: the resource id (0xPPTTEEEE)
+            :type resId: int
+            :param config: the fields of the configuration to match, e.g. {"language": "fr"}
+            :type config: dict
+
+            :rtype: :class:`ResourceEntry` or None
+        """
+        package = self.packages.get(resId >> 24)
+        if package is None:
+            return None
+
+        typeId = (resId >> 16) & 0xff
+        idx = resId & 0xffff
+
+        for resType in self.__candidates(package.types.get(typeId, []), config):
+            off = resType.getEntryOffset(idx)
+            if off is not None:
+                return self.__readEntry(resId, package, resType.getChunk(), off)
+        return None
+
+    @staticmethod
+    def __candidates(types, config):
+        if config:
+            for resType in types:
+                if resType.matches(config):
+                    yield resType
+        for resType in types:
+            if resType.isDefault():
+                yield resType
+        for resType in types:
+            yield resType
+
+    def __malformedEntry(self, resId, reason):
+        # an entry is decoded long after the walk of the chunks, the offset of
+        # the budget is stale so the error is raised for the resource id
+        if self.budget is not None:
+            raise ParseError("resource %#x: %s" % (resId, reason))
+        print("[Error] Resource %#x: %s" % (resId, reason))
+
+    def __readEntry(self, resId, package, chunk, off):
+        if off + ENTRY_HEADER._size > len(chunk):
+            return self.__malformedEntry(resId, "entry at %#x outside of the type chunk" % off)
+        entry = ENTRY_HEADER._unpack_from(chunk, off)
+        compact = None
+        key = entry.key
+        if entry.flags & FLAG_COMPACT:
+            compact = COMPACT_ENTRY._unpack_from(chunk, off)
+            key = compact.key
+
+        typeName = package.getTypeName((resId >> 16) & 0xff)
+        if typeName is None:
+            return self.__malformedEntry(resId, "type id out of the type strings")
+        if key >= len(package.keyStrings):
+            return self.__malformedEntry(resId, "key index %d out of the key strings" % key)
+        keyName = package.keyStrings[key]
+
+        if compact is not None:
+            return ResourceEntry(resId, typeName, keyName, self.__decodeValue(compact.flags >> 8, compact.data), False)
+
+        if entry.flags & FLAG_COMPLEX:
+            if entry.size < ENTRY_HEADER._size + MAP_ENTRY._size or off + entry.size > len(chunk):
+                return self.__malformedEntry(resId, "bad map entry size %d" % entry.size)
+            bag = MAP_ENTRY._unpack_from(chunk, off + ENTRY_HEADER._size)
+            if off + entry.size + bag.count * MAP_ITEM._size > len(chunk):
+                return self.__malformedEntry(resId, "map of %d items overflows the type chunk" % bag.count)
+            items = []
+            itemOff = off + entry.size
+            for i in range(0, bag.count):
+                item = MAP_ITEM._unpack_from(chunk, itemOff)
+                items.append((item.name, self.__decodeValue(item.dataType, item.data)))
+                itemOff += MAP_ITEM._size
+            return ResourceEntry(resId, typeName, keyName, items, True)
+
+        if entry.size < ENTRY_HEADER._size or off + entry.size + RES_VALUE._size > len(chunk):
+            return self.__malformedEntry(resId, "bad entry size %d" % entry.size)
+        value = RES_VALUE._unpack_from(chunk, off + entry.size)
+        return ResourceEntry(resId, typeName, keyName, self.__decodeValue(value.dataType, value.data), False)
+
+    def __decodeValue(self, dataType, data):
+        return decodeValue(dataType, data, self.strTable)
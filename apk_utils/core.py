@@ -2,6 +2,8 @@ import cmd
 import os
 import sys
 import re
+import shlex
+import argparse
 import codecs
 import sqlite3
 import zipfile
@@ -10,6 +12,7 @@ from sys import exit
 from apk_utils.file import *
 from apk_utils.options import *
 from apk_utils.dexFile import DalvikVMFormat
+from apk_utils.apk import APK
 
 WINDOWS = 1
 LINUX   = 2
@@ -22,16 +25,32 @@ class Core(cmd.Cmd):
         self.__dex       = res["dex"]
         self.__filePath  = res["filePath"]
         self.__fileInfo  = None
+        self.__apk       = None
         self.__outDirPath= res["outDir"]
+        self.__useMmap   = res.get("mmap", False)
         self.os = None
         self.path = path
         self.prompt = 'Apk_utils—> '
         self.__parse()
 
+    def __open(self):
+        # an APK is read entry by entry through APK, -m/--mmap decides for the file itself
+        self.__fileInfo = File(self.__filePath, self.__useMmap)
+        if zipfile.is_zipfile(self.__filePath):
+            self.__apk = APK(self.__fileInfo)
+        else:
+            self.__apk = None
+
+    def __getOutDirPath(self, outDir):
+        # outDir takes the place of the last "\\" component of the path, as it
+        # always did, whatever getFileName() makes of a "/" path
+        filePath = self.__fileInfo.getFilePath()
+        return filePath.replace(filePath.split("\\")[-1], outDir)
+
     def __parse(self):
         if self.__filePath:
-            self.__fileInfo = File(self.__filePath)
-            self.__outDirPath = self.__fileInfo.getFilePath().replace(self.__fileInfo.getFileName(), self.__outDirPath)
+            self.__open()
+            self.__outDirPath = self.__getOutDirPath(self.__outDirPath)
 
         if os.path.exists(self.__outDirPath):
             pass
@@ -39,7 +58,11 @@ class Core(cmd.Cmd):
             os.mkdir(self.__outDirPath)
 
         if self.__androidmanifest:
-            if self.__fileInfo == None or self.__fileInfo.getFileName() != "AndroidManifest.xml":
+            if self.__apk:
+                if not self.__apk.hasFile("AndroidManifest.xml"):
+                    print("No AndroidManifest.xml in the apk")
+                    exit(0)
+            elif self.__fileInfo == None or self.__fileInfo.getFileName() != "AndroidManifest.xml":
                 print("File is not AndroidManifest.xml")
                 exit(0)
 
@@ -54,7 +77,7 @@ class Core(cmd.Cmd):
 
     def analyze(self):
         if self.__androidmanifest:
-            AndroidManifest(self.__fileInfo).analyze()
+            self.__analyzeAndroidManifest()
 
 
         if self.__isConsole:
@@ -62,8 +85,8 @@ class Core(cmd.Cmd):
 
     def do_filename(self, s, silent=False):
         self.__filePath = s
-        self.__fileInfo = File(self.__filePath)
-        self.__outDirPath = self.__fileInfo.getFilePath().replace(self.__fileInfo.getFileName(), self.__outDirPath)
+        self.__open()
+        self.__outDirPath = self.__getOutDirPath(self.__outDirPath)
 
         if self.__fileInfo.getFileName() == "AndroidManifest.xml":
             self.__androidmanifest = True
@@ -75,17 +98,40 @@ class Core(cmd.Cmd):
             print("No file to parse!")
 
         if self.__androidmanifest:
-            AndroidManifest(self.__fileInfo).analyze()
+            self.__analyzeAndroidManifest()
         elif self.__dex:
             self.do_dex()
 
 
     def do_unzip(self, s, silent=False):
+        if not self.__apk:
+            print("File is not an apk!")
+            return
+
+        parser = argparse.ArgumentParser(prog="unzip")
+        parser.add_argument("-i", "--include", action="append",             help="glob of the entries to extract")
+        parser.add_argument("-e", "--exclude", action="append",             help="glob of the entries to skip")
+        parser.add_argument("-s", "--max-size", type=int, dest="maxSize",  help="budget in bytes for the extracted files")
+        parser.add_argument("-j", "--jobs",    type=int,                    help="number of extraction threads")
+        parser.add_argument("-f", "--force",   action="store_true",         help="rewrite files already extracted")
+        try:
+            args = parser.parse_args(shlex.split(s or ''))
+        except SystemExit:
+            return
+
         uPath = os.path.join(self.__outDirPath, 'unzip')
-        os.mkdir(uPath)
-        f = zipfile.ZipFile(self.__fileInfo.getFilePath(), 'r')
-        for file in f.namelist():
-            f.extract(file, uPath)
+        if not os.path.exists(uPath):
+            os.mkdir(uPath)
+
+        try:
+            extracted = self.__apk.extract(uPath, include=args.include, exclude=args.exclude,
+                                           maxSize=args.maxSize, workers=args.jobs, skipUnchanged=not args.force)
+        except ValueError as why:
+            print("[Error] " + why.__str__())
+            return
+
+        if not silent:
+            print("%d files extracted to %s" % (len(extracted), uPath))
 
 
     def do_apktool(self, s=None, silent=False):
@@ -94,8 +140,27 @@ class Core(cmd.Cmd):
                         os.path.join(self.__outDirPath, 'apktool_out'))
 
 
-    def do_dex(self, s, silent=False):
-        DalvikVMFormat(self.__fileInfo)
+    def do_dex(self, s=None, silent=False):
+        if self.__apk:
+            for name in self.__apk.getDexNames():
+                self.__apk.getDalvikVMFormat(name)
+        else:
+            DalvikVMFormat(self.__fileInfo)
+
+    def __getAndroidManifest(self):
+        # the file comes from outside, parse it within the default limits
+        if self.__apk:
+            return self.__apk.getAndroidManifest(ParseBudget())
+        return AndroidManifest(self.__fileInfo, ParseBudget())
+
+    def __analyzeAndroidManifest(self):
+        try:
+            self.__getAndroidManifest().analyze(outFile=self.__getManifestOutPath())
+        except ParseError as why:
+            print("[Error] " + why.__str__())
+
+    def __getManifestOutPath(self):
+        return os.path.join(self.__outDirPath, "AndroidManifest.xml")
 
     def get_curr_path(self):
         return self.path.replace('/', '\\')
\ No newline at end of file
@@ -1,8 +1,14 @@
 
 import apk_utils.options
+import bisect
 import struct
+import sys
+import threading
+import weakref
+from array import array
 from struct import unpack, pack, calcsize
 from apk_utils.instruction import *
+from apk_utils.file import ParseError
 
 
 
@@ -27,95 +33,182 @@ TYPE_ITEM = {
     0x2006: "TYPE_ANNOTATIONS_DIRECTORY_ITEM",
 }
 
+HEADER_ITEM = apk_utils.options.record("HEADER_ITEM", [
+    ("magic", "Q"),
+    ("checksum", "i"),
+    ("signature", "20s"),
+    ("file_size", "I"),
+    ("header_size", "I"),
+    ("endian_tag", "I"),
+    ("link_size", "I"),
+    ("link_off", "I"),
+    ("map_off", "I"),
+    ("string_ids_size", "I"),
+    ("string_ids_off", "I"),
+    ("type_ids_size", "I"),
+    ("type_ids_off", "I"),
+    ("proto_ids_size", "I"),
+    ("proto_ids_off", "I"),
+    ("field_ids_size", "I"),
+    ("field_ids_off", "I"),
+    ("method_ids_size", "I"),
+    ("method_ids_off", "I"),
+    ("class_defs_size", "I"),
+    ("class_defs_off", "I"),
+    ("data_size", "I"),
+    ("data_off", "I"),
+])
+
+MAP_ITEM = apk_utils.options.record("MAP_ITEM", [
+    ("type", "H"),
+    ("unused", "H"),
+    ("size", "I"),
+    ("offset", "I"),
+])
+
+CODE_ITEM = apk_utils.options.record("CODE_ITEM", [
+    ("registers_size", "H"),
+    ("ins_size", "H"),
+    ("outs_size", "H"),
+    ("tries_size", "H"),
+    ("debug_info_off", "I"),
+    ("insns_size", "I"),
+])
+
+PROTO_ID_ITEM = apk_utils.options.record("PROTO_ID_ITEM", [
+    ("shorty_idx", "I"),
+    ("return_type_idx", "I"),
+    ("parameters_off", "I"),
+])
+
+FIELD_ID_ITEM = apk_utils.options.record("FIELD_ID_ITEM", [
+    ("class_idx", "H"),
+    ("type_idx", "H"),
+    ("name_idx", "I"),
+])
+
+METHOD_ID_ITEM = apk_utils.options.record("METHOD_ID_ITEM", [
+    ("class_idx", "H"),
+    ("proto_idx", "H"),
+    ("name_idx", "I"),
+])
+
+CLASS_DEF_ITEM = apk_utils.options.record("CLASS_DEF_ITEM", [
+    ("class_idx", "I"),
+    ("access_flags", "I"),
+    ("superclass_idx", "I"),
+    ("interfaces_off", "I"),
+    ("source_file_idx", "I"),
+    ("annotations_off", "I"),
+    ("class_data_off", "I"),
+    ("static_values_off", "I"),
+])
+
+NO_INDEX = 0xffffffff
+
+# number of decoded strings kept by a ClassManager
+STRING_CACHE_SIZE = 4096
+
+# number of disassembled instructions kept by all the methods of the process
+# (about 100 bytes per instruction)
+INSTRUCTION_CACHE_SIZE = 500000
+
+def read_array(buff, typecode, size):
+    """
+        Decode `size` little-endian integers at the index of buff in one call
+
+        :param buff: a ByteCode
+        :param typecode: the typecode of the array ('H' or 'I')
+        :type typecode: string
+
+        :rtype: :class:`array.array`
+    """
+    values = array(typecode)
+    values.frombytes(buff.read(size * values.itemsize))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+def read_columns(buff, rec, size):
+    """
+        Decode `size` consecutive records in bulk, one array per field
+
+        Every field of rec must be an 'H' or an 'I' aligned on its own size.
+
+        :param buff: a ByteCode
+        :param rec: a record built by :func:`apk_utils.options.record`
+
+        :rtype: a list of :class:`array.array`, in the order of the fields
+    """
+    raw = buff.read(size * rec._size)
+
+    rows = {}
+    columns = []
+    off = 0
+    for typecode in rec._struct.format.lstrip("<"):
+        values = rows.get(typecode)
+        if values == None:
+            values = array(typecode)
+            values.frombytes(raw)
+            if sys.byteorder != "little":
+                values.byteswap()
+            rows[typecode] = values
+        columns.append(values[off // values.itemsize::rec._size // values.itemsize])
+        off += values.itemsize
+    return columns
+
+def mutf8_decode(data):
+    """
+        Decode a MUTF-8 string (the encoding of the dex string data)
+
+        NUL is encoded on two bytes and supplementary characters as a pair of
+        encoded surrogates, plain utf-8 decoding handles both once NUL is fixed
+        and the surrogates are joined.
+
+        :param data: the encoded bytes, without the trailing NUL
+        :type data: bytes or memoryview
+
+        :rtype: string
+    """
+    data = bytes(data)
+    try:
+        return data.decode("ascii")
+    except UnicodeDecodeError:
+        pass
+
+    s = data.replace(b"\xc0\x80", b"\x00").decode("utf-8", "surrogatepass")
+    try:
+        return s.encode("utf-16", "surrogatepass").decode("utf-16")
+    except UnicodeDecodeError:
+        # a lone surrogate, keep it as is
+        return s
+
 class HeaderItem(object):
     def __init__(self, size, buff, cm):
         self.__CM = cm
 
         self.offset = buff.get_idx()
 
-        self.magic = unpack("=Q", buff.read(8))[0]
-        self.checksum = unpack("=i", buff.read(4))[0]
-        self.signature = unpack("=20s", buff.read(20))[0]
-        self.file_size = unpack("=I", buff.read(4))[0]
-        self.header_size = unpack("=I", buff.read(4))[0]
-        self.endian_tag = unpack("=I", buff.read(4))[0]
-        self.link_size = unpack("=I", buff.read(4))[0]
-        self.link_off = unpack("=I", buff.read(4))[0]
-        self.map_off = unpack("=I", buff.read(4))[0]
-        self.string_ids_size = unpack("=I", buff.read(4))[0]
-        self.string_ids_off = unpack("=I", buff.read(4))[0]
-        self.type_ids_size = unpack("=I", buff.read(4))[0]
-        self.type_ids_off = unpack("=I", buff.read(4))[0]
-        self.proto_ids_size = unpack("=I", buff.read(4))[0]
-        self.proto_ids_off = unpack("=I", buff.read(4))[0]
-        self.field_ids_size = unpack("=I", buff.read(4))[0]
-        self.field_ids_off = unpack("=I", buff.read(4))[0]
-        self.method_ids_size = unpack("=I", buff.read(4))[0]
-        self.method_ids_off = unpack("=I", buff.read(4))[0]
-        self.class_defs_size = unpack("=I", buff.read(4))[0]
-        self.class_defs_off = unpack("=I", buff.read(4))[0]
-        self.data_size = unpack("=I", buff.read(4))[0]
-        self.data_off = unpack("=I", buff.read(4))[0]
-
-        self.map_off_obj = None
-        self.string_off_obj = None
-        self.type_off_obj = None
-        self.proto_off_obj = None
-        self.field_off_obj = None
-        self.method_off_obj = None
-        self.class_off_obj = None
-        self.data_off_obj = None
+        self.__dict__.update(zip(HEADER_ITEM._fields, buff.read_record(HEADER_ITEM)))
 
     def reload(self):
       pass
 
     def get_obj(self):
-      if self.map_off_obj == None:
-        self.map_off_obj = self.__CM.get_item_by_offset( self.map_off )
-
-      if self.string_off_obj == None:
-        self.string_off_obj = self.__CM.get_item_by_offset( self.string_ids_off )
-
-      if self.type_off_obj == None:
-        self.type_off_obj = self.__CM.get_item_by_offset( self.type_ids_off )
-
-      if self.proto_off_obj == None:
-        self.proto_off_obj = self.__CM.get_item_by_offset( self.proto_ids_off )
-
-      if self.field_off_obj == None:
-        self.field_off_obj = self.__CM.get_item_by_offset( self.field_ids_off )
-
-      if self.method_off_obj == None:
-        self.method_off_obj = self.__CM.get_item_by_offset( self.method_ids_off )
-
-      if self.class_off_obj == None:
-        self.class_off_obj = self.__CM.get_item_by_offset( self.class_defs_off )
-
-      if self.data_off_obj == None:
-        self.data_off_obj = self.__CM.get_item_by_offset( self.data_off )
-
-      self.map_off = self.map_off_obj.get_off()
-
-      self.string_ids_size = len(self.string_off_obj)
-      self.string_ids_off = self.string_off_obj[0].get_off()
-
-      self.type_ids_size = len(self.type_off_obj.type)
-      self.type_ids_off = self.type_off_obj.get_off()
-
-      self.proto_ids_size = len(self.proto_off_obj.proto)
-      self.proto_ids_off = self.proto_off_obj.get_off()
+      # the sizes and offsets of the sections come from the map list, a
+      # section missing from it has a size and an offset of 0
+      mi = self.__CM.get_map_item(0x1000)
+      if mi != None:
+        self.map_off = mi.offset
 
-      self.field_ids_size = len(self.field_off_obj.elem)
-      self.field_ids_off = self.field_off_obj.get_off()
+      self.string_ids_size, self.string_ids_off = self.__get_section(0x1)
+      self.type_ids_size, self.type_ids_off = self.__get_section(0x2)
+      self.proto_ids_size, self.proto_ids_off = self.__get_section(0x3)
+      self.field_ids_size, self.field_ids_off = self.__get_section(0x4)
+      self.method_ids_size, self.method_ids_off = self.__get_section(0x5)
+      self.class_defs_size, self.class_defs_off = self.__get_section(0x6)
 
-      self.method_ids_size = len(self.method_off_obj.methods)
-      self.method_ids_off = self.method_off_obj.get_off()
-
-      self.class_defs_size = len(self.class_off_obj.class_def)
-      self.class_defs_off = self.class_off_obj.get_off()
-
-      self.data_size = len(self.data_off_obj.map_item)
-      self.data_off = self.data_off_obj.get_off()
+      # the data section isn't a map item, data_size and data_off are kept
 
       return pack("=Q", self.magic) +                                 \
              pack("=i", self.checksum) +                              \
@@ -141,6 +234,12 @@ class HeaderItem(object):
              pack("=I", self.data_size) +            \
              pack("=I", self.data_off)
 
+    def __get_section(self, type_item):
+      mi = self.__CM.get_map_item(type_item)
+      if mi == None:
+        return 0, 0
+      return mi.size, mi.offset
+
     def get_raw(self):
         return self.get_obj()
 
@@ -168,56 +267,194 @@ class HeaderItem(object):
       return self.offset
 
 class LinearSweepAlgorithm(object):
+    """
+        Disassemble a buffer of code units from its start to its end
+
+        Every opcode is looked up in the flat tables of :mod:`apk_utils.instruction`,
+        the offset advances by the length of each decoded instruction. An
+        instruction cut by the end of the buffer raises a :class:`ParseError`.
+    """
     @staticmethod
-    def get_instructions(self, cm, size, insn, idx):
-        max_idx = size * calcsize('=H')
+    def get_instructions(cm, size, insn, idx, odex=False):
+        max_idx = size * 2
         if max_idx > len(insn):
           max_idx = len(insn)
 
+        table = DALVIK_OPCODES_TABLE
+
         # Get instructions
         while idx < max_idx:
-          obj = None
-          classic_instruction = True
-
-          op_value = unpack('=B', insn[idx])[0]
-
-          #print "%x %x" % (op_value, idx)
+          op_value = insn[idx]
+          entry = None
 
           #payload instructions or extented/optimized instructions
           if (op_value == 0x00 or op_value == 0xff) and ((idx + 2) < max_idx):
-            op_value = unpack('=H', insn[idx:idx + 2])[0]
-
-            # payload instructions ?
-            if op_value in DALVIK_OPCODES_PAYLOAD:
-              try:
-                obj = get_instruction_payload(op_value, insn[idx:])
-                classic_instruction = False
-              except struct.error:
-                warning("error while decoding instruction ...")
-
-            elif op_value in DALVIK_OPCODES_EXTENDED_WIDTH:
-              try:
-                obj = get_extented_instruction(cm, op_value, insn[idx:])
-                classic_instruction = False
-              except struct.error, why:
-                warning("error while decoding instruction ..." + why.__str__())
+            high = insn[idx + 1]
+
+            if op_value == 0x00:
+              # payload instructions ?
+              if high and DALVIK_PAYLOAD_TABLE[high] is not None:
+                try:
+                  obj = DALVIK_PAYLOAD_TABLE[high](insn[idx:])
+                  if idx + obj.get_length() > len(insn):
+                    raise struct.error("%d bytes needed" % obj.get_length())
+                except struct.error as why:
+                  raise ParseError("truncated instruction at %#x: %s" % (idx, why))
+                yield obj
+                idx += obj.get_length()
+                continue
+
+            elif 0 < high <= 0x26:
+              entry = DALVIK_OPCODES_EXTENDED_TABLE[high]
 
             # optimized instructions ?
-            elif self.odex and (op_value in DALVIK_OPCODES_OPTIMIZED):
-              obj = get_optimized_instruction(cm, op_value, insn[idx:])
-              classic_instruction = False
+            elif odex and high >= 0xf2:
+              entry = DALVIK_OPCODES_OPTIMIZED_TABLE[high]
 
           # classical instructions
-          if classic_instruction:
-            op_value = unpack('=B', insn[idx])[0]
-            obj = get_instruction(cm, op_value, insn[idx:], self.odex)
+          if entry is None or entry is INVALID_OPCODE:
+            entry = table[op_value]
+
+          try:
+            obj = entry[0](cm, insn[idx:])
+          except struct.error as why:
+            raise ParseError("truncated instruction at %#x: %s" % (idx, why))
 
           # emit instruction
           yield obj
-          idx = idx + obj.get_length()
+          idx += obj.get_length()
+
+class NeverCache(object):
+    """
+        Instruction caching policy: always disassemble again
+    """
+    def use(self, code):
+        return False
+
+class AlwaysCache(object):
+    """
+        Instruction caching policy: keep the instructions of a method from its
+        first disassembly
+    """
+    def use(self, code):
+        return True
+
+class CacheAfterUses(object):
+    """
+        Instruction caching policy: keep the instructions of a method once it
+        has been disassembled `uses` times, or from its second disassembly if
+        it has at least `size` code units
+
+        :param uses: the number of disassemblies before caching
+        :type uses: int
+        :param size: the number of code units of a large method, None to treat all methods alike
+        :type size: int
+    """
+    def __init__(self, uses=5, size=1000):
+        self.uses = uses
+        self.size = size
+
+    def use(self, code):
+        if code.rcache >= self.uses:
+            return True
+
+        code.rcache += 1
+        if self.size != None and code.size >= self.size:
+            code.rcache = self.uses
+        return False
+
+class InstructionCache(object):
+    """
+        The instructions kept by the methods of the process, shared by every
+        DalvikVMFormat. The policy decides when a method is cached, whole
+        methods are evicted, least recently used first, once more than `size`
+        instructions are held.
+
+        The cache never keeps a DalvikVMFormat alive: the instructions stay on
+        their DCode, the cache only holds a weak reference to it and the
+        number of instructions for the LRU bookkeeping. Evicting a method drops
+        the list from its DCode, a collected DCode is released from the cache.
+        The instructions keep a normal reference to the ClassManager and
+        remain usable after the DalvikVMFormat is gone.
+
+        The bookkeeping is shared by every thread and guarded by a lock.
+
+        :param policy: a caching policy (:class:`NeverCache`, :class:`AlwaysCache` or :class:`CacheAfterUses`)
+        :param size: the maximum number of instructions, None for no bound
+        :type size: int
+    """
+    def __init__(self, policy=None, size=INSTRUCTION_CACHE_SIZE):
+        if policy == None:
+            policy = CacheAfterUses()
+        self.policy = policy
+        # id of the DCode -> (weak reference to the DCode, number of instructions)
+        self.methods = apk_utils.options.LRUCache(size, lambda entry: entry[1], self.__evicted)
+        self.finalizers = {}
+        # reentrant, a DCode collected under the lock releases its entry
+        self.lock = threading.RLock()
+
+    def set_policy(self, policy):
+        self.policy = policy
+
+    def set_size(self, size):
+        """
+            Change the maximum number of instructions, evicting methods if needed
+
+            :param size: the maximum number of instructions, None for no bound
+            :type size: int
+        """
+        with self.lock:
+            self.methods.resize(size)
+
+    def get_size(self):
+        """
+            Return the number of instructions currently held
+
+            :rtype: int
+        """
+        return self.methods.total
+
+    def get(self, code):
+        with self.lock:
+            if self.methods.get(id(code)) == None:
+                return None
+            return code.kept_instructions
+
+    def put(self, code, instructions):
+        key = id(code)
+        with self.lock:
+            if key not in self.finalizers:
+                self.finalizers[key] = weakref.finalize(code, self.__release, key)
+            code.kept_instructions = instructions
+            self.methods.put(key, (weakref.ref(code), len(instructions)))
+            if key not in self.methods:
+                # heavier than the whole cache
+                code.kept_instructions = None
+
+    def pop(self, code):
+        with self.lock:
+            code.kept_instructions = None
+            self.methods.pop(id(code))
+
+    def __evicted(self, key, entry):
+        code = entry[0]()
+        if code != None:
+            code.kept_instructions = None
+
+    def __release(self, key):
+        # the DCode is collected, its id may be reused from now on
+        with self.lock:
+            del self.finalizers[key]
+            self.methods.pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.methods.clear()
+
+INSTRUCTION_CACHE = InstructionCache()
 
 class DCode(object):
-    def __int__(self, class_manager, offset, size, buff):
+    def __init__(self, class_manager, offset, size, buff):
         self.CM = class_manager
         self.insn = buff
         self.offset = offset
@@ -226,6 +463,11 @@ class DCode(object):
         self.notes = {}
         self.cached_instructions = []
         self.rcache = 0
+        # the instructions INSTRUCTION_CACHE keeps for this method, None once evicted
+        self.kept_instructions = None
+
+        # address of every instruction, built by the first lookup
+        self.offsets = None
 
         self.idx = 0
 
@@ -246,6 +488,8 @@ class DCode(object):
       """
       self.insn = insn
       self.size = len(self.insn)
+      self.offsets = None
+      INSTRUCTION_CACHE.pop(self)
 
     def set_idx(self, idx):
         """
@@ -255,15 +499,19 @@ class DCode(object):
             :type idx: int
         """
         self.idx = idx
+        self.offsets = None
+        INSTRUCTION_CACHE.pop(self)
 
     def set_instructions(self, instructions):
       """
-          Set the instructions
+          Set the instructions, they are kept by this object and do not count
+          in the budget of INSTRUCTION_CACHE
 
           :param instructions: the list of instructions
           :type instructions: a list of :class:`Instruction`
       """
       self.cached_instructions = instructions
+      self.offsets = None
 
     def get_instructions(self):
         """
@@ -272,26 +520,39 @@ class DCode(object):
             :rtype: a generator of each :class:`Instruction` (or a cached list of instructions if you have setup instructions)
         """
         # it is possible to a cache for instructions (avoid a new disasm)
-        if self.cached_instructions:
-          for i in self.cached_instructions:
+        instructions = self.get_cached_instructions()
+        if instructions != None:
+          for i in instructions:
             yield i
 
-        else:
-          if self.rcache >= 5:
-            lsa = LinearSweepAlgorithm()
-            for i in lsa.get_instructions(self.CM, self.size, self.insn, self.idx):
-              self.cached_instructions.append(i)
+        elif INSTRUCTION_CACHE.policy.use(self):
+          instructions = list(LinearSweepAlgorithm.get_instructions(self.CM, self.size, self.insn, self.idx))
+          INSTRUCTION_CACHE.put(self, instructions)
 
-            for i in self.cached_instructions:
+          for i in instructions:
+            yield i
+
+        else:
+          for i in LinearSweepAlgorithm.get_instructions(self.CM, self.size, self.insn, self.idx):
               yield i
-          else:
-            self.rcache += 1
-            if self.size >= 1000:
-              self.rcache = 5
 
-            lsa = LinearSweepAlgorithm()
-            for i in lsa.get_instructions(self.CM, self.size, self.insn, self.idx):
-                yield i
+    def get_cached_instructions(self):
+        """
+            Get the instructions set on this object or kept by INSTRUCTION_CACHE
+
+            :rtype: a list of :class:`Instruction`, None if they are not cached
+        """
+        if self.cached_instructions:
+          return self.cached_instructions
+        return INSTRUCTION_CACHE.get(self)
+
+    def get_columns(self, odex=False):
+        """
+            Decode the instructions into parallel arrays instead of objects
+
+            :rtype: :class:`DCodeColumns`
+        """
+        return DCodeColumns(self.CM, self.size, self.insn, self.idx, odex)
 
     def reload(self):
         pass
@@ -328,7 +589,37 @@ class DCode(object):
         """
         if off != None:
           idx = self.off_to_pos(off)
-        return [i for i in self.get_instructions()][idx]
+
+        instructions = self.get_cached_instructions()
+        if instructions != None:
+          return instructions[idx]
+
+        # only the requested instruction is disassembled
+        off = self.get_offsets()[idx]
+        for i in LinearSweepAlgorithm.get_instructions(self.CM, self.size, self.insn, self.idx + off):
+          return i
+
+    def get_offsets(self):
+        """
+            Get the address of every instruction, the index is built once and
+            shared by all the lookups by address
+
+            :rtype: :class:`array.array` of int, sorted
+        """
+        if self.offsets == None:
+          offsets = array('I')
+          instructions = self.get_cached_instructions()
+          if instructions != None:
+            off = 0
+            for i in instructions:
+              offsets.append(off)
+              off += i.get_length()
+          else:
+            # the columns give the addresses without building any instruction
+            for off in DCodeColumns(self.CM, self.size, self.insn, self.idx).offsets:
+              offsets.append(off - self.idx)
+          self.offsets = offsets
+        return self.offsets
 
     def off_to_pos(self, off):
         """
@@ -339,13 +630,10 @@ class DCode(object):
 
             :rtype: int
         """
-        idx = 0
-        nb = 0
-        for i in self.get_instructions():
-            if idx == off:
-                return nb
-            nb += 1
-            idx += i.get_length()
+        offsets = self.get_offsets()
+        pos = bisect.bisect_left(offsets, off)
+        if pos < len(offsets) and offsets[pos] == off:
+            return pos
         return -1
 
     def get_ins_off(self, off):
@@ -357,12 +645,10 @@ class DCode(object):
 
             :rtype: an :class:`Instruction` object
         """
-        idx = 0
-        for i in self.get_instructions():
-            if idx == off:
-                return i
-            idx += i.get_length()
-        return None
+        pos = self.off_to_pos(off)
+        if pos == -1:
+            return None
+        return self.get_instruction(pos)
 
     def show(self):
         """
@@ -373,7 +659,7 @@ class DCode(object):
         for i in self.get_instructions():
             print ("%-8d(%08x)" % (nb, idx), end='')
             i.show(nb)
-            print
+            print()
 
             idx += i.get_length()
             nb += 1
@@ -394,7 +680,306 @@ class DCode(object):
       """
       return len(self.get_raw())
 
+class InstructionView(object):
+    """
+        A view over one row of :class:`DCodeColumns`, the :class:`Instruction`
+        object itself is only decoded by get_instruction()
+    """
+    __slots__ = ("__columns", "pos", "offset", "op_value", "length", "A", "B", "C", "ref")
+
+    def __init__(self, columns, pos):
+        self.__columns = columns
+        self.pos = pos
+
+        self.offset = columns.offsets[pos]
+        self.op_value = columns.opcodes[pos]
+        self.length = columns.lengths[pos]
+        self.A = columns.A[pos]
+        self.B = columns.B[pos]
+        self.C = columns.C[pos]
+        self.ref = columns.refs[pos]
+
+    def get_off(self):
+        return self.offset
+
+    def get_op_value(self):
+        return self.op_value
+
+    def get_length(self):
+        return self.length
+
+    def get_name(self):
+        return self.__columns.get_name(self.pos)
+
+    def get_kind(self):
+        return self.__columns.get_kind(self.pos)
+
+    def get_ref_kind(self):
+        return self.ref
+
+    def get_instruction(self):
+        """
+            Decode the complete instruction
+
+            :rtype: an :class:`Instruction` object
+        """
+        return self.__columns.get_instruction(self.pos)
+
+class DCodeColumns(object):
+    """
+        The instructions of a method decoded into parallel arrays, one row per
+        instruction: the byte offset, the opcode (the 16-bit value for extended,
+        optimized and payload opcodes), the length in bytes, the A/B/C operand
+        slots and the reference index (NO_INDEX when the format has none)
+
+        Passes over a whole application can read the columns directly, an
+        :class:`InstructionView` or an :class:`Instruction` is only created by
+        get() and get_instruction().
+
+        :param cm: the ClassManager
+        :param size: the number of code units
+        :param insn: the raw code units
+        :param idx: the start address of the buffer
+
+        An instruction cut by the end of the buffer raises a :class:`ParseError`.
+    """
+    # opcode -> operand slot holding the branch offset, in code units
+    BRANCH_SLOTS = dict([(op_value, 0) for op_value in range(0x28, 0x2b)] +
+                        [(op_value, 2) for op_value in range(0x32, 0x38)] +
+                        [(op_value, 1) for op_value in range(0x38, 0x3e)] +
+                        [(0x2b, 1), (0x2c, 1)])
+
+    PAYLOAD_NAMES = {
+        0x0100: "packed-switch-payload",
+        0x0200: "sparse-switch-payload",
+        0x0300: "fill-array-data-payload",
+    }
+
+    def __init__(self, cm, size, insn, idx=0, odex=False):
+        self.__CM = cm
+        self.insn = insn
+
+        self.offsets = array('I')
+        self.opcodes = array('H')
+        self.lengths = array('I')
+        self.A = array('q')
+        self.B = array('q')
+        self.C = array('h')
+        self.refs = array('I')
+
+        self.__decode(size, idx, odex)
+
+    def __decode(self, size, idx, odex):
+        insn = self.insn
+        max_idx = size * 2
+        if max_idx > len(insn):
+          max_idx = len(insn)
+
+        table = DALVIK_OPCODES_TABLE
+        operands = FORMAT_OPERANDS
+
+        add_offset = self.offsets.append
+        add_opcode = self.opcodes.append
+        add_length = self.lengths.append
+        add_A = self.A.append
+        add_B = self.B.append
+        add_C = self.C.append
+        add_ref = self.refs.append
+
+        while idx < max_idx:
+          op_value = insn[idx]
+          entry = None
+
+          try:
+            #payload instructions or extented/optimized instructions
+            if (op_value == 0x00 or op_value == 0xff) and ((idx + 2) < max_idx):
+              high = insn[idx + 1]
+
+              if op_value == 0x00:
+                if high and DALVIK_PAYLOAD_TABLE[high] is not None:
+                  length, a, b, c = get_payload_operands(insn, idx)
+                  if idx + length > len(insn):
+                    raise struct.error("%d bytes needed" % length)
+                  add_offset(idx)
+                  add_opcode(high << 8)
+                  add_length(length)
+                  add_A(a)
+                  add_B(b)
+                  add_C(c)
+                  add_ref(NO_INDEX)
+                  idx += length
+                  continue
+
+              elif 0 < high <= 0x26:
+                entry = DALVIK_OPCODES_EXTENDED_TABLE[high]
+
+              elif odex and high >= 0xf2:
+                entry = DALVIK_OPCODES_OPTIMIZED_TABLE[high]
+
+              if entry is not None and entry is not INVALID_OPCODE:
+                op_value |= high << 8
+
+            if entry is None or entry is INVALID_OPCODE:
+              entry = table[op_value]
+
+            length = entry[3] * 2
+            if idx + length > len(insn):
+              raise struct.error("%d bytes needed" % length)
+
+            a, b, c, ref = operands[entry[0]](insn, idx)
+          except struct.error as why:
+            raise ParseError("truncated instruction at %#x: %s" % (idx, why))
+
+          add_offset(idx)
+          add_opcode(op_value)
+          add_length(length)
+          add_A(a)
+          add_B(b)
+          add_C(c)
+          add_ref(NO_INDEX if ref == None else ref)
+          idx += length
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __iter__(self):
+        for pos in range(0, len(self.offsets)):
+            yield InstructionView(self, pos)
+
+    def get(self, pos):
+        """
+            Return a view over the instruction at a position
+
+            :param pos: the position of the instruction
+            :type pos: int
+
+            :rtype: :class:`InstructionView`
+        """
+        return InstructionView(self, pos)
+
+    def get_entry(self, pos):
+        """
+            Return the (decoder, name, kind, length) entry of the opcode at a
+            position, None for a payload
+
+            :rtype: tuple
+        """
+        op_value = self.opcodes[pos]
+        if op_value > 0xff and op_value & 0xff == 0:
+            return None
+        return get_opcode_entry(op_value)
+
+    def get_name(self, pos):
+        entry = self.get_entry(pos)
+        if entry == None:
+            return self.PAYLOAD_NAMES[self.opcodes[pos]]
+        return entry[1]
+
+    def get_kind(self, pos):
+        entry = self.get_entry(pos)
+        if entry == None:
+            return None
+        return entry[2]
+
+    def get_instruction(self, pos):
+        """
+            Decode the complete instruction at a position
+
+            :param pos: the position of the instruction
+            :type pos: int
+
+            :rtype: an :class:`Instruction` object
+        """
+        off = self.offsets[pos]
+        entry = self.get_entry(pos)
+        if entry == None:
+            return DALVIK_PAYLOAD_TABLE[self.opcodes[pos] >> 8](self.insn[off:])
+        return entry[0](self.__CM, self.insn[off:])
+
+    def off_to_pos(self, off):
+        """
+            Get the position of an instruction by using its address
+
+            :param off: address of the instruction
+            :type off: int
+
+            :rtype: int
+        """
+        pos = bisect.bisect_left(self.offsets, off)
+        if pos < len(self.offsets) and self.offsets[pos] == off:
+            return pos
+        return -1
+
+    def find(self, *op_values):
+        """
+            Return the positions of the instructions with one of the opcodes
+
+            :rtype: a list of int
+        """
+        op_values = set(op_values)
+        return [pos for pos, op_value in enumerate(self.opcodes) if op_value in op_values]
+
+    def get_references(self, kind):
+        """
+            Return the references of one kind (KIND_METH, KIND_FIELD, ...) made
+            by this method
+
+            :param kind: the kind of the reference
+            :type kind: int
+
+            :rtype: a list of (position, reference index)
+        """
+        kinds = {}
+        refs = []
+        for pos, ref in enumerate(self.refs):
+            if ref == NO_INDEX:
+                continue
+            op_value = self.opcodes[pos]
+            op_kind = kinds.get(op_value)
+            if op_kind == None:
+                op_kind = kinds[op_value] = self.get_kind(pos)
+            if op_kind == kind:
+                refs.append((pos, ref))
+        return refs
+
+    def get_branch_targets(self, pos):
+        """
+            Return the addresses an instruction can branch to, the targets of a
+            switch are read from its payload
+
+            :param pos: the position of the instruction
+            :type pos: int
+
+            :rtype: a list of int
+        """
+        slot = self.BRANCH_SLOTS.get(self.opcodes[pos])
+        if slot == None:
+            return []
+
+        off = self.offsets[pos]
+        target = off + (self.A, self.B, self.C)[slot][pos] * 2
+        if self.opcodes[pos] not in (0x2b, 0x2c):
+            return [target]
+
+        try:
+            ident, size = unpack_from("=HH", self.insn, target)
+            if ident == 0x0100:
+                targets = unpack_from("=%di" % size, self.insn, target + 8)
+            elif ident == 0x0200:
+                targets = unpack_from("=%di" % size, self.insn, target + 4 + size * 4)
+            else:
+                return []
+        except struct.error:
+            return []
+        return [off + i * 2 for i in targets]
+
 class DalvikCode(object):
+    """
+        A code_item, the instructions are only disassembled when requested
+
+        :param buff: a ByteCode positioned at the code_item
+        :param cm: the ClassManager
+    """
     def __init__(self, buff, cm):
         self.__CM = cm
         self.offset = buff.get_idx()
@@ -408,81 +993,606 @@ class DalvikCode(object):
 
         self.__off = buff.get_idx()
 
-        self.registers_size = unpack("=H", buff.read(2))[0]
-        self.ins_size = unpack("=H", buff.read(2))[0]
-        self.outs_size = unpack("=H", buff.read(2))[0]
-        self.tries_size = unpack("=H", buff.read(2))[0]
-        self.debug_info_off = unpack("=I", buff.read(4))[0]
-        self.insns_size = unpack("=I", buff.read(4))[0]
+        self.registers_size, self.ins_size, self.outs_size, self.tries_size, \
+            self.debug_info_off, self.insns_size = buff.read_record(CODE_ITEM)
 
         ushort = calcsize('=H')
 
         self.code = DCode(self.__CM, buff.get_idx(), self.insns_size, buff.read(self.insns_size * ushort))
 
+    def get_off(self):
+        return self.__off
+
+    def get_bc(self):
+        return self.code
+
+    def get_registers_size(self):
+        return self.registers_size
+
+    def get_ins_size(self):
+        return self.ins_size
+
+    def get_outs_size(self):
+        return self.outs_size
+
+    def get_tries_size(self):
+        return self.tries_size
+
+    def get_insns_size(self):
+        return self.insns_size
 
 class CodeItem(object):
+    """
+        The code section, a code_item is only decoded the first time its
+        offset is requested
+
+        :param size: the number of code items
+        :param buff: a ByteCode positioned at the start of the section
+        :param cm: the ClassManager
+    """
+    def __init__(self, size, buff, cm):
+        self.__CM = cm
+        self.__buff = buff
+        self.offset = buff.get_idx()
+        self.size = size
+
+        self.code = {}
+
+    def reload(self):
+        pass
+
+    def get_off(self):
+        return self.offset
+
+    def __len__(self):
+        return self.size
+
+    def get_code(self, off):
+        """
+            Return the code_item at off
+
+            :param off: the offset of the code_item
+            :type off: int
+
+            :rtype: :class:`DalvikCode`
+        """
+        code = self.code.get(off)
+        if code == None:
+            idx = self.__buff.get_idx()
+            self.__buff.set_idx(off)
+            code = DalvikCode(self.__buff, self.__CM)
+            self.__buff.set_idx(idx)
+            self.code[off] = code
+        return code
+
+class StringIdHItem(object):
+    """
+        The string_ids section, kept as an array of string_data_item offsets,
+        the strings themselves are decoded by :meth:`ClassManager.get_string`
+    """
+    def __init__(self, size, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+
+        self.string_data_off = read_array(buff, 'I', size)
+
+    def reload(self):
+        pass
+
+    def get_off(self):
+        return self.offset
+
+    def __len__(self):
+        return len(self.string_data_off)
+
+    def __getitem__(self, idx):
+        return self.string_data_off[idx]
+
+class TypeHIdItem(object):
+    """
+        The type_ids section, an index in the string ids per type
+    """
+    def __init__(self, size, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+
+        self.type = read_array(buff, 'I', size)
+
+    def reload(self):
+        pass
+
+    def get_off(self):
+        return self.offset
+
+    def __len__(self):
+        return len(self.type)
+
+    def get_type(self, idx):
+        """
+            Return the string index of the descriptor of a type
+
+            :rtype: int
+        """
+        try:
+            return self.type[idx]
+        except IndexError:
+            return NO_INDEX
+
+class TypeList(object):
+    """
+        A type_list: the type indexes of the parameters of a prototype or of
+        the interfaces of a class
+    """
+    def __init__(self, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+
+        self.size = buff.read_u32()
+        self.list = read_array(buff, 'H', self.size)
+
+    def get_list(self):
+        return self.list
+
+    def get_string(self):
+        return ' '.join(self.__CM.get_type(i) for i in self.list)
+
+    def get_off(self):
+        return self.offset
+
+class ProtoIdItem(object):
+    """
+        A view over one row of :class:`ProtoHIdItem`
+    """
+    __slots__ = ("__CM", "offset", "shorty_idx", "return_type_idx", "parameters_off")
+
+    def __init__(self, cm, proto_ids, idx):
+        self.__CM = cm
+        self.offset = proto_ids.get_off() + idx * PROTO_ID_ITEM._size
+
+        self.shorty_idx = proto_ids.shorty_idx[idx]
+        self.return_type_idx = proto_ids.return_type_idx[idx]
+        self.parameters_off = proto_ids.parameters_off[idx]
+
+    def get_shorty(self):
+        return self.__CM.get_string(self.shorty_idx)
+
+    def get_return_type(self):
+        return self.__CM.get_type(self.return_type_idx)
+
+    def get_parameters(self):
+        """
+            Return the types of the parameters
+
+            :rtype: a list of string
+        """
+        if self.parameters_off == 0:
+            return []
+        return [self.__CM.get_type(i) for i in self.__CM.get_type_list(self.parameters_off).get_list()]
+
+    def get_descriptor(self):
+        return "(%s)%s" % (' '.join(self.get_parameters()), self.get_return_type())
+
+    def get_off(self):
+        return self.offset
+
+class ProtoHIdItem(object):
+    """
+        The proto_ids section, kept as one array per field, a
+        :class:`ProtoIdItem` is only built by get()
+    """
+    def __init__(self, size, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+
+        self.shorty_idx, self.return_type_idx, self.parameters_off = read_columns(buff, PROTO_ID_ITEM, size)
+
+    def reload(self):
+        pass
+
+    def get_off(self):
+        return self.offset
+
+    def __len__(self):
+        return len(self.shorty_idx)
+
+    def get(self, idx):
+        if idx < 0 or idx >= len(self):
+            return None
+        return ProtoIdItem(self.__CM, self, idx)
+
+class FieldIdItem(object):
+    """
+        A view over one row of :class:`FieldHIdItem`
+    """
+    __slots__ = ("__CM", "offset", "class_idx", "type_idx", "name_idx")
+
+    def __init__(self, cm, field_ids, idx):
+        self.__CM = cm
+        self.offset = field_ids.get_off() + idx * FIELD_ID_ITEM._size
+
+        self.class_idx = field_ids.class_idx[idx]
+        self.type_idx = field_ids.type_idx[idx]
+        self.name_idx = field_ids.name_idx[idx]
+
+    def get_class_name(self):
+        return self.__CM.get_type(self.class_idx)
+
+    def get_type(self):
+        return self.__CM.get_type(self.type_idx)
+
+    def get_name(self):
+        return self.__CM.get_string(self.name_idx)
+
+    def get_list(self):
+        return [self.get_class_name(), self.get_type(), self.get_name()]
+
+    def get_off(self):
+        return self.offset
+
+class FieldHIdItem(object):
+    """
+        The field_ids section, kept as one array per field, a
+        :class:`FieldIdItem` is only built by get()
+    """
+    def __init__(self, size, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+
+        self.class_idx, self.type_idx, self.name_idx = read_columns(buff, FIELD_ID_ITEM, size)
+
+    def reload(self):
+        pass
+
+    def get_off(self):
+        return self.offset
+
+    def __len__(self):
+        return len(self.class_idx)
+
+    def get(self, idx):
+        if idx < 0 or idx >= len(self):
+            return None
+        return FieldIdItem(self.__CM, self, idx)
+
+class MethodIdItem(object):
+    """
+        A view over one row of :class:`MethodHIdItem`
+    """
+    __slots__ = ("__CM", "offset", "class_idx", "proto_idx", "name_idx")
+
+    def __init__(self, cm, method_ids, idx):
+        self.__CM = cm
+        self.offset = method_ids.get_off() + idx * METHOD_ID_ITEM._size
+
+        self.class_idx = method_ids.class_idx[idx]
+        self.proto_idx = method_ids.proto_idx[idx]
+        self.name_idx = method_ids.name_idx[idx]
+
+    def get_class_name(self):
+        return self.__CM.get_type(self.class_idx)
+
+    def get_proto(self):
+        return self.__CM.get_proto(self.proto_idx)
+
+    def get_descriptor(self):
+        proto = self.get_proto()
+        return "(%s)%s" % (proto[0], proto[1])
+
+    def get_name(self):
+        return self.__CM.get_string(self.name_idx)
+
+    def get_list(self):
+        return [self.get_class_name(), self.get_name(), self.get_proto()]
+
+    def get_off(self):
+        return self.offset
+
+class MethodHIdItem(object):
+    """
+        The method_ids section, kept as one array per field, a
+        :class:`MethodIdItem` is only built by get()
+    """
+    def __init__(self, size, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+
+        self.class_idx, self.proto_idx, self.name_idx = read_columns(buff, METHOD_ID_ITEM, size)
+
+    def reload(self):
+        pass
+
+    def get_off(self):
+        return self.offset
+
+    def __len__(self):
+        return len(self.class_idx)
+
+    def get(self, idx):
+        if idx < 0 or idx >= len(self):
+            return None
+        return MethodIdItem(self.__CM, self, idx)
+
+class EncodedField(object):
+    def __init__(self, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+
+        self.field_idx_diff = buff.read_uleb128()
+        self.access_flags = buff.read_uleb128()
+
+        self.field_idx = 0
+
+    def adjust_idx(self, val):
+        self.field_idx = self.field_idx_diff + val
+
+    def get_field_idx(self):
+        return self.field_idx
+
+    def get_class_name(self):
+        return self.__CM.get_field(self.field_idx)[0]
+
+    def get_descriptor(self):
+        return self.__CM.get_field(self.field_idx)[1]
+
+    def get_name(self):
+        return self.__CM.get_field(self.field_idx)[2]
+
+class EncodedMethod(object):
+    def __init__(self, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+
+        self.method_idx_diff = buff.read_uleb128()
+        self.access_flags = buff.read_uleb128()
+        self.code_off = buff.read_uleb128()
+
+        self.method_idx = 0
+
+    def adjust_idx(self, val):
+        self.method_idx = self.method_idx_diff + val
+
+    def get_method_idx(self):
+        return self.method_idx
+
+    def get_class_name(self):
+        return self.__CM.get_method_ref(self.method_idx).get_class_name()
+
+    def get_descriptor(self):
+        return self.__CM.get_method_ref(self.method_idx).get_descriptor()
+
+    def get_name(self):
+        return self.__CM.get_method_ref(self.method_idx).get_name()
+
+    def get_code(self):
+        """
+            Return the code of the method, decoded on the first call
+
+            :rtype: :class:`DalvikCode` or None for abstract and native methods
+        """
+        if self.code_off == 0:
+            return None
+        return self.__CM.get_code(self.code_off)
+
+class ClassDataItem(object):
+    """
+        A class_data_item: the fields and methods defined by a class
+    """
+    def __init__(self, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+
+        self.static_fields_size = buff.read_uleb128()
+        self.instance_fields_size = buff.read_uleb128()
+        self.direct_methods_size = buff.read_uleb128()
+        self.virtual_methods_size = buff.read_uleb128()
+
+        self.static_fields = self.__load(buff, EncodedField, self.static_fields_size)
+        self.instance_fields = self.__load(buff, EncodedField, self.instance_fields_size)
+        self.direct_methods = self.__load(buff, EncodedMethod, self.direct_methods_size)
+        self.virtual_methods = self.__load(buff, EncodedMethod, self.virtual_methods_size)
+
+    def __load(self, buff, cls, size):
+        # the indexes are stored as a difference with the previous one
+        items = []
+        prev = 0
+        for i in range(0, size):
+            item = cls(buff, self.__CM)
+            item.adjust_idx(prev)
+            prev = item.field_idx if cls is EncodedField else item.method_idx
+            items.append(item)
+        return items
+
+    def get_fields(self):
+        return self.static_fields + self.instance_fields
+
+    def get_methods(self):
+        return self.direct_methods + self.virtual_methods
+
+    def get_off(self):
+        return self.offset
+
+class ClassDefItem(object):
+    """
+        A class_def_item, its class_data_item is decoded the first time the
+        fields or methods are requested
+    """
+    def __init__(self, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+
+        self.class_idx, self.access_flags, self.superclass_idx, self.interfaces_off, \
+            self.source_file_idx, self.annotations_off, self.class_data_off, \
+            self.static_values_off = buff.read_record(CLASS_DEF_ITEM)
+
+        self.class_data_item = None
+
+    def get_name(self):
+        return self.__CM.get_type(self.class_idx)
+
+    def get_superclassname(self):
+        if self.superclass_idx == NO_INDEX:
+            return None
+        return self.__CM.get_type(self.superclass_idx)
+
+    def get_interfaces(self):
+        if self.interfaces_off == 0:
+            return []
+        return [self.__CM.get_type(i) for i in self.__CM.get_type_list(self.interfaces_off).get_list()]
+
+    def get_source(self):
+        if self.source_file_idx == NO_INDEX:
+            return None
+        return self.__CM.get_string(self.source_file_idx)
+
+    def get_class_data(self):
+        """
+            Return the class_data_item, decoded on the first call
+
+            :rtype: :class:`ClassDataItem` or None for a class without fields or methods
+        """
+        if self.class_data_item == None and self.class_data_off != 0:
+            buff = self.__CM.get_buff()
+            idx = buff.get_idx()
+            buff.set_idx(self.class_data_off)
+            self.class_data_item = ClassDataItem(buff, self.__CM)
+            buff.set_idx(idx)
+        return self.class_data_item
+
+    def get_fields(self):
+        class_data = self.get_class_data()
+        if class_data == None:
+            return []
+        return class_data.get_fields()
+
+    def get_methods(self):
+        class_data = self.get_class_data()
+        if class_data == None:
+            return []
+        return class_data.get_methods()
+
+    def get_off(self):
+        return self.offset
+
+class ClassHDefItem(object):
     def __init__(self, size, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+
+        self.class_def = [ClassDefItem(buff, cm) for i in range(0, size)]
+
+    def reload(self):
+        pass
+
+    def get_off(self):
+        return self.offset
 
+    def get_names(self):
+        return [i.get_name() for i in self.class_def]
 
 
+class RawItem(object):
+    """
+        A section this module doesn't decode, only its position is kept
+
+        :param size: the number of entries of the section
+        :param buff: a ByteCode positioned at the start of the section
+        :param cm: the ClassManager
+    """
+    def __init__(self, size, buff, cm):
+        self.__CM = cm
+        self.offset = buff.get_idx()
+        self.size = size
+
+    def reload(self):
+        pass
+
+    def get_off(self):
+        return self.offset
+
+    def __len__(self):
+        return self.size
+
 class MapItem(object):
     switcher = {
         0x0: ["TYPE_HEADER_ITEM", HeaderItem],
-        0x1: ["TYPE_STRING_ID_ITEM",],
-        0x2: ["TYPE_TYPE_ID_ITEM",],
-        0x3: ["TYPE_PROTO_ID_ITEM",],
-        0x4: ["TYPE_FIELD_ID_ITEM",],
-        0x5: ["TYPE_METHOD_ID_ITEM",],
-        0x6: ["TYPE_CLASS_DEF_ITEM",],
-        0x1000: ["TYPE_MAP_LIST",],
-        0x1001: ["TYPE_TYPE_LIST",],
-        0x1002: ["TYPE_ANNOTATION_SET_REF_LIST",],
-        0x1003: ["TYPE_ANNOTATION_SET_ITEM",],
-        0x2000: ["TYPE_CLASS_DATA_ITEM",],
-        0x2001: ["TYPE_CODE_ITEM",],
-        0x2002: ["TYPE_STRING_DATA_ITEM",],
-        0x2003: ["TYPE_DEBUG_INFO_ITEM",],
-        0x2004: ["TYPE_ANNOTATION_ITEM",],
-        0x2005: ["TYPE_ENCODED_ARRAY_ITEM",],
-        0x2006: ["TYPE_ANNOTATIONS_DIRECTORY_ITEM",]
+        0x1: ["TYPE_STRING_ID_ITEM", StringIdHItem],
+        0x2: ["TYPE_TYPE_ID_ITEM", TypeHIdItem],
+        0x3: ["TYPE_PROTO_ID_ITEM", ProtoHIdItem],
+        0x4: ["TYPE_FIELD_ID_ITEM", FieldHIdItem],
+        0x5: ["TYPE_METHOD_ID_ITEM", MethodHIdItem],
+        0x6: ["TYPE_CLASS_DEF_ITEM", ClassHDefItem],
+        0x1000: ["TYPE_MAP_LIST", None],
+        0x1001: ["TYPE_TYPE_LIST", RawItem],
+        0x1002: ["TYPE_ANNOTATION_SET_REF_LIST", RawItem],
+        0x1003: ["TYPE_ANNOTATION_SET_ITEM", RawItem],
+        0x2000: ["TYPE_CLASS_DATA_ITEM", RawItem],
+        0x2001: ["TYPE_CODE_ITEM", CodeItem],
+        0x2002: ["TYPE_STRING_DATA_ITEM", RawItem],
+        0x2003: ["TYPE_DEBUG_INFO_ITEM", RawItem],
+        0x2004: ["TYPE_ANNOTATION_ITEM", RawItem],
+        0x2005: ["TYPE_ENCODED_ARRAY_ITEM", RawItem],
+        0x2006: ["TYPE_ANNOTATIONS_DIRECTORY_ITEM", RawItem]
     }
 
     def __init__(self, buff, cm):
         self.__CM = cm
+        self.__buff = buff
 
         self.off = buff.get_idx()
 
-        self.type = unpack("=H", buff.read(2))[0]
-        self.unused = unpack("=H", buff.read(2))[0]
-        self.size = unpack("=I", buff.read(4))[0]
-        self.offset = unpack("=I", buff.read(4))[0]
+        self.type, self.unused, self.size, self.offset = buff.read_record(MAP_ITEM)
 
+        # the section itself is only decoded by get_item()
         self.item = None
 
-        buff.set_index(self.offset)
-
-        self.next(buff, cm)
-
     def reload(self):
         pass
 
+    def get_name(self):
+        return MapItem.switcher.get(self.type, ["TYPE_UNKNOWN"])[0]
+
+    def get_off(self):
+        return self.off
+
+    def is_loaded(self):
+        return self.item != None
+
+    def set_item(self, item):
+        self.item = item
+
+    def get_item(self):
+        """
+            Decode the section on the first call
+
+            :rtype: the object of the section
+        """
+        if self.item == None:
+            self.next(self.__buff, self.__CM)
+        return self.item
+
     def next(self, buff, cm):
-        self.item = MapItem.switcher[self.type][1](self.size, buff, cm)
+        parser = MapItem.switcher.get(self.type, [None, RawItem])[1]
+
+        idx = buff.get_idx()
+        buff.set_idx(self.offset)
+        self.item = parser(self.size, buff, cm)
+        buff.set_idx(idx)
 
 class MapList(object):
     def __init__(self, cm, off, buff):
         self.CM = cm
         buff.set_idx(off)
         self.offset = off
-        self.size = unpack("=I", buff.read( 4 ) )[0]
+        self.size = buff.read_u32()
         self.map_item = []
 
         for i in range(0, self.size):
-            idx = buff.get_idx()
-
             mi = MapItem(buff, self.CM)
             self.map_item.append(mi)
 
+            if mi.type == 0x1000:
+                mi.set_item(self)
+
             self.CM.add_type_item(mi)
 
         for i in self.map_item:
@@ -491,12 +1601,315 @@ class MapList(object):
     def reload(self):
         pass
 
+    def get_off(self):
+        return self.offset
+
+    def show(self):
+        print("Map List")
+        for i in self.map_item:
+            print("%-32s size=%-8d off=%08x %s" % (i.get_name(), i.size, i.offset, "loaded" if i.is_loaded() else ""))
+
+class ClassManager(object):
+    """
+        Index of the sections of a dex file
 
+        Every map item is indexed by its type and by its offset (a dict for exact
+        lookups and a sorted list of offsets to find the section containing any
+        offset). A section is only decoded the first time it is requested.
 
-class ClassManager():
-    def __init__(self):
-        pass
+        Decoded strings are kept in an LRU cache.
+
+        :param buff: the ByteCode of the whole dex file
+        :param stringCacheSize: the number of decoded strings to keep
+        :type stringCacheSize: int
+    """
+    def __init__(self, buff, stringCacheSize=STRING_CACHE_SIZE):
+        self.buff = buff
+
+        self.__strings = apk_utils.options.LRUCache(stringCacheSize)
+
+        self.__manage_item = {}
+        self.__item_by_offset = {}
+        self.__offsets = []
+        self.__map_items = []
+
+    def get_buff(self):
+        return self.buff
+
+    def add_type_item(self, mi):
+        """
+            Register a map item, its section is not decoded
+
+            :param mi: the map item
+            :type mi: :class:`MapItem`
+        """
+        self.__manage_item[mi.type] = mi
+        self.__item_by_offset[mi.offset] = mi
+
+        pos = bisect.bisect_right(self.__offsets, mi.offset)
+        self.__offsets.insert(pos, mi.offset)
+        self.__map_items.insert(pos, mi)
+
+    def get_map_item(self, type_item):
+        return self.__manage_item.get(type_item)
+
+    def get_item(self, type_item):
+        """
+            Return the decoded section of a given type
+
+            :param type_item: the type of the section (TYPE_ITEM)
+            :type type_item: int
+
+            :rtype: the object of the section or None
+        """
+        mi = self.__manage_item.get(type_item)
+        if mi == None:
+            return None
+        return mi.get_item()
+
+    def get_item_by_offset(self, offset):
+        """
+            Return the decoded section starting at offset
+
+            :rtype: the object of the section or None
+        """
+        mi = self.__item_by_offset.get(offset)
+        if mi == None:
+            return None
+        return mi.get_item()
+
+    def get_map_item_containing(self, offset):
+        """
+            Return the map item whose section contains offset
+
+            The section is assumed to run until the next one starts.
+
+            :rtype: :class:`MapItem` or None
+        """
+        pos = bisect.bisect_right(self.__offsets, offset) - 1
+        if pos < 0:
+            return None
+        return self.__map_items[pos]
+
+    def get_loaded_items(self):
+        return [mi for mi in self.__map_items if mi.is_loaded()]
+
+    def get_string(self, idx):
+        """
+            Return the string of the string_ids at idx, through the cache
+
+            :rtype: string
+        """
+        string = self.__strings.get(idx)
+        if string == None:
+            string = self.decode_string(idx)
+            self.__strings.put(idx, string)
+        return string
+
+    def decode_string(self, idx):
+        """
+            Decode the string of the string_ids at idx, the cache is bypassed
+
+            :rtype: string
+        """
+        string_ids = self.get_item(0x1)
+        if string_ids == None or idx < 0 or idx >= len(string_ids):
+            return "AG:IS: invalid string"
+
+        cur = self.buff.get_idx()
+        self.buff.set_idx(string_ids[idx])
+        utf16_size = self.buff.read_uleb128()
+        start = self.buff.get_idx()
+        self.buff.set_idx(cur)
+
+        # a utf-16 unit is encoded on 3 bytes at most
+        data = bytes(self.buff.get_buff()[start:start + 3 * utf16_size + 1])
+        end = data.find(b"\x00")
+        if end != -1:
+            data = data[:end]
+        return mutf8_decode(data)
+
+    def get_type(self, idx):
+        """
+            Return the descriptor of the type at idx
+
+            :rtype: string
+        """
+        type_ids = self.get_item(0x2)
+        if type_ids == None:
+            return "AG:ITI: invalid type"
+
+        _type = type_ids.get_type(idx)
+        if _type == NO_INDEX:
+            return "AG:ITI: invalid type"
+        return self.get_string(_type)
+
+    def get_type_list(self, off):
+        """
+            Return the type_list at off
+
+            :rtype: :class:`TypeList`
+        """
+        idx = self.buff.get_idx()
+        self.buff.set_idx(off)
+        type_list = TypeList(self.buff, self)
+        self.buff.set_idx(idx)
+        return type_list
+
+    def get_proto(self, idx):
+        """
+            Return the parameters and the return type of the prototype at idx
+
+            :rtype: a list of two strings
+        """
+        proto_ids = self.get_item(0x3)
+        if proto_ids == None or idx < 0 or idx >= len(proto_ids):
+            return ["AG:IPI: invalid proto", ""]
+
+        parameters_off = proto_ids.parameters_off[idx]
+        if parameters_off == 0:
+            parameters = ""
+        else:
+            parameters = self.get_type_list(parameters_off).get_string()
+        return [parameters, self.get_type(proto_ids.return_type_idx[idx])]
+
+    def get_field(self, idx):
+        """
+            Return the class name, the type and the name of the field at idx
+
+            :rtype: a list of three strings
+        """
+        field_ids = self.get_item(0x4)
+        if field_ids == None or idx < 0 or idx >= len(field_ids):
+            return ["AG:IFI: invalid field", "", ""]
+        return [self.get_type(field_ids.class_idx[idx]),
+                self.get_type(field_ids.type_idx[idx]),
+                self.get_string(field_ids.name_idx[idx])]
+
+    def get_method_ref(self, idx):
+        """
+            Return the method_id_item at idx
+
+            :rtype: :class:`MethodIdItem` or None
+        """
+        method_ids = self.get_item(0x5)
+        if method_ids == None:
+            return None
+        return method_ids.get(idx)
+
+    def get_method(self, idx):
+        """
+            Return the class name, the name and the prototype of the method at idx
+
+            :rtype: a list
+        """
+        method = self.get_method_ref(idx)
+        if method == None:
+            return ["AG:IMI: invalid method", "", ["", ""]]
+        return method.get_list()
+
+    def get_code(self, off):
+        """
+            Return the code_item at off, decoded on the first call
+
+            :rtype: :class:`DalvikCode` or None
+        """
+        code_items = self.get_item(0x2001)
+        if code_items == None:
+            return None
+        return code_items.get_code(off)
+
+class DalvikVMFormat(object):
+    """
+        A dex file
 
-class DalvikVMFormat():
-    def __init__(self):
-        pass
\ No newline at end of file
+        Only the header and the map_list are parsed when the object is built,
+        every other section is decoded the first time one of the accessors
+        needs it.
+
+        :param fileInfo: the dex file
+        :type fileInfo: :class:`File`
+        :param stringCacheSize: the number of decoded strings to keep (None for no bound)
+        :type stringCacheSize: int
+    """
+    def __init__(self, fileInfo, stringCacheSize=STRING_CACHE_SIZE):
+        self.__fileInfo = fileInfo
+
+        self.buff = apk_utils.options.ByteCode(fileInfo.getRawBinary())
+        self.CM = ClassManager(self.buff, stringCacheSize)
+
+        self.header = HeaderItem(0, self.buff, self.CM)
+        self.map_list = MapList(self.CM, self.header.map_off, self.buff)
+
+        mi = self.CM.get_map_item(0x0)
+        if mi != None:
+            mi.set_item(self.header)
+
+    def get_class_manager(self):
+        return self.CM
+
+    def get_header_item(self):
+        return self.header
+
+    def get_map_list(self):
+        return self.map_list
+
+    def get_strings(self):
+        """
+            Return every string of the dex file, the cache is bypassed so a
+            full scan doesn't evict the strings in use
+
+            :rtype: a list of string
+        """
+        return [self.CM.decode_string(i) for i in range(0, self.header.string_ids_size)]
+
+    def get_string(self, idx):
+        return self.CM.get_string(idx)
+
+    def get_types(self):
+        return [self.CM.get_type(i) for i in range(0, self.header.type_ids_size)]
+
+    def get_protos(self):
+        proto_ids = self.CM.get_item(0x3)
+        if proto_ids == None:
+            return []
+        return [proto_ids.get(i) for i in range(0, len(proto_ids))]
+
+    def get_fields(self):
+        field_ids = self.CM.get_item(0x4)
+        if field_ids == None:
+            return []
+        return [field_ids.get(i) for i in range(0, len(field_ids))]
+
+    def get_methods(self):
+        method_ids = self.CM.get_item(0x5)
+        if method_ids == None:
+            return []
+        return [method_ids.get(i) for i in range(0, len(method_ids))]
+
+    def get_classes(self):
+        """
+            Return the class_def_items
+
+            :rtype: a list of :class:`ClassDefItem`
+        """
+        class_defs = self.CM.get_item(0x6)
+        if class_defs == None:
+            return []
+        return class_defs.class_def
+
+    def get_classes_names(self):
+        return [i.get_name() for i in self.get_classes()]
+
+    def get_class(self, name):
+        for i in self.get_classes():
+            if i.get_name() == name:
+                return i
+        return None
+
+    def get_code(self, off):
+        return self.CM.get_code(off)
+
+    def show(self):
+        self.header.show()
+        self.map_list.show()
\ No newline at end of file
@@ -1,5 +1,14 @@
+import mmap
+import os
+import sys
+import time
 import struct
+from array import array
+from collections import namedtuple
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
 from binascii import unhexlify
+from apk_utils.options import record
 
 def printHex(arr):
     res = ''
@@ -10,22 +19,386 @@ def printHex(arr):
 def toLong(arr):
     if arr == b'\xff\xff\xff\xff':
         return -1
-    return struct.unpack('L', bytes(arr))[0]
+    return struct.unpack('<I', bytes(arr))[0]
+
+# fixed layouts of the binary XML chunks, string indexes are signed so that
+# an absent reference (0xffffffff) decodes as -1
+CHUNK_HEADER = record("CHUNK_HEADER", [
+    ("type", "I"),
+    ("size", "I"),
+])
+
+STRING_CHUNK = record("STRING_CHUNK", [
+    ("type", "I"),
+    ("size", "I"),
+    ("stringCount", "I"),
+    ("styleCount", "I"),
+    ("flags", "I"),
+    ("stringsStart", "I"),
+    ("stylesStart", "I"),
+])
+
+NAMESPACE_CHUNK = record("NAMESPACE_CHUNK", [
+    ("type", "I"),
+    ("size", "I"),
+    ("lineNumber", "I"),
+    ("comment", "i"),
+    ("prefix", "i"),
+    ("uri", "i"),
+])
+
+START_TAG_CHUNK = record("START_TAG_CHUNK", [
+    ("type", "I"),
+    ("size", "I"),
+    ("lineNumber", "I"),
+    ("comment", "i"),
+    ("namespaceUri", "i"),
+    ("name", "i"),
+    ("attributeStart", "H"),
+    ("attributeSize", "H"),
+    ("attributeCount", "H"),
+    ("idIndex", "H"),
+    ("classIndex", "H"),
+    ("styleIndex", "H"),
+])
+
+END_TAG_CHUNK = record("END_TAG_CHUNK", [
+    ("type", "I"),
+    ("size", "I"),
+    ("lineNumber", "I"),
+    ("comment", "i"),
+    ("namespaceUri", "i"),
+    ("name", "i"),
+])
+
+TEXT_CHUNK = record("TEXT_CHUNK", [
+    ("type", "I"),
+    ("size", "I"),
+    ("lineNumber", "I"),
+    ("comment", "i"),
+    ("name", "i"),
+])
+
+ATTRIBUTE = record("ATTRIBUTE", [
+    ("namespaceUri", "i"),
+    ("name", "i"),
+    ("valueString", "i"),
+    ("size", "H"),
+    ("res0", "B"),
+    ("dataType", "B"),
+    ("data", "I"),
+])
+
+UTF8_FLAG = 0x100
+
+# the fixed part every known chunk must hold
+CHUNK_RECORDS = {
+    0x001c0001: STRING_CHUNK,
+    0x00080180: CHUNK_HEADER,
+    0x00100100: NAMESPACE_CHUNK,
+    0x00100101: NAMESPACE_CHUNK,
+    0x00100102: START_TAG_CHUNK,
+    0x00100103: END_TAG_CHUNK,
+    0x00100104: TEXT_CHUNK,
+}
+
+class ParseError(Exception):
+    """
+        A binary XML file that breaks its own layout or the parse budget
+
+        :param reason: what went wrong
+        :type reason: string
+        :param offset: the offset of the chunk being parsed
+        :type offset: int
+        :param limit: the limit of the budget that was exceeded
+        :type limit: int
+    """
+    def __init__(self, reason, offset=None, limit=None):
+        self.reason = reason
+        self.offset = offset
+        self.limit = limit
+
+        message = reason
+        if offset is not None:
+            message += " (chunk at %#x)" % offset
+        if limit is not None:
+            message += " (limit %s)" % limit
+        Exception.__init__(self, message)
+
+class ParseBudget:
+    """
+        Per-file limits for parsing untrusted binary XML
+
+        Every count declared by the file is checked against what the chunk can
+        hold and against the budget before anything is allocated, the first
+        violation raises a :class:`ParseError`.
+
+        :param maxChunks: the number of chunks
+        :param maxStrings: the number of strings of the string pool
+        :param maxAttributes: the number of attributes of the whole file
+        :param maxSeconds: the wall time of a parse
+    """
+    def __init__(self, maxChunks=200000, maxStrings=500000, maxAttributes=1000000, maxSeconds=10.0):
+        self.maxChunks = maxChunks
+        self.maxStrings = maxStrings
+        self.maxAttributes = maxAttributes
+        self.maxSeconds = maxSeconds
+        self.start()
+
+    def start(self):
+        self.chunks = 0
+        self.strings = 0
+        self.attributes = 0
+        self.offset = None
+        self.__deadline = time.monotonic() + self.maxSeconds
+
+    def fail(self, reason, limit=None):
+        raise ParseError(reason, self.offset, limit)
+
+    def chargeChunk(self, offset):
+        self.offset = offset
+        self.chunks += 1
+        if self.chunks > self.maxChunks:
+            self.fail("too many chunks", self.maxChunks)
+        if time.monotonic() > self.__deadline:
+            self.fail("parse took too long", self.maxSeconds)
+
+    def chargeStrings(self, count):
+        self.strings += count
+        if self.strings > self.maxStrings:
+            self.fail("too many strings", self.maxStrings)
+
+    def chargeAttributes(self, count):
+        self.attributes += count
+        if self.attributes > self.maxAttributes:
+            self.fail("too many attributes", self.maxAttributes)
+
+# types of the typed values (Res_value)
+TYPE_NULL       = 0x00
+TYPE_REFERENCE  = 0x01
+TYPE_ATTRIBUTE  = 0x02
+TYPE_STRING     = 0x03
+TYPE_FLOAT      = 0x04
+TYPE_DIMENSION  = 0x05
+TYPE_FRACTION   = 0x06
+TYPE_INT_DEC    = 0x10
+TYPE_INT_HEX    = 0x11
+TYPE_INT_BOOLEAN = 0x12
+TYPE_FIRST_COLOR_INT = 0x1c
+TYPE_LAST_COLOR_INT  = 0x1f
+
+DIMENSION_UNITS = ["px", "dip", "sp", "pt", "in", "mm"]
+FRACTION_UNITS  = ["%", "%p"]
+RADIX_MULTS     = [0.00390625, 3.051758E-005, 1.192093E-007, 4.656613E-010]
+
+_F32 = struct.Struct("<f")
+
+def _toSigned(data):
+    return data - 0x100000000 if data & 0x80000000 else data
+
+def _toFloat(data):
+    return _F32.unpack(data.to_bytes(4, "little"))[0]
+
+def _complexToFloat(data):
+    return _toSigned(data & 0xffffff00) * RADIX_MULTS[(data >> 4) & 3]
+
+def _unit(units, data):
+    return units[data & 0xf] if (data & 0xf) < len(units) else ""
+
+def _poolString(data, strTable):
+    # a forged index is absent as in getString(), a pool parsed with a budget
+    # fails on it before the IndexError
+    if strTable is None:
+        return None
+    try:
+        return strTable[data]
+    except IndexError:
+        return None
+
+# typed value -> python value, every entry takes (data, strTable)
+VALUE_DECODERS = {
+    TYPE_NULL:        lambda data, strTable: None,
+    TYPE_REFERENCE:   lambda data, strTable: data,
+    TYPE_ATTRIBUTE:   lambda data, strTable: data,
+    TYPE_STRING:      _poolString,
+    TYPE_FLOAT:       lambda data, strTable: _toFloat(data),
+    TYPE_DIMENSION:   lambda data, strTable: _complexToFloat(data),
+    TYPE_FRACTION:    lambda data, strTable: _complexToFloat(data),
+    TYPE_INT_DEC:     lambda data, strTable: _toSigned(data),
+    TYPE_INT_HEX:     lambda data, strTable: data,
+    TYPE_INT_BOOLEAN: lambda data, strTable: data != 0,
+}
+
+# typed value -> text as aapt prints it, every entry takes (data, strTable)
+VALUE_FORMATTERS = {
+    TYPE_REFERENCE:   lambda data, strTable: "@%08x" % data,
+    TYPE_ATTRIBUTE:   lambda data, strTable: "?%08x" % data,
+    TYPE_STRING:      lambda data, strTable: _poolString(data, strTable) or "",
+    TYPE_FLOAT:       lambda data, strTable: str(_toFloat(data)),
+    TYPE_DIMENSION:   lambda data, strTable: "%g%s" % (_complexToFloat(data), _unit(DIMENSION_UNITS, data)),
+    TYPE_FRACTION:    lambda data, strTable: "%g%s" % (_complexToFloat(data) * 100, _unit(FRACTION_UNITS, data)),
+    TYPE_INT_DEC:     lambda data, strTable: str(_toSigned(data)),
+    TYPE_INT_HEX:     lambda data, strTable: "0x%08x" % data,
+    TYPE_INT_BOOLEAN: lambda data, strTable: "true" if data != 0 else "false",
+}
+
+for _type in range(TYPE_FIRST_COLOR_INT, TYPE_LAST_COLOR_INT + 1):
+    VALUE_DECODERS[_type] = lambda data, strTable: data
+    VALUE_FORMATTERS[_type] = lambda data, strTable: "#%08x" % data
+
+def _rawValue(data, strTable):
+    return data
+
+def _rawText(data, strTable):
+    return "0x%x" % data
+
+def decodeValue(valueType, data, strTable=None):
+    """
+        Return a typed value as a python value: an int, a bool, a float, a
+        string or None (a reference is its resource id)
+
+        :param valueType: the type of the value (TYPE_*)
+        :type valueType: int
+        :param data: the raw 32 bits of the value
+        :type data: int
+        :param strTable: the string pool, for TYPE_STRING
+        :type strTable: :class:`StringPool`
+    """
+    return VALUE_DECODERS.get(valueType, _rawValue)(data, strTable)
+
+def formatValue(valueType, data, strTable=None):
+    """
+        Return the text of a typed value as aapt prints it
+
+        :param valueType: the type of the value (TYPE_*)
+        :type valueType: int
+        :param data: the raw 32 bits of the value
+        :type data: int
+        :param strTable: the string pool, for TYPE_STRING
+        :type strTable: :class:`StringPool`
+
+        :rtype: string
+    """
+    return VALUE_FORMATTERS.get(valueType, _rawText)(data, strTable)
+
+class StringPool:
+    """
+        The string pool of a binary XML file
+
+        The offsets are read in one pass, a string is only decoded the first
+        time it is requested, with a single codec call over its stored length.
+
+        :param rawChunk: the string chunk
+        :type rawChunk: memoryview
+        :param budget: the limits to enforce, the declared count is only clamped to the chunk without it
+        :type budget: :class:`ParseBudget`
+    """
+    def __init__(self, rawChunk, budget=None):
+        head = STRING_CHUNK._unpack_from(rawChunk)
+        self.__chunk = rawChunk
+        self.__budget = budget
+        self.__isUtf8 = bool(head.flags & UTF8_FLAG)
+        self.__stringsStart = head.stringsStart
+
+        count = head.stringCount
+        fits = (len(rawChunk) - STRING_CHUNK._size) // 4
+        if budget is not None:
+            if count > fits or head.stringsStart > len(rawChunk):
+                budget.fail("string count %d doesn't fit in the chunk" % count)
+            budget.chargeStrings(count)
+        elif count > fits:
+            # clamped to the offsets the chunk actually holds
+            count = fits
+
+        self.__offsets = array('I')
+        self.__offsets.frombytes(rawChunk[STRING_CHUNK._size:STRING_CHUNK._size + 4 * count])
+        if sys.byteorder != "little":
+            self.__offsets.byteswap()
+
+        self.__strings = [None] * len(self.__offsets)
+
+    def isUtf8(self):
+        return self.__isUtf8
+
+    def __len__(self):
+        return len(self.__offsets)
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < len(self.__strings):
+            if self.__budget is not None:
+                self.__budget.fail("string index %d out of range" % idx)
+            raise IndexError("string index %d out of range" % idx)
+
+        string = self.__strings[idx]
+        if string is None:
+            string = self.__decode(self.__stringsStart + self.__offsets[idx])
+            self.__strings[idx] = string
+        return string
+
+    def __iter__(self):
+        for i in range(0, len(self)):
+            yield self[i]
+
+    def __decode(self, off):
+        chunk = self.__chunk
+        try:
+            if self.__isUtf8:
+                # the length in utf-16 units then in bytes, each on one or two bytes
+                off += 2 if chunk[off] & 0x80 else 1
+                size = chunk[off]
+                if size & 0x80:
+                    size = ((size & 0x7f) << 8) | chunk[off + 1]
+                    off += 2
+                else:
+                    off += 1
+            else:
+                # the length in utf-16 units on one or two shorts
+                size = chunk[off] | (chunk[off + 1] << 8)
+                off += 2
+                if size & 0x8000:
+                    size = ((size & 0x7fff) << 16) | chunk[off] | (chunk[off + 1] << 8)
+                    off += 2
+                size *= 2
+        except IndexError:
+            if self.__budget is not None:
+                self.__budget.fail("string at %#x outside of the chunk" % off)
+            return None
+
+        if off + size > len(chunk) and self.__budget is not None:
+            self.__budget.fail("string at %#x overflows the chunk" % off)
+        return bytes(chunk[off:off + size]).decode("utf-8" if self.__isUtf8 else "utf-16-le", "replace")
 
 class File:
-    def __init__(self, filePath):
-        self.__fileName  = filePath.split("\\")[-1]
+    def __init__(self, filePath, useMmap=False, rawBinary=None):
+        self.__fileName  = filePath.split("\\")[-1].split("/")[-1]
         self.__filePath = filePath
         self.__rawBinary    = None
-        
+        self.__mmap = None
+
+        # the content is already in memory, e.g. an entry served by an APK
+        if rawBinary is not None:
+            self.__rawBinary = rawBinary
+            return
+
         try:
             fd = open(self.__filePath, "rb")
-            self.__rawBinary = fd.read()
+            if useMmap:
+                self.__rawBinary = self.__map(fd)
+            else:
+                self.__rawBinary = fd.read()
             fd.close()
         except:
             print("[Error] Can't open the binary or binary not found")
             return None
 
+    def __map(self, fd):
+        # an empty file can't be mapped, fall back to a plain read
+        try:
+            self.__mmap = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return fd.read()
+        return memoryview(self.__mmap)
+
     def getFileName(self):
         return self.__fileName
 
@@ -35,15 +408,341 @@ class File:
     def getRawBinary(self):
         return self.__rawBinary
 
+    def isMapped(self):
+        return self.__mmap is not None
+
+    def close(self):
+        if self.__mmap is not None:
+            self.__rawBinary.release()
+            try:
+                self.__mmap.close()
+            except BufferError:
+                # parsers still hold views over the mapping, it is unmapped
+                # once the last of them goes away
+                pass
+            self.__mmap = None
+        self.__rawBinary = None
+
+# the decoded chunks, every string is already resolved (None when absent)
+StartNamespace = namedtuple("StartNamespace", ["lineNumber", "prefix", "uri"])
+EndNamespace   = namedtuple("EndNamespace", ["lineNumber", "prefix", "uri"])
+StartTag       = namedtuple("StartTag", ["lineNumber", "namespaceUri", "name", "attributes"])
+EndTag         = namedtuple("EndTag", ["lineNumber", "namespaceUri", "name"])
+Text           = namedtuple("Text", ["lineNumber", "text"])
+UnknownChunk   = namedtuple("UnknownChunk", ["type", "size"])
+Attribute      = namedtuple("Attribute", ["namespaceUri", "name", "valueString", "type", "data", "value"])
+
+class ManifestResult:
+    """
+        What AndroidManifest.analyze decoded
+
+        `chunks` holds the decoded chunks in the order of the file, `root` is
+        the same document as an :class:`xml.etree.ElementTree.Element` whose
+        namespaced attributes are named "{uri}name".
+    """
+    def __init__(self):
+        self.magic = 0
+        self.fileSize = 0
+        self.strings = []
+        self.resourceIds = []
+        self.namespaces = {}
+        self.chunks = []
+        self.root = None
+
+    def getAttributeValue(self, attr):
+        """
+            Return the text of an attribute: its raw string or its formatted typed value
+
+            :rtype: string
+        """
+        if attr.valueString is not None:
+            return attr.valueString
+        return formatValue(attr.type, attr.data, self.strings)
+
+    def show(self):
+        """
+            Print every decoded chunk
+        """
+        print("Magic num: " + hex(self.magic))
+        print("File Size: " + str(self.fileSize))
+
+        print("String Count: " + str(len(self.strings)))
+        for string in self.strings:
+            print("Str: " + string)
+
+        for id in self.resourceIds:
+            print("id: " + str(id) + " hex: " + "0x%08x" % id)
+
+        for chunk in self.chunks:
+            if isinstance(chunk, StartNamespace):
+                print("Start Namespace line %d: %s=%s" % (chunk.lineNumber, chunk.prefix, chunk.uri))
+            elif isinstance(chunk, EndNamespace):
+                print("End Namespace line %d: %s=%s" % (chunk.lineNumber, chunk.prefix, chunk.uri))
+            elif isinstance(chunk, StartTag):
+                print("Start Tag line %d: %s" % (chunk.lineNumber, self.__qualify(chunk.namespaceUri, chunk.name)))
+                for attr in chunk.attributes:
+                    print("    %s=%s (type 0x%02x, data 0x%08x)" % (self.__qualify(attr.namespaceUri, attr.name),
+                                                                    self.getAttributeValue(attr), attr.type, attr.data))
+            elif isinstance(chunk, EndTag):
+                print("End Tag line %d: %s" % (chunk.lineNumber, self.__qualify(chunk.namespaceUri, chunk.name)))
+            elif isinstance(chunk, Text):
+                print("Text line %d: %s" % (chunk.lineNumber, chunk.text))
+            else:
+                print("Unkonw Chunk! type %#x, %d bytes" % (chunk.type, chunk.size))
+
+    def __qualify(self, uri, name):
+        if uri is None:
+            return name
+        return self.namespaces.get(uri, uri) + ":" + name
+
+def _attributeText(attr):
+    # the raw string if any, a TYPE_STRING value is already resolved against
+    # the string pool by the parser, the other types don't need it
+    if attr.valueString is not None:
+        return attr.valueString
+    if attr.type == TYPE_STRING:
+        return attr.value if attr.value is not None else ""
+    return VALUE_FORMATTERS.get(attr.type, _rawText)(attr.data, None)
+
+class XmlWriter:
+    """
+        Serialize the events of :meth:`AndroidManifest.iterEvents` as XML text
+
+        Every event is written as soon as it is received, a start tag is only
+        held back until the next event tells if the element is empty. The
+        namespaces declared by the start namespace events are put on the next
+        start tag.
+
+        :param out: a text file object
+    """
+    INDENT = "    "
+
+    def __init__(self, out):
+        self.__out = out
+        self.__depth = 0
+        self.__pendingOpen = False
+        self.__pendingNamespaces = []
+        self.__prefixes = {}
+        self.__generated = 0
+
+        self.__out.write('<?xml version="1.0" encoding="utf-8"?>\n')
+
+    def write(self, event):
+        if isinstance(event, StartNamespace):
+            self.__prefixes[event.uri] = event.prefix
+            self.__pendingNamespaces.append(event)
+
+        elif isinstance(event, EndNamespace):
+            if self.__prefixes.get(event.uri) == event.prefix:
+                del self.__prefixes[event.uri]
+
+        elif isinstance(event, StartTag):
+            self.__closePending(">\n")
+
+            indent = self.INDENT * (self.__depth + 1)
+            name = self.__qualify(event.namespaceUri, event.name)
+
+            attributes = []
+            for attr in event.attributes:
+                attributes.append('\n%s%s="%s"' % (indent, self.__qualify(attr.namespaceUri, attr.name), self.__escapeAttr(_attributeText(attr))))
+
+            # after the names are qualified, they may have declared a namespace
+            parts = [self.INDENT * self.__depth, "<", name]
+            for ns in self.__pendingNamespaces:
+                parts.append('\n%sxmlns:%s="%s"' % (indent, ns.prefix, self.__escapeAttr(ns.uri)))
+            self.__pendingNamespaces = []
+
+            parts.extend(attributes)
+            self.__out.write("".join(parts))
+
+            self.__pendingOpen = True
+            self.__depth += 1
+
+        elif isinstance(event, EndTag):
+            self.__depth -= 1
+            if self.__pendingOpen:
+                self.__pendingOpen = False
+                self.__out.write("/>\n")
+            else:
+                self.__out.write("%s</%s>\n" % (self.INDENT * self.__depth, self.__qualify(event.namespaceUri, event.name)))
+
+        elif isinstance(event, Text):
+            if event.text is not None:
+                self.__closePending(">\n")
+                self.__out.write("%s%s\n" % (self.INDENT * self.__depth, escape(event.text)))
+
+    def __closePending(self, end):
+        if self.__pendingOpen:
+            self.__pendingOpen = False
+            self.__out.write(end)
+
+    def __qualify(self, uri, name):
+        if uri is None:
+            return name
+        prefix = self.__prefixes.get(uri)
+        if prefix is None:
+            # a namespace nobody declared, declare it on the spot under a
+            # prefix the file doesn't use
+            inUse = set(self.__prefixes.values())
+            prefix = "ns%d" % self.__generated
+            while prefix in inUse:
+                self.__generated += 1
+                prefix = "ns%d" % self.__generated
+            self.__generated += 1
+            self.__prefixes[uri] = prefix
+            self.__pendingNamespaces.append(StartNamespace(0, prefix, uri))
+        return prefix + ":" + name
+
+    @staticmethod
+    def __escapeAttr(value):
+        return escape(value, {'"': "&quot;", "\n": "&#10;", "\t": "&#9;"})
+
+# resource ids of the android: attributes read by the summary
+ATTR_NAME               = 0x01010003
+ATTR_EXPORTED           = 0x01010010
+ATTR_MIN_SDK_VERSION    = 0x0101020c
+ATTR_TARGET_SDK_VERSION = 0x01010270
+ATTR_VERSION_CODE       = 0x0101021b
+ATTR_VERSION_NAME       = 0x0101021c
+
+SUMMARY_ATTRIBUTES = {
+    ATTR_NAME: "name",
+    ATTR_EXPORTED: "exported",
+    ATTR_MIN_SDK_VERSION: "minSdkVersion",
+    ATTR_TARGET_SDK_VERSION: "targetSdkVersion",
+    ATTR_VERSION_CODE: "versionCode",
+    ATTR_VERSION_NAME: "versionName",
+}
+
+# the typed fields of the summary, every entry takes (dataType, data, text)
+# where text is the raw string of the attribute or None: the typed value wins,
+# a raw string is only parsed when the value is a string, and a reference
+# (e.g. @bool/exported) can't be known without the resource table
+def _summaryBool(dataType, data, text):
+    if dataType == TYPE_INT_BOOLEAN:
+        return data != 0
+    if dataType == TYPE_STRING and text is not None:
+        return {"true": True, "false": False}.get(text.strip().lower())
+    return None
+
+def _summaryInt(dataType, data, text):
+    if dataType == TYPE_INT_DEC:
+        return _toSigned(data)
+    if dataType == TYPE_INT_HEX:
+        return data
+    if dataType == TYPE_STRING and text is not None:
+        try:
+            return int(text.strip())
+        except ValueError:
+            return None
+    return None
+
+SUMMARY_DECODERS = {
+    "exported": _summaryBool,
+    "versionCode": _summaryInt,
+    "minSdkVersion": _summaryInt,
+    "targetSdkVersion": _summaryInt,
+}
+
+# names of the framework attributes (android.R.attr), an attribute whose
+# resource id is here is named from it rather than from the string pool, which
+# obfuscators are free to mangle
+ANDROID_ATTRIBUTE_NAMES = dict(enumerate([
+    "theme", "label", "icon", "name", "manageSpaceActivity", "allowClearUserData",
+    "permission", "readPermission", "writePermission", "protectionLevel",
+    "permissionGroup", "sharedUserId", "hasCode", "persistent", "enabled",
+    "debuggable", "exported", "process", "taskAffinity", "multiprocess",
+    "finishOnTaskLaunch", "clearTaskOnLaunch", "stateNotNeeded", "excludeFromRecents",
+    "authorities", "syncable", "initOrder", "grantUriPermissions", "priority",
+    "launchMode", "screenOrientation", "configChanges", "description",
+    "targetPackage", "handleProfiling", "functionalTest", "value", "resource",
+    "mimeType", "scheme", "host", "port", "path", "pathPrefix", "pathPattern",
+    "action", "data", "targetClass",
+], 0x01010000))
+ANDROID_ATTRIBUTE_NAMES.update(SUMMARY_ATTRIBUTES)
+ANDROID_ATTRIBUTE_NAMES.update({
+    0x01010271: "maxSdkVersion",
+    0x01010272: "testOnly",
+    0x01010280: "allowBackup",
+    0x01010281: "glEsVersion",
+    0x0101028e: "required",
+    0x010102b7: "installLocation",
+    0x010104ea: "extractNativeLibs",
+    0x010104ec: "usesCleartextTraffic",
+    0x01010527: "networkSecurityConfig",
+    0x0101052c: "roundIcon",
+})
+
+COMPONENT_TAGS = ("activity", "activity-alias", "service", "receiver", "provider")
+PERMISSION_TAGS = ("uses-permission", "uses-permission-sdk-23")
+
+class ManifestSummary:
+    """
+        The fields of a manifest most queries need
+
+        `exported` holds (tag, name) for every component which is exported,
+        either explicitly or, without an android:exported attribute, because
+        it has an intent-filter. An android:exported given as a reference to
+        a resource can't be known and counts as absent.
+
+        versionCode and the sdk versions are ints (None when absent or not a
+        number).
+    """
+    def __init__(self):
+        self.package = None
+        self.versionCode = None
+        self.versionName = None
+        self.minSdkVersion = None
+        self.targetSdkVersion = None
+        self.permissions = []
+        self.exported = []
+
+    def show(self):
+        print("package: %s" % self.package)
+        print("versionCode: %s, versionName: %s" % (self.versionCode, self.versionName))
+        print("minSdkVersion: %s, targetSdkVersion: %s" % (self.minSdkVersion, self.targetSdkVersion))
+        for permission in self.permissions:
+            print("uses-permission: %s" % permission)
+        for tag, name in self.exported:
+            print("exported %s: %s" % (tag, name))
+
 class AndroidManifest:
-    def __init__(self, fileInfo):
+    """
+        A binary XML file (AndroidManifest.xml or a compiled layout)
+
+        iterEvents() decodes the file as a stream of events, analyze() collects
+        them in a :class:`ManifestResult` which is printed unless quiet is set.
+
+        With a budget, any size or count the file declares is checked before it
+        is used and the first violation raises a :class:`ParseError`.
+
+        :param fileInfo: the binary XML file
+        :type fileInfo: :class:`File`
+        :param budget: the limits for an untrusted file
+        :type budget: :class:`ParseBudget`
+    """
+    def __init__(self, fileInfo, budget=None):
         self.__fileInfo = fileInfo
+        self.budget = budget
+        self.magic = 0
+        self.fileSize = 0
         self.strTable = []
+        self.resourceIds = array('I')
         self.namespaceMap = {}
+        self.result = None
+        self.__attributeIndex = None
+
+    def iterEvents(self):
+        """
+            Decode the file chunk by chunk
 
-    def analyze(self):
-        outFile = self.__fileInfo.getFilePath().replace("AroidManifest", "out.xml")
+            The string pool and the resource ids are kept on the object, every
+            other chunk is yielded as soon as it is read so a consumer can stop
+            at any point and nothing else is accumulated.
 
+            :rtype: a generator of :class:`StartNamespace`, :class:`StartTag`, :class:`Text`,
+                    :class:`EndTag`, :class:`EndNamespace` and :class:`UnknownChunk`
+        """
         rawChunk = self.__fileInfo.getRawBinary()
 
         switcher = {
@@ -57,270 +756,441 @@ class AndroidManifest:
         }
 
         self.readHead(rawChunk)
-        rawChunk = rawChunk[8:]
 
-        while 1:
-            if not rawChunk:
-                break
-            start2End = toLong(rawChunk[4:8])
-            headTag = rawChunk[0:4]
-            switcher.get(toLong(headTag), self.readBreak)(rawChunk)
-            rawChunk = rawChunk[start2End:]
+        for chunkType, chunk in self.iterChunks(rawChunk, budget=self.budget):
+            event = switcher.get(chunkType, self.readBreak)(chunk)
+            if event is not None:
+                yield event
 
-    def readHead(self, rawBinary):
-        head = [rawBinary[:4], rawBinary[4:8]]
-        print("Magic num: " + printHex(head[0]))
-        print("File Size: " + str(toLong(head[1])))
+    def analyze(self, quiet=False, outFile=None):
+        """
+            Decode the whole file
 
-    def readStringChunk(self, rawBinary):
-        chunkSize = rawBinary[4:8]
-        chunkSize = toLong(chunkSize)
-        strCount = toLong(rawBinary[8:12])
-        offset = toLong(rawBinary[20:24]) + 8
-        offOfEachStr = []
-
-        print("String Chunk Type: " + printHex(rawBinary[0:4]))
-        print("String Chunk Size: " + str(chunkSize))
-        print("String Count: " + str(strCount))
-        print("Style Count: " + printHex(rawBinary[12:16]))
-        print("Unknow: " + printHex(rawBinary[16:20]))
-        print("String Start: " + str(hex(offset)))
-
-        for i in range(0, strCount):
-            offOfEachStr.append(rawBinary[28+4*i:32+4*i])
-
-        for i in range(0, strCount):
-            string = ''
-            startOffset = offset + toLong(offOfEachStr[i]) - 8
-            chrOffset = startOffset + 2
-            while rawBinary[chrOffset] != 0:
-                string += chr(rawBinary[chrOffset])
-                chrOffset += 2
-            print("Str: " + string)
-            self.strTable.append(string)
+            :param quiet: don't print the result
+            :type quiet: bool
+            :param outFile: also write the document as XML text to this path, in the same pass
+            :type outFile: string
 
+            :rtype: :class:`ManifestResult`
+        """
+        result = ManifestResult()
 
-    def readResourceIdChunk(self, rawBinary):
-        chunkSize = rawBinary[4:8]
-        chunkSize = toLong(chunkSize)
+        if outFile is None:
+            self.__collect(result, None)
+        else:
+            # a file that can't be opened was never created, only a parse
+            # failure has a truncated document to remove
+            with open(outFile, "w", encoding="utf-8") as out:
+                try:
+                    self.__collect(result, XmlWriter(out))
+                except Exception:
+                    out.close()
+                    os.remove(outFile)
+                    raise
 
-        print("ResourceId Chunk Type: " + printHex(rawBinary[0:4]))
-        print("ResourceId Chunk Size: " + str(chunkSize))
+        result.magic = self.magic
+        result.fileSize = self.fileSize
+        result.strings = self.strTable
+        result.resourceIds = self.resourceIds
 
-        count = (chunkSize - 8) // 4
-        for i in range(0, count):
-            id = toLong(rawBinary[8+i*4:12+i*4])
-            strHex = hex(id)
-            if len(strHex) != 10:
-                strHex = '0x' + (10-len(strHex)) * '0' + strHex[2:]
-                print("id: " + str(id) + " hex: " + strHex)
+        self.result = result
+        if not quiet:
+            result.show()
+        return result
 
+    def __collect(self, result, writer):
+        # fill result with the events of the file, echoing them to writer if any
+        stack = []
 
-    def readStartNamespaceChunk(self, rawBinary):
-        chunkSize = rawBinary[4:8]
-        chunkSize = toLong(chunkSize)
-
-        print("Start Namespace Chunk Type: " + printHex(rawBinary[0:4]))
-        print("Start Namespace Chunk Size: " + str(chunkSize))
-
-        count = (chunkSize - 8) // 16
-        for i in range(0, count):
-            table = rawBinary[8+i*16:24+i*16]
-            lineNum = toLong(table[0:4])
-            prefix = toLong(table[8:12])
-            Uri = toLong(table[12:16])
-            print("Line Number: " + str(lineNum))
-            print("Prefix: " + str(prefix))
-            print("Prefix Str: " + self.strTable[prefix])
-            print("Uri: " + str(Uri))
-            print("Uri Str: " + self.strTable[Uri])
-            if not self.strTable[prefix] in self.namespaceMap:
-                self.namespaceMap[self.strTable[prefix]] = self.strTable[Uri]
-            if not self.strTable[Uri] in self.namespaceMap:
-                self.namespaceMap[self.strTable[Uri]] = self.strTable[prefix]
+        for event in self.iterEvents():
+            result.chunks.append(event)
+            if writer is not None:
+                writer.write(event)
 
-    def readEndNamespaceChunk(self, rawBinary):
-        chunkSize = rawBinary[4:8]
-        chunkSize = toLong(chunkSize)
+            if isinstance(event, StartNamespace):
+                result.namespaces[event.uri] = event.prefix
 
-        print("End Namespace Chunk Type: " + printHex(rawBinary[0:4]))
-        print("End Namespace Chunk Size: " + str(chunkSize))
+            elif isinstance(event, StartTag):
+                element = ElementTree.Element(self.__elementName(event.namespaceUri, event.name))
+                for attr in event.attributes:
+                    element.set(self.__elementName(attr.namespaceUri, attr.name), _attributeText(attr))
 
-        lineNum = rawBinary[8:12]
-        print("line number: " + str(toLong(lineNum)))
+                if stack:
+                    stack[-1].append(element)
+                elif result.root is None:
+                    result.root = element
+                stack.append(element)
 
-        prefix = rawBinary[12:16]
-        prefixIndex = toLong(prefix)
-        if prefixIndex == -1:
-            print("prefix null")
-        else:
-            print("prefix: " + str(prefixIndex))
-            print("prefix str: " + self.strTable[prefixIndex])
+            elif isinstance(event, EndTag):
+                if stack:
+                    stack.pop()
 
-        namespaceUri = rawBinary[16:20]
-        uriIndex = toLong(namespaceUri)
-        if uriIndex == -1:
-            print("Uri null")
-        else:
-            print("uri: " + str(uriIndex))
-            print("uri str: " + self.strTable[uriIndex])
+            elif isinstance(event, Text):
+                if stack and event.text is not None:
+                    element = stack[-1]
+                    if len(element):
+                        element[-1].tail = (element[-1].tail or "") + event.text
+                    else:
+                        element.text = (element.text or "") + event.text
 
-        name = rawBinary[20:24]
-        nameIndex = toLong(name)
-        if nameIndex == -1:
-            print("tag name null")
-        else:
-            print("tag name index: " + str(nameIndex))
-            print("tag name str: " + self.strTable[nameIndex])
+    @staticmethod
+    def iterChunks(rawBinary, offset=8, budget=None):
+        """
+            Walk the chunks of a binary XML file
 
+            The offset is advanced over the single buffer of the file and every
+            chunk is handed out as a memoryview, nothing is copied.
 
+            :param rawBinary: the whole file
+            :param offset: the offset of the first chunk (after the file header)
+            :type offset: int
+            :param budget: the limits to enforce, a bad chunk only stops the walk without it
+            :type budget: :class:`ParseBudget`
 
-    def readStratTagChunk(self, rawChunk):
-        chunkSize = rawChunk[4:8]
-        chunkSize = toLong(chunkSize)
+            :rtype: a generator of (chunk type, memoryview of the chunk)
+        """
+        view = memoryview(rawBinary)
+        end = len(view)
+        while offset + CHUNK_HEADER._size <= end:
+            head = CHUNK_HEADER._unpack_from(view, offset)
+            rec = CHUNK_RECORDS.get(head.type, CHUNK_HEADER)
+            if budget is not None:
+                budget.chargeChunk(offset)
+                if head.size < rec._size or offset + head.size > end:
+                    budget.fail("bad chunk size %d" % head.size)
+            elif head.size < CHUNK_HEADER._size:
+                # a corrupted size would never move the offset
+                print("[Error] Bad chunk size %d at %#x" % (head.size, offset))
+                break
+            elif min(head.size, end - offset) < rec._size:
+                print("[Error] Truncated chunk %#x at %#x" % (head.type, offset))
+                break
+            yield head.type, view[offset:offset + head.size]
+            offset += head.size
+
+    def writeXml(self, outFile):
+        """
+            Write the document as XML text while it is decoded
+
+            Nothing but the string pool is kept, memory doesn't grow with the
+            size of the output.
+
+            :param outFile: the path of the XML file
+            :type outFile: string
+        """
+        with open(outFile, "w", encoding="utf-8") as out:
+            writer = XmlWriter(out)
+            for event in self.iterEvents():
+                writer.write(event)
+
+    def summarize(self, components=True):
+        """
+            Extract a :class:`ManifestSummary` without decoding the whole file
+
+            Only the tags the summary needs are decoded, the subtree of any
+            other tag is skipped by counting its start and end tags, and the
+            walk stops at the end of <manifest>. Attributes are matched by
+            resource id so only the strings actually used are decoded.
+
+            :param components: look for the exported components, the whole <application> is skipped otherwise
+            :type components: bool
+
+            :rtype: :class:`ManifestSummary`
+        """
+        rawChunk = self.__fileInfo.getRawBinary()
+        summary = ManifestSummary()
+
+        self.readHead(rawChunk)
+
+        depth = 0
+        skip = None
+        component = None
+
+        for chunkType, chunk in self.iterChunks(rawChunk, budget=self.budget):
+            if chunkType == 0x00100102:
+                depth += 1
+                if skip is not None:
+                    continue
+
+                tag = START_TAG_CHUNK._unpack_from(chunk)
+                name = self.getName(tag.name)
+
+                if depth == 1:
+                    if name == "manifest":
+                        attrs = self.__readSummaryAttributes(chunk, tag)
+                        summary.package = attrs.get("package")
+                        summary.versionCode = attrs.get("versionCode")
+                        summary.versionName = attrs.get("versionName")
+                elif depth == 2:
+                    if name == "uses-sdk":
+                        attrs = self.__readSummaryAttributes(chunk, tag)
+                        summary.minSdkVersion = attrs.get("minSdkVersion")
+                        summary.targetSdkVersion = attrs.get("targetSdkVersion")
+                    elif name in PERMISSION_TAGS:
+                        permission = self.__readSummaryAttributes(chunk, tag).get("name")
+                        if permission is not None:
+                            summary.permissions.append(permission)
+                    elif name != "application" or not components:
+                        skip = depth
+                elif depth == 3 and name in COMPONENT_TAGS:
+                    attrs = self.__readSummaryAttributes(chunk, tag)
+                    component = [name, attrs.get("name"), attrs.get("exported"), False]
+                elif depth == 4 and component is not None and name == "intent-filter":
+                    component[3] = True
+                    skip = depth
+                else:
+                    skip = depth
 
-        rawBinary = rawChunk[:chunkSize]
+            elif chunkType == 0x00100103:
+                if skip is not None:
+                    if depth == skip:
+                        skip = None
+                    depth -= 1
+                    continue
 
-        print("Start Tag Chunk Type: " + printHex(rawBinary[0:4]))
-        print("Start Tag Chunk Size: " + str(chunkSize))
+                if depth == 3 and component is not None:
+                    tag, name, exported, hasFilter = component
+                    if exported or (exported is None and hasFilter):
+                        summary.exported.append((tag, name))
+                    component = None
+                elif depth == 1:
+                    break
+                depth -= 1
 
-        res_s = ''
+            elif chunkType == 0x001c0001:
+                self.readStringChunk(chunk)
 
-        table = rawBinary[8:]
-        while table != b'':
-            lineNum = table[0:4]
-            print("line number: " + str(toLong(lineNum)))
+            elif chunkType == 0x00080180:
+                self.readResourceIdChunk(chunk)
 
-            prefix = table[4:8]
-            prefixIndex = toLong(prefix)
-            if prefixIndex == -1:
-                print("prefix null")
+        return summary
+
+    def __readSummaryAttributes(self, rawChunk, tag):
+        # attributes keyed by name, only the ones of SUMMARY_ATTRIBUTES (and package)
+        attrs = {}
+        for namespaceUri, nameIdx, valueString, size, res0, dataType, data in self.iterAttributes(rawChunk, tag, self.budget):
+            resId = self.getResourceId(nameIdx)
+            if resId in SUMMARY_ATTRIBUTES:
+                name = SUMMARY_ATTRIBUTES[resId]
             else:
-                print("prefix: " + str(prefixIndex))
-                print("prefix str: " + self.strTable[prefixIndex])
+                name = self.getName(nameIdx)
+                if name != "package" and name not in SUMMARY_ATTRIBUTES.values():
+                    continue
 
-            namespaceUri = table[8:12]
-            uriIndex = toLong(namespaceUri)
-            if uriIndex == -1:
-                print("Uri null")
+            if valueString != -1:
+                text = self.getString(valueString)
+            elif dataType == TYPE_STRING:
+                text = self.getString(data)
             else:
-                print("uri: " + str(uriIndex))
-                print("uri str: " + self.strTable[uriIndex])
+                text = None
 
-            name = table[12:16]
-            nameIndex = toLong(name)
-            if nameIndex == -1:
-                print("tag name null")
+            if name in SUMMARY_DECODERS:
+                attrs[name] = SUMMARY_DECODERS[name](dataType, data, text)
+            elif text is not None:
+                attrs[name] = text
             else:
-                print("tag name index: " + str(nameIndex))
-                print("tag name str: " + self.strTable[nameIndex])
-                res_s = res_s + "<" + self.strTable[nameIndex] + ' '
-
-            flags= table[16:20]
-
-            AttributeCount = table[20:24]
-            attrCount = toLong(AttributeCount)
-            print("attr count" + str(attrCount))
-
-            ClassAtrribute = table[24:28]
-
-            Atrributes = []
-            for i in range(0, attrCount):
-                entry = {}
-                for j in range(5):
-                    value = toLong(table[28+i*20+j*4:32+i*20+j*4])
-                    if j == 0:
-                        entry["nameSpaceUri"] = value
-                        if value == -1:
-                            print("nameSpaceUri null")
-                        else:
-                            print("nameSpaceUri: " + str(value))
-                            print("nameSpaceUri str: " + self.strTable[value])
-                            res_s = res_s + self.namespaceMap[self.strTable[value]] + ':'
-                    elif j == 1:
-                        entry["name"] = value
-                        if value == -1:
-                            print("name null")
-                        else:
-                            print("name: " + str(value))
-                            print("name: " + self.strTable[value])
-                            res_s = res_s + self.strTable[value] + '='
-                    elif j == 2:
-                        entry["valueString"] = value
-                        if value == -1:
-                            print("valueString null")
-                        else:
-                            print("valueString: " + str(value))
-                            print("valueString str: " + self.strTable[value])
-                            res_s = res_s + self.strTable[value] + ' '
-                    elif j == 3:
-                        entry["type"] = (value >> 24)
-                        if value == -1:
-                            print("type null")
-                        else:
-                            print("type: " + str(value>>24))
-                    elif j == 4:
-                        entry["data"] = value
-                        if value == -1:
-                            print("data null")
-                        else:
-                            print("data: " + str(value))
-                Atrributes.append(entry)
-
-            splitSize = 28
-            splitSize += attrCount * 5 * 4
-            table = table[splitSize:]
+                attrs[name] = decodeValue(dataType, data, self.strTable)
+        return attrs
 
+    def getString(self, idx):
+        if idx == -1:
+            return None
+        if not 0 <= idx < len(self.strTable):
+            # a forged index, without a budget it's treated as absent
+            if self.budget is not None:
+                self.budget.fail("string index %d out of range" % idx)
+            return None
+        return self.strTable[idx]
 
-    def readEndTagChunk(self, rawBinary):
-        chunkSize = rawBinary[4:8]
-        chunkSize = toLong(chunkSize)
+    def getName(self, idx):
+        """
+            Return the name of a tag, an attribute or a namespace, a name can't
+            be absent: the budget fails on it, None is returned without budget
+            and the caller drops what it names
 
-        print("End Tag Chunk Type: " + printHex(rawBinary[0:4]))
-        print("End Tag Chunk Size: " + str(chunkSize))
+            :rtype: string or None
+        """
+        name = self.getString(idx)
+        if name is None and self.budget is not None:
+            self.budget.fail("missing name (string index %d)" % idx)
+        return name
 
-        lineNum = rawBinary[8:12]
-        print("line number: " + str(toLong(lineNum)))
+    def readHead(self, rawBinary):
+        if self.budget is not None:
+            self.budget.start()
+            if len(rawBinary) < CHUNK_HEADER._size:
+                self.budget.fail("file too small")
 
-        prefix = rawBinary[12:16]
-        prefixIndex = toLong(prefix)
-        if prefixIndex == -1:
-            print("prefix null")
-        else:
-            print("prefix: " + str(prefixIndex))
-            print("prefix str: " + self.strTable[prefixIndex])
+        head = CHUNK_HEADER._unpack_from(rawBinary)
+        self.magic = head.type
+        self.fileSize = head.size
 
-        namespaceUri = rawBinary[16:20]
-        uriIndex = toLong(namespaceUri)
-        if uriIndex == -1:
-            print("Uri null")
-        else:
-            print("uri: " + str(uriIndex))
-            print("uri str: " + self.strTable[uriIndex])
+        # a new walk over the file
+        self.strTable = []
+        self.resourceIds = array('I')
+        self.namespaceMap = {}
+        self.__attributeIndex = None
+        # the name of every open start tag, None if it was dropped
+        self.__openTags = []
 
-        name = rawBinary[20:24]
-        nameIndex = toLong(name)
-        if nameIndex == -1:
-            print("tag name null")
-        else:
-            print("tag name index: " + str(nameIndex))
-            print("tag name str: " + self.strTable[nameIndex])
+    def readStringChunk(self, rawBinary):
+        self.strTable = StringPool(rawBinary, self.budget)
 
-    def readTextChunk(self, rawBinary):
-        pass
+    def readResourceIdChunk(self, rawBinary):
+        # the resource id of the attribute name at the same index in the string pool
+        chunkSize = min(CHUNK_HEADER._unpack_from(rawBinary).size, len(rawBinary))
 
-    def readBreak(self, rawBinary):
-        print("Unkonw Chunk!")
-        print(printHex(rawBinary[:4]))
-        print("Left %d bytes." % len(rawBinary))
+        self.resourceIds = array('I')
+        self.resourceIds.frombytes(rawBinary[CHUNK_HEADER._size:CHUNK_HEADER._size + 4 * ((chunkSize - CHUNK_HEADER._size) // 4)])
+        if sys.byteorder != "little":
+            self.resourceIds.byteswap()
+        self.__attributeIndex = None
+
+    def getResourceId(self, nameIdx):
+        """
+            Return the resource id of the attribute name at nameIdx in the string pool
+
+            :rtype: int or None
+        """
+        if 0 <= nameIdx < len(self.resourceIds):
+            return self.resourceIds[nameIdx]
+        return None
+
+    def getAttributeIndex(self, resId):
+        """
+            Return the index in the string pool of the attribute with a given
+            resource id, the reverse map is built on the first call
+
+            :rtype: int or None
+        """
+        if self.__attributeIndex is None:
+            self.__attributeIndex = {}
+            for idx, id in enumerate(self.resourceIds):
+                self.__attributeIndex.setdefault(id, idx)
+        return self.__attributeIndex.get(resId)
+
+    def getAttributeName(self, nameIdx):
+        """
+            Return the name of an attribute, from its resource id when it is a
+            known framework attribute, from the string pool otherwise
+
+            :rtype: string or None
+        """
+        if 0 <= nameIdx < len(self.resourceIds):
+            name = ANDROID_ATTRIBUTE_NAMES.get(self.resourceIds[nameIdx])
+            if name is not None:
+                return name
+        return self.getName(nameIdx)
+
+    def readStartNamespaceChunk(self, rawBinary):
+        chunk = NAMESPACE_CHUNK._unpack_from(rawBinary)
+        prefix = self.getName(chunk.prefix)
+        uri = self.getName(chunk.uri)
+        if prefix is None or uri is None:
+            return None
 
-    class resultText:
-        def __init__(self):
-            pass
+        if not prefix in self.namespaceMap:
+            self.namespaceMap[prefix] = uri
+        if not uri in self.namespaceMap:
+            self.namespaceMap[uri] = prefix
 
-        res_text = []
+        return StartNamespace(chunk.lineNumber, prefix, uri)
 
-        @staticmethod
-        def append(d):
-            pass
+    def readEndNamespaceChunk(self, rawBinary):
+        chunk = NAMESPACE_CHUNK._unpack_from(rawBinary)
+        prefix = self.getName(chunk.prefix)
+        uri = self.getName(chunk.uri)
+        if prefix is None or uri is None:
+            return None
+        return EndNamespace(chunk.lineNumber, prefix, uri)
+
+    def readStratTagChunk(self, rawChunk):
+        tag = START_TAG_CHUNK._unpack_from(rawChunk)
+
+        getString = self.getString
+        getAttributeName = self.getAttributeName
+        strTable = self.strTable
+
+        attributes = []
+        for namespaceUri, name, valueString, size, res0, dataType, data in self.iterAttributes(rawChunk, tag, self.budget):
+            if valueString != -1:
+                valueString = getString(valueString)
+                value = valueString
+            else:
+                valueString = None
+                if dataType == TYPE_STRING:
+                    value = getString(data)
+                else:
+                    value = VALUE_DECODERS.get(dataType, _rawValue)(data, strTable)
+            name = getAttributeName(name)
+            if name is None:
+                continue
+            attributes.append(Attribute(getString(namespaceUri), name, valueString, dataType, data, value))
+
+        name = self.getName(tag.name)
+        self.__openTags.append(name)
+        if name is None:
+            return None
+        return StartTag(tag.lineNumber, self.getString(tag.namespaceUri), name, attributes)
+
+    @staticmethod
+    def iterAttributes(rawChunk, tag, budget=None):
+        """
+            Decode the attributes of a start tag
+
+            The attributes are decoded with one struct pass over the whole
+            attribute block when they have the standard size.
+
+            :param rawChunk: the start tag chunk
+            :param tag: the decoded START_TAG_CHUNK
+            :param budget: the limits to enforce, the declared count is only clamped to the chunk without it
+            :type budget: :class:`ParseBudget`
+            :rtype: an iterator of ATTRIBUTE fields tuples
+        """
+        attrOffset = 16 + tag.attributeStart
+        count = tag.attributeCount
+
+        fits = 0
+        if tag.attributeSize >= ATTRIBUTE._size and attrOffset < len(rawChunk):
+            fits = (len(rawChunk) - attrOffset) // tag.attributeSize
+        if count > fits:
+            if budget is not None:
+                budget.fail("attribute count %d doesn't fit in the chunk" % count)
+            count = fits
+        if budget is not None:
+            budget.chargeAttributes(count)
+
+        if tag.attributeSize == ATTRIBUTE._size:
+            return ATTRIBUTE._struct.iter_unpack(rawChunk[attrOffset:attrOffset + count * ATTRIBUTE._size])
+        return (ATTRIBUTE._struct.unpack_from(rawChunk, attrOffset + i * tag.attributeSize)
+                for i in range(0, count))
+
+    def readEndTagChunk(self, rawBinary):
+        tag = END_TAG_CHUNK._unpack_from(rawBinary)
+        name = self.getName(tag.name)
+
+        # the end of a dropped start tag is dropped as well, a missing name
+        # is taken from the start tag it closes
+        if self.__openTags:
+            openName = self.__openTags.pop()
+            if openName is None:
+                return None
+            if name is None:
+                name = openName
+        if name is None:
+            return None
+        return EndTag(tag.lineNumber, self.getString(tag.namespaceUri), name)
+
+    def readTextChunk(self, rawBinary):
+        chunk = TEXT_CHUNK._unpack_from(rawBinary)
+        return Text(chunk.lineNumber, self.getString(chunk.name))
+
+    def readBreak(self, rawBinary):
+        head = CHUNK_HEADER._unpack_from(rawBinary)
+        return UnknownChunk(head.type, len(rawBinary))
 
+    @staticmethod
+    def __elementName(uri, name):
+        if uri is None:
+            return name
+        return "{%s}%s" % (uri, name)
@@ -1,4 +1,4 @@
-from struct import unpack, pack, calcsize
+from struct import unpack, unpack_from, pack, calcsize, error
 
 KIND_METH           = 0
 KIND_STRING         = 1
@@ -22,13 +22,16 @@ class FillArrayData(object):
 
         :param buff: a Buff object which represents a buffer where the instruction is stored
     """
+    __slots__ = ("notes", "ident", "element_width", "size", "data")
+
+    format_general_size = calcsize("=HHI")
+
     def __init__(self, buff):
-        self.notes = []
+        self.notes = None
 
-        self.format_general_size = calcsize("=HHI")
-        self.ident = unpack("=H", buff[0:2])[0]
-        self.element_width = unpack("=H", buff[2:4])[0]
-        self.size = unpack("=I", buff[4:8])[0]
+        self.ident = unpack_from("=H", buff, 0)[0]
+        self.element_width = unpack_from("=H", buff, 2)[0]
+        self.size = unpack_from("=I", buff, 4)[0]
 
         buf_len = self.size * self.element_width
         if buf_len % 2:
@@ -43,6 +46,8 @@ class FillArrayData(object):
         :param msg: the message
         :type msg: objects (string)
       """
+      if self.notes is None:
+        self.notes = []
       self.notes.append(msg)
 
     def get_notes(self):
@@ -51,6 +56,8 @@ class FillArrayData(object):
 
         :rtype: a list of objects
       """
+      if self.notes is None:
+        return []
       return self.notes
 
     def get_op_value(self):
@@ -123,7 +130,7 @@ class FillArrayData(object):
 
             :rtype: int
         """
-        return ((self.size * self.element_width + 1) / 2 + 4) * 2
+        return ((self.size * self.element_width + 1) // 2 + 4) * 2
 
     def get_raw(self):
         return pack("=H", self.ident) + pack("=H", self.element_width) + pack("=I", self.size) + self.data
@@ -134,24 +141,20 @@ class SparseSwitch(object):
 
         :param buff: a Buff object which represents a buffer where the instruction is stored
     """
-    def __init__(self, buff):
-        self.notes = []
+    __slots__ = ("notes", "ident", "size", "keys", "targets")
 
-        self.format_general_size = calcsize("=HH")
-        self.ident = unpack("=H", buff[0:2])[0]
-        self.size = unpack("=H", buff[2:4])[0]
+    format_general_size = calcsize("=HH")
 
-        self.keys = []
-        self.targets = []
+    def __init__(self, buff):
+        self.notes = None
 
-        idx = self.format_general_size
-        for i in range(0, self.size):
-            self.keys.append(unpack('=l', buff[idx:idx + 4])[0])
-            idx += 4
+        self.ident = unpack_from("=H", buff, 0)[0]
+        self.size = unpack_from("=H", buff, 2)[0]
 
-        for i in range(0, self.size):
-            self.targets.append(unpack('=l', buff[idx:idx + 4])[0])
-            idx += 4
+        idx = self.format_general_size
+        self.keys = list(unpack_from("=%dl" % self.size, buff, idx))
+        idx += self.size * 4
+        self.targets = list(unpack_from("=%dl" % self.size, buff, idx))
 
     def add_note(self, msg):
       """
@@ -160,6 +163,8 @@ class SparseSwitch(object):
         :param msg: the message
         :type msg: objects (string)
       """
+      if self.notes is None:
+        self.notes = []
       self.notes.append(msg)
 
     def get_notes(self):
@@ -168,6 +173,8 @@ class SparseSwitch(object):
 
         :rtype: a list of objects
       """
+      if self.notes is None:
+        return []
       return self.notes
 
     def get_op_value(self):
@@ -246,7 +253,7 @@ class SparseSwitch(object):
         return self.format_general_size + (self.size * calcsize('<L')) * 2
 
     def get_raw(self):
-        return pack("=H", self.ident) + pack("=H", self.size) + ''.join(pack("=l", i) for i in self.keys) + ''.join(pack("=l", i) for i in self.targets)
+        return pack("=H", self.ident) + pack("=H", self.size) + b''.join(pack("=l", i) for i in self.keys) + b''.join(pack("=l", i) for i in self.targets)
 
 
 class PackedSwitch(object):
@@ -255,26 +262,24 @@ class PackedSwitch(object):
 
         :param buff: a Buff object which represents a buffer where the instruction is stored
     """
-    def __init__(self, buff):
-        self.notes = []
+    __slots__ = ("notes", "ident", "size", "first_key", "targets")
 
-        self.format_general_size = calcsize("=HHI")
+    format_general_size = calcsize("=HHI")
 
-        self.ident = unpack("=H", buff[0:2])[0]
-        self.size = unpack("=H", buff[2:4])[0]
-        self.first_key = unpack("=i", buff[4:8])[0]
+    def __init__(self, buff):
+        self.notes = None
 
-        self.targets = []
+        self.ident = unpack_from("=H", buff, 0)[0]
+        self.size = unpack_from("=H", buff, 2)[0]
+        self.first_key = unpack_from("=i", buff, 4)[0]
 
         idx = self.format_general_size
 
         max_size = self.size
         if (max_size * 4) > len(buff):
-            max_size = len(buff) - idx - 8
+            max_size = max(len(buff) - idx - 8, 0)
 
-        for i in range(0, max_size):
-            self.targets.append(unpack('=l', buff[idx:idx + 4])[0])
-            idx += 4
+        self.targets = list(unpack_from("=%dl" % max_size, buff, idx))
 
     def add_note(self, msg):
       """
@@ -283,6 +288,8 @@ class PackedSwitch(object):
         :param msg: the message
         :type msg: objects (string)
       """
+      if self.notes is None:
+        self.notes = []
       self.notes.append(msg)
 
     def get_notes(self):
@@ -291,6 +298,8 @@ class PackedSwitch(object):
 
         :rtype: a list of objects
       """
+      if self.notes is None:
+        return []
       return self.notes
 
     def get_op_value(self):
@@ -371,7 +380,7 @@ class PackedSwitch(object):
         return self.format_general_size + (self.size * calcsize('=L'))
 
     def get_raw(self):
-        return pack("=H", self.ident) + pack("=H", self.size) + pack("=i", self.first_key) + ''.join(pack("=l", i) for i in self.targets)
+        return pack("=H", self.ident) + pack("=H", self.size) + pack("=i", self.first_key) + b''.join(pack("=l", i) for i in self.targets)
 
 def get_kind(cm, kind, value):
   """
@@ -428,18 +437,20 @@ def get_kind(cm, kind, value):
 class Instruction(object):
     """
         This class represents a dalvik instruction
+
+        Instructions are created by the million during a full disassembly, so
+        every format declares its fields in __slots__ and keeps no per-instance
+        __dict__. Only the formats carrying an index operand keep a reference
+        to the ClassManager.
     """
+    __slots__ = ("OP",)
     def get_kind(self):
         """
             Return the 'kind' argument of the instruction
 
             :rtype: int
         """
-        if self.OP > 0xff:
-          if self.OP >= 0xf2ff:
-            return DALVIK_OPCODES_OPTIMIZED[self.OP][1][1]
-          return DALVIK_OPCODES_EXTENDED_WIDTH[self.OP][1][1]
-        return DALVIK_OPCODES_FORMAT[self.OP][1][1]
+        return get_opcode_entry(self.OP)[2]
 
     def get_name(self):
         """
@@ -447,11 +458,7 @@ class Instruction(object):
 
             :rtype: string
         """
-        if self.OP > 0xff:
-          if self.OP >= 0xf2ff:
-            return DALVIK_OPCODES_OPTIMIZED[self.OP][1][0]
-          return DALVIK_OPCODES_EXTENDED_WIDTH[self.OP][1][0]
-        return DALVIK_OPCODES_FORMAT[self.OP][1][0]
+        return get_opcode_entry(self.OP)[1]
 
     def get_op_value(self):
         """
@@ -539,10 +546,12 @@ class InstructionInvalid(Instruction):
     """
         This class represents an invalid instruction
     """
+    __slots__ = ()
+
     def __init__(self, cm, buff):
       super(InstructionInvalid, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
 
       #debug("OP:%x" % (self.OP))
@@ -571,17 +580,19 @@ class Instruction35c(Instruction):
     """
         This class represents all instructions which have the 35c format
     """
+    __slots__ = ("cm", "G", "A", "BBBB", "C", "D", "E", "F")
+
     def __init__(self, cm, buff):
       super(Instruction35c, self).__init__()
       self.cm = cm
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.G = (i16 >> 8) & 0xf
       self.A = (i16 >> 12) & 0xf
-      self.BBBB = unpack("=H", buff[2:4])[0]
+      self.BBBB = unpack_from("=H", buff, 2)[0]
 
-      i16 = unpack("=H", buff[4:6])[0]
+      i16 = unpack_from("=H", buff, 4)[0]
       self.C = i16 & 0xf
       self.D = (i16 >> 4) & 0xf
       self.E = (i16 >> 8) & 0xf
@@ -638,10 +649,12 @@ class Instruction10x(Instruction):
     """
         This class represents all instructions which have the 10x format
     """
+    __slots__ = ()
+
     def __init__(self, cm, buff):
       super(Instruction10x, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
 
       #log_andro.debug("OP:%x %s" % (self.OP, args[0]))
@@ -663,24 +676,19 @@ class Instruction21h(Instruction):
     """
         This class represents all instructions which have the 21h format
     """
+    __slots__ = ("AA", "BBBB")
+
     def __init__(self, cm, buff):
       super(Instruction21h, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBB = unpack("=h", buff[2:4])[0]
+      self.BBBB = unpack_from("=h", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s AA:%x BBBBB:%x" % (self.OP, args[0], self.AA, self.BBBB))
 
-      self.formatted_operands = []
-
-      if self.OP == 0x15:
-        self.formatted_operands.append(unpack('=f', '\x00\x00' + pack('=h', self.BBBB))[0])
-      elif self.OP == 0x19:
-        self.formatted_operands.append(unpack('=d', '\x00\x00\x00\x00\x00\x00' + pack('=h', self.BBBB))[0])
-
     def get_length(self):
       return 4
 
@@ -688,8 +696,9 @@ class Instruction21h(Instruction):
       buff = ""
       buff += "v%d, %d" % (self.AA, self.BBBB)
 
-      if self.formatted_operands != []:
-        buff += " # %s" % (str(self.formatted_operands))
+      formatted_operands = self.get_formatted_operands()
+      if formatted_operands != []:
+        buff += " # %s" % (str(formatted_operands))
 
       return buff
 
@@ -697,7 +706,11 @@ class Instruction21h(Instruction):
       return [(OPERAND_REGISTER, self.AA), (OPERAND_LITERAL, self.BBBB)]
 
     def get_formatted_operands(self):
-      return self.formatted_operands
+      if self.OP == 0x15:
+        return [unpack('=f', b'\x00\x00' + pack('=h', self.BBBB))[0]]
+      elif self.OP == 0x19:
+        return [unpack('=d', b'\x00\x00\x00\x00\x00\x00' + pack('=h', self.BBBB))[0]]
+      return []
 
     def get_literals(self):
       return [self.BBBB]
@@ -710,10 +723,12 @@ class Instruction11n(Instruction):
     """
         This class represents all instructions which have the 11n format
     """
+    __slots__ = ("A", "B")
+
     def __init__(self, cm, buff):
       super(Instruction11n, self).__init__()
 
-      i16 = unpack("=h", buff[0:2])[0]
+      i16 = unpack_from("=h", buff, 0)[0]
       self.OP = i16 & 0xff
       self.A = (i16 >> 8) & 0xf
       self.B = (i16 >> 12)
@@ -742,15 +757,17 @@ class Instruction21c(Instruction):
     """
         This class represents all instructions which have the 21c format
     """
+    __slots__ = ("cm", "AA", "BBBB")
+
     def __init__(self, cm, buff):
       super(Instruction21c, self).__init__()
       self.cm = cm
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBB = unpack("=H", buff[2:4])[0]
+      self.BBBB = unpack_from("=H", buff, 2)[0]
       #log_andro.debug("OP:%x %s AA:%x BBBBB:%x" % (self.OP, args[0], self.AA, self.BBBB))
 
     def get_length(self):
@@ -784,19 +801,16 @@ class Instruction21s(Instruction):
     """
         This class represents all instructions which have the 21s format
     """
+    __slots__ = ("AA", "BBBB")
+
     def __init__(self, cm, buff):
       super(Instruction21s, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBB = unpack("=h", buff[2:4])[0]
-
-      self.formatted_operands = []
-
-      if self.OP == 0x16:
-        self.formatted_operands.append(unpack('=d', pack('=d', self.BBBB))[0])
+      self.BBBB = unpack_from("=h", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s AA:%x BBBBB:%x" % (self.OP, args[0], self.AA, self.BBBB))
 
@@ -807,8 +821,9 @@ class Instruction21s(Instruction):
       buff = ""
       buff += "v%d, %d" % (self.AA, self.BBBB)
 
-      if self.formatted_operands != []:
-        buff += " # %s" % str(self.formatted_operands)
+      formatted_operands = self.get_formatted_operands()
+      if formatted_operands != []:
+        buff += " # %s" % str(formatted_operands)
 
       return buff
 
@@ -819,7 +834,9 @@ class Instruction21s(Instruction):
       return [self.BBBB]
 
     def get_formatted_operands(self):
-      return self.formatted_operands
+      if self.OP == 0x16:
+        return [unpack('=d', pack('=d', self.BBBB))[0]]
+      return []
 
     def get_raw(self):
       return pack("=Hh", (self.AA << 8) | self.OP, self.BBBB)
@@ -829,15 +846,17 @@ class Instruction22c(Instruction):
     """
         This class represents all instructions which have the 22c format
     """
+    __slots__ = ("cm", "A", "B", "CCCC")
+
     def __init__(self, cm, buff):
       super(Instruction22c, self).__init__()
       self.cm = cm
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.A = (i16 >> 8) & 0xf
       self.B = (i16 >> 12) & 0xf
-      self.CCCC = unpack("=H", buff[2:4])[0]
+      self.CCCC = unpack_from("=H", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s A:%x B:%x CCCC:%x" % (self.OP, args[0], self.A, self.B, self.CCCC))
 
@@ -865,15 +884,17 @@ class Instruction22cs(Instruction):
     """
         This class represents all instructions which have the 22cs format
     """
+    __slots__ = ("cm", "A", "B", "CCCC")
+
     def __init__(self, cm, buff):
       super(Instruction22cs, self).__init__()
       self.cm = cm
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.A = (i16 >> 8) & 0xf
       self.B = (i16 >> 12) & 0xf
-      self.CCCC = unpack("=H", buff[2:4])[0]
+      self.CCCC = unpack_from("=H", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s A:%x B:%x CCCC:%x" % (self.OP, args[0], self.A, self.B, self.CCCC))
 
@@ -901,13 +922,15 @@ class Instruction31t(Instruction):
     """
         This class represents all instructions which have the 31t format
     """
+    __slots__ = ("AA", "BBBBBBBB")
+
     def __init__(self, cm, buff):
       super(Instruction31t, self).__init__()
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBBBBBB = unpack("=i", buff[2:6])[0]
+      self.BBBBBBBB = unpack_from("=i", buff, 2)[0]
       #log_andro.debug("OP:%x %s AA:%x BBBBBBBBB:%x" % (self.OP, args[0], self.AA, self.BBBBBBBB))
 
     def get_length(self):
@@ -933,15 +956,17 @@ class Instruction31c(Instruction):
     """
         This class represents all instructions which have the 31c format
     """
+    __slots__ = ("cm", "AA", "BBBBBBBB")
+
     def __init__(self, cm, buff):
       super(Instruction31c, self).__init__()
       self.cm = cm
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBBBBBB = unpack("=I", buff[2:6])[0]
+      self.BBBBBBBB = unpack_from("=I", buff, 2)[0]
       #log_andro.debug("OP:%x %s AA:%x BBBBBBBBB:%x" % (self.OP, args[0], self.AA, self.BBBBBBBB))
 
     def get_length(self):
@@ -980,10 +1005,12 @@ class Instruction12x(Instruction):
     """
         This class represents all instructions which have the 12x format
     """
+    __slots__ = ("A", "B")
+
     def __init__(self, cm, buff):
       super(Instruction12x, self).__init__()
 
-      i16 = unpack("=h", buff[0:2])[0]
+      i16 = unpack_from("=h", buff, 0)[0]
       self.OP = i16 & 0xff
       self.A = (i16 >> 8) & 0xf
       self.B = (i16 >> 12) & 0xf
@@ -1009,10 +1036,12 @@ class Instruction11x(Instruction):
     """
         This class represents all instructions which have the 11x format
     """
+    __slots__ = ("AA",)
+
     def __init__(self, cm, buff):
       super(Instruction11x, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
@@ -1037,19 +1066,16 @@ class Instruction51l(Instruction):
     """
         This class represents all instructions which have the 51l format
     """
+    __slots__ = ("AA", "BBBBBBBBBBBBBBBB")
+
     def __init__(self, cm, buff):
       super(Instruction51l, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBBBBBBBBBBBBBB = unpack("=q", buff[2:10])[0]
-
-      self.formatted_operands = []
-
-      if self.OP == 0x18:
-        self.formatted_operands.append(unpack('=d', pack('=q', self.BBBBBBBBBBBBBBBB))[0])
+      self.BBBBBBBBBBBBBBBB = unpack_from("=q", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s AA:%x BBBBBBBBBBBBBBBB:%x" % (self.OP, args[0], self.AA, self.BBBBBBBBBBBBBBBB))
 
@@ -1061,8 +1087,9 @@ class Instruction51l(Instruction):
 
       buff += "v%d, %d" % (self.AA, self.BBBBBBBBBBBBBBBB)
 
-      if self.formatted_operands:
-        buff += " # %s" % str(self.formatted_operands)
+      formatted_operands = self.get_formatted_operands()
+      if formatted_operands:
+        buff += " # %s" % str(formatted_operands)
 
       return buff
 
@@ -1070,7 +1097,9 @@ class Instruction51l(Instruction):
       return [(OPERAND_REGISTER, self.AA), (OPERAND_LITERAL, self.BBBBBBBBBBBBBBBB)]
 
     def get_formatted_operands(self):
-      return self.formatted_operands
+      if self.OP == 0x18:
+        return [unpack('=d', pack('=q', self.BBBBBBBBBBBBBBBB))[0]]
+      return []
 
     def get_literals(self):
       return [self.BBBBBBBBBBBBBBBB]
@@ -1083,22 +1112,16 @@ class Instruction31i(Instruction):
     """
         This class represents all instructions which have the 3li format
     """
+    __slots__ = ("AA", "BBBBBBBB")
+
     def __init__(self, cm, buff):
       super(Instruction31i, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBBBBBB = unpack("=i", buff[2:6])[0]
-
-      self.formatted_operands = []
-
-      if self.OP == 0x14:
-        self.formatted_operands.append(unpack("=f", pack("=i", self.BBBBBBBB))[0])
-
-      elif self.OP == 0x17:
-        self.formatted_operands.append(unpack('=d', pack('=d', self.BBBBBBBB))[0])
+      self.BBBBBBBB = unpack_from("=i", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s AA:%x BBBBBBBBB:%x" % (self.OP, args[0], self.AA, self.BBBBBBBB))
 
@@ -1109,8 +1132,9 @@ class Instruction31i(Instruction):
       buff = ""
       buff += "v%d, %d" % (self.AA, self.BBBBBBBB)
 
-      if self.formatted_operands:
-        buff += " # %s" % str(self.formatted_operands)
+      formatted_operands = self.get_formatted_operands()
+      if formatted_operands:
+        buff += " # %s" % str(formatted_operands)
 
       return buff
 
@@ -1118,7 +1142,11 @@ class Instruction31i(Instruction):
       return [(OPERAND_REGISTER, self.AA), (OPERAND_LITERAL, self.BBBBBBBB)]
 
     def get_formatted_operands(self):
-      return self.formatted_operands
+      if self.OP == 0x14:
+        return [unpack("=f", pack("=i", self.BBBBBBBB))[0]]
+      elif self.OP == 0x17:
+        return [unpack('=d', pack('=d', self.BBBBBBBB))[0]]
+      return []
 
     def get_literals(self):
       return [self.BBBBBBBB]
@@ -1131,14 +1159,16 @@ class Instruction22x(Instruction):
     """
         This class represents all instructions which have the 22x format
     """
+    __slots__ = ("AA", "BBBB")
+
     def __init__(self, cm, buff):
       super(Instruction22x, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBB = unpack("=H", buff[2:4])[0]
+      self.BBBB = unpack_from("=H", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s AA:%x BBBBB:%x" % (self.OP, args[0], self.AA, self.BBBB))
 
@@ -1161,14 +1191,16 @@ class Instruction23x(Instruction):
     """
         This class represents all instructions which have the 23x format
     """
+    __slots__ = ("AA", "BB", "CC")
+
     def __init__(self, cm, buff):
       super(Instruction23x, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      i16 = unpack("=H", buff[2:4])[0]
+      i16 = unpack_from("=H", buff, 2)[0]
       self.BB = i16 & 0xff
       self.CC = (i16 >> 8) & 0xff
 
@@ -1193,12 +1225,14 @@ class Instruction20t(Instruction):
     """
         This class represents all instructions which have the 20t format
     """
+    __slots__ = ("AAAA",)
+
     def __init__(self, cm, buff):
       super(Instruction20t, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
-      self.AAAA = unpack("=h", buff[2:4])[0]
+      self.AAAA = unpack_from("=h", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s AAAA:%x" % (self.OP, args[0], self.AAAA))
 
@@ -1224,14 +1258,16 @@ class Instruction21t(Instruction):
     """
         This class represents all instructions which have the 21t format
     """
+    __slots__ = ("AA", "BBBB")
+
     def __init__(self, cm, buff):
       super(Instruction21t, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBB = unpack("=h", buff[2:4])[0]
+      self.BBBB = unpack_from("=h", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s AA:%x BBBBB:%x" % (self.OP, args[0], self.AA, self.BBBB))
 
@@ -1257,11 +1293,13 @@ class Instruction10t(Instruction):
     """
         This class represents all instructions which have the 10t format
     """
+    __slots__ = ("AA",)
+
     def __init__(self, cm, buff):
       super(Instruction10t, self).__init__()
 
-      self.OP = unpack("=B", buff[0:1])[0]
-      self.AA = unpack("=b", buff[1:2])[0]
+      self.OP = unpack_from("=B", buff, 0)[0]
+      self.AA = unpack_from("=b", buff, 1)[0]
 
       #log_andro.debug("OP:%x %s AA:%x" % (self.OP, args[0], self.AA))
 
@@ -1287,14 +1325,16 @@ class Instruction22t(Instruction):
     """
         This class represents all instructions which have the 22t format
     """
+    __slots__ = ("A", "B", "CCCC")
+
     def __init__(self, cm, buff):
       super(Instruction22t, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.A = (i16 >> 8) & 0xf
       self.B = (i16 >> 12) & 0xf
-      self.CCCC = unpack("=h", buff[2:4])[0]
+      self.CCCC = unpack_from("=h", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s A:%x B:%x CCCC:%x" % (self.OP, args[0], self.A, self.B, self.CCCC))
 
@@ -1320,14 +1360,16 @@ class Instruction22s(Instruction):
     """
         This class represents all instructions which have the 22s format
     """
+    __slots__ = ("A", "B", "CCCC")
+
     def __init__(self, cm, buff):
       super(Instruction22s, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.A = (i16 >> 8) & 0xf
       self.B = (i16 >> 12) & 0xf
-      self.CCCC = unpack("=h", buff[2:4])[0]
+      self.CCCC = unpack_from("=h", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s A:%x B:%x CCCC:%x" % (self.OP, args[0], self.A, self.B, self.CCCC))
 
@@ -1353,15 +1395,17 @@ class Instruction22b(Instruction):
     """
         This class represents all instructions which have the 22b format
     """
+    __slots__ = ("AA", "BB", "CC")
+
     def __init__(self, cm, buff):
       super(Instruction22b, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BB = unpack("=B", buff[2:3])[0]
-      self.CC = unpack("=b", buff[3:4])[0]
+      self.BB = unpack_from("=B", buff, 2)[0]
+      self.CC = unpack_from("=b", buff, 3)[0]
 
       #log_andro.debug("OP:%x %s AA:%x BB:%x CC:%x" % (self.OP, args[0], self.AA, self.BB, self.CC))
 
@@ -1387,13 +1431,15 @@ class Instruction30t(Instruction):
     """
         This class represents all instructions which have the 30t format
     """
+    __slots__ = ("AAAAAAAA",)
+
     def __init__(self, cm, buff):
       super(Instruction30t, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
 
-      self.AAAAAAAA = unpack("=i", buff[2:6])[0]
+      self.AAAAAAAA = unpack_from("=i", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s AAAAAAAA:%x" % (self.OP, args[0], self.AAAAAAAA))
 
@@ -1419,16 +1465,18 @@ class Instruction3rc(Instruction):
     """
         This class represents all instructions which have the 3rc format
     """
+    __slots__ = ("cm", "AA", "BBBB", "CCCC", "NNNN")
+
     def __init__(self, cm, buff):
       super(Instruction3rc, self).__init__()
       self.cm = cm
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBB = unpack("=H", buff[2:4])[0]
-      self.CCCC = unpack("=H", buff[4:6])[0]
+      self.BBBB = unpack_from("=H", buff, 2)[0]
+      self.CCCC = unpack_from("=H", buff, 4)[0]
 
       self.NNNN = self.CCCC + self.AA - 1
 
@@ -1472,13 +1520,15 @@ class Instruction32x(Instruction):
     """
         This class represents all instructions which have the 32x format
     """
+    __slots__ = ("AAAA", "BBBB")
+
     def __init__(self, cm, buff):
       super(Instruction32x, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
-      self.AAAA = unpack("=H", buff[2:4])[0]
-      self.BBBB = unpack("=H", buff[4:6])[0]
+      self.AAAA = unpack_from("=H", buff, 2)[0]
+      self.BBBB = unpack_from("=H", buff, 4)[0]
 
       #log_andro.debug("OP:%x %s AAAAA:%x BBBBB:%x" % (self.OP, args[0], self.AAAA, self.BBBB))
 
@@ -1501,14 +1551,16 @@ class Instruction20bc(Instruction):
     """
         This class represents all instructions which have the 20bc format
     """
+    __slots__ = ("AA", "BBBB")
+
     def __init__(self, cm, buff):
       super(Instruction20bc, self).__init__()
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBB = unpack("=H", buff[2:4])[0]
+      self.BBBB = unpack_from("=H", buff, 2)[0]
 
       #log_andro.debug("OP:%x %s AA:%x BBBBB:%x" % (self.OP, args[0], self.AA, self.BBBB))
 
@@ -1531,17 +1583,19 @@ class Instruction35mi(Instruction):
     """
         This class represents all instructions which have the 35mi format
     """
+    __slots__ = ("cm", "G", "A", "BBBB", "C", "D", "E", "F")
+
     def __init__(self, cm, buff):
       super(Instruction35mi, self).__init__()
       self.cm = cm
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.G = (i16 >> 8) & 0xf
       self.A = (i16 >> 12) & 0xf
-      self.BBBB = unpack("=H", buff[2:4])[0]
+      self.BBBB = unpack_from("=H", buff, 2)[0]
 
-      i16 = unpack("=H", buff[4:6])[0]
+      i16 = unpack_from("=H", buff, 4)[0]
       self.C = i16 & 0xf
       self.D = (i16 >> 4) & 0xf
       self.E = (i16 >> 8) & 0xf
@@ -1598,17 +1652,19 @@ class Instruction35ms(Instruction):
     """
         This class represents all instructions which have the 35ms format
     """
+    __slots__ = ("cm", "G", "A", "BBBB", "C", "D", "E", "F")
+
     def __init__(self, cm, buff):
       super(Instruction35ms, self).__init__()
       self.cm = cm
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.G = (i16 >> 8) & 0xf
       self.A = (i16 >> 12) & 0xf
-      self.BBBB = unpack("=H", buff[2:4])[0]
+      self.BBBB = unpack_from("=H", buff, 2)[0]
 
-      i16 = unpack("=H", buff[4:6])[0]
+      i16 = unpack_from("=H", buff, 4)[0]
       self.C = i16 & 0xf
       self.D = (i16 >> 4) & 0xf
       self.E = (i16 >> 8) & 0xf
@@ -1665,16 +1721,18 @@ class Instruction3rmi(Instruction):
     """
         This class represents all instructions which have the 3rmi format
     """
+    __slots__ = ("cm", "AA", "BBBB", "CCCC", "NNNN")
+
     def __init__(self, cm, buff):
       super(Instruction3rmi, self).__init__()
       self.cm = cm
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBB = unpack("=H", buff[2:4])[0]
-      self.CCCC = unpack("=H", buff[4:6])[0]
+      self.BBBB = unpack_from("=H", buff, 2)[0]
+      self.CCCC = unpack_from("=H", buff, 4)[0]
 
       self.NNNN = self.CCCC + self.AA - 1
 
@@ -1718,16 +1776,18 @@ class Instruction3rms(Instruction):
     """
         This class represents all instructions which have the 3rms format
     """
+    __slots__ = ("cm", "AA", "BBBB", "CCCC", "NNNN")
+
     def __init__(self, cm, buff):
       super(Instruction3rms, self).__init__()
       self.cm = cm
 
-      i16 = unpack("=H", buff[0:2])[0]
+      i16 = unpack_from("=H", buff, 0)[0]
       self.OP = i16 & 0xff
       self.AA = (i16 >> 8) & 0xff
 
-      self.BBBB = unpack("=H", buff[2:4])[0]
-      self.CCCC = unpack("=H", buff[4:6])[0]
+      self.BBBB = unpack_from("=H", buff, 2)[0]
+      self.CCCC = unpack_from("=H", buff, 4)[0]
 
       self.NNNN = self.CCCC + self.AA - 1
 
@@ -1771,14 +1831,16 @@ class Instruction41c(Instruction):
     """
         This class represents all instructions which have the 41c format
     """
+    __slots__ = ("cm", "BBBBBBBB", "AAAA")
+
     def __init__(self, cm, buff):
       super(Instruction41c, self).__init__()
       self.cm = cm
 
-      self.OP = unpack("=H", buff[0:2])[0]
-      self.BBBBBBBB = unpack("=I", buff[2:6])[0]
+      self.OP = unpack_from("=H", buff, 0)[0]
+      self.BBBBBBBB = unpack_from("=I", buff, 2)[0]
 
-      self.AAAA = unpack("=H", buff[6:8])[0]
+      self.AAAA = unpack_from("=H", buff, 6)[0]
 
       #log_andro.debug("OP:%x %s AAAAA:%x BBBBB:%x" % (self.OP, args[0], self.AAAA, self.BBBBBBBB))
 
@@ -1807,13 +1869,15 @@ class Instruction40sc(Instruction):
     """
         This class represents all instructions which have the 40sc format
     """
+    __slots__ = ("cm", "BBBBBBBB", "AAAA")
+
     def __init__(self, cm, buff):
       super(Instruction40sc, self).__init__()
       self.cm = cm
 
-      self.OP = unpack("=H", buff[0:2])[0]
-      self.BBBBBBBB = unpack("=I", buff[2:6])[0]
-      self.AAAA = unpack("=H", buff[6:8])[0]
+      self.OP = unpack_from("=H", buff, 0)[0]
+      self.BBBBBBBB = unpack_from("=I", buff, 2)[0]
+      self.AAAA = unpack_from("=H", buff, 6)[0]
 
       #log_andro.debug("OP:%x %s AAAAA:%x BBBBB:%x" % (self.OP, args[0], self.AAAA, self.BBBBBBBB))
 
@@ -1842,14 +1906,16 @@ class Instruction52c(Instruction):
     """
         This class represents all instructions which have the 52c format
     """
+    __slots__ = ("cm", "CCCCCCCC", "AAAA", "BBBB")
+
     def __init__(self, cm, buff):
       super(Instruction52c, self).__init__()
       self.cm = cm
 
-      self.OP = unpack("=H", buff[0:2])[0]
-      self.CCCCCCCC = unpack("=I", buff[2:6])[0]
-      self.AAAA = unpack("=H", buff[6:8])[0]
-      self.BBBB = unpack("=H", buff[8:10])[0]
+      self.OP = unpack_from("=H", buff, 0)[0]
+      self.CCCCCCCC = unpack_from("=I", buff, 2)[0]
+      self.AAAA = unpack_from("=H", buff, 6)[0]
+      self.BBBB = unpack_from("=H", buff, 8)[0]
 
       #log_andro.debug("OP:%x %s AAAAA:%x BBBBB:%x" % (self.OP, args[0], self.AAAA, self.BBBB))
 
@@ -1878,14 +1944,16 @@ class Instruction5rc(Instruction):
     """
         This class represents all instructions which have the 5rc format
     """
+    __slots__ = ("cm", "BBBBBBBB", "AAAA", "CCCC", "NNNN")
+
     def __init__(self, cm, buff):
       super(Instruction5rc, self).__init__()
       self.cm = cm
 
-      self.OP = unpack("=H", buff[0:2])[0]
-      self.BBBBBBBB = unpack("=I", buff[2:6])[0]
-      self.AAAA = unpack("=H", buff[6:8])[0]
-      self.CCCC = unpack("=H", buff[8:10])[0]
+      self.OP = unpack_from("=H", buff, 0)[0]
+      self.BBBBBBBB = unpack_from("=I", buff, 2)[0]
+      self.AAAA = unpack_from("=H", buff, 6)[0]
+      self.CCCC = unpack_from("=H", buff, 8)[0]
 
       self.NNNN = self.CCCC + self.AAAA - 1
 
@@ -2316,4 +2384,203 @@ DALVIK_OPCODES_OPTIMIZED = {
     0xfeff : [ Instruction41c, ["sput-object-volatile/jumbo", KIND_FIELD ] ],
 
     0xffff : [ Instruction40sc, ["throw-verification-error/jumbo", VARIES ] ],
-}
\ No newline at end of file
+}
+
+# length in code units of every fixed-size format
+FORMAT_LENGTHS = {
+    Instruction10x: 1, Instruction12x: 1, Instruction11n: 1, Instruction11x: 1,
+    Instruction10t: 1,
+    Instruction20t: 2, Instruction20bc: 2, Instruction22x: 2, Instruction21t: 2,
+    Instruction21s: 2, Instruction21h: 2, Instruction21c: 2, Instruction23x: 2,
+    Instruction22b: 2, Instruction22t: 2, Instruction22s: 2, Instruction22c: 2,
+    Instruction22cs: 2,
+    Instruction30t: 3, Instruction32x: 3, Instruction31i: 3, Instruction31t: 3,
+    Instruction31c: 3, Instruction35c: 3, Instruction35ms: 3, Instruction35mi: 3,
+    Instruction3rc: 3, Instruction3rms: 3, Instruction3rmi: 3,
+    Instruction41c: 4, Instruction40sc: 4,
+    Instruction51l: 5, Instruction52c: 5, Instruction5rc: 5,
+}
+
+# operand decoders of every format for the column representation of a method,
+# each one returns the (A, B, C, reference index) slots of the instruction at
+# buff[idx] without building an Instruction object: registers and literals go
+# to A, B and C in the order of the format, the index returned by
+# get_ref_kind() goes to the reference slot (None if the format has none).
+# 35c-like formats store the register count in A and the packed registers
+# C|D<<4|E<<8|F<<12|G<<16 in B, 3rc-like formats the count and the first
+# register.
+def _s8(value):
+  return (value ^ 0x80) - 0x80
+
+def _operands_10x(buff, idx):
+  return 0, 0, 0, None
+
+def _operands_12x(buff, idx):
+  x = buff[idx + 1]
+  return x & 0xf, x >> 4, 0, None
+
+def _operands_11n(buff, idx):
+  x = buff[idx + 1]
+  return x & 0xf, (x >> 4) - 16 if x >= 0x80 else x >> 4, 0, None
+
+def _operands_11x(buff, idx):
+  return buff[idx + 1], 0, 0, None
+
+def _operands_10t(buff, idx):
+  return _s8(buff[idx + 1]), 0, 0, None
+
+def _operands_20t(buff, idx):
+  return unpack_from("=h", buff, idx + 2)[0], 0, 0, None
+
+def _operands_AA_u16(buff, idx):
+  return buff[idx + 1], unpack_from("=H", buff, idx + 2)[0], 0, None
+
+def _operands_AA_s16(buff, idx):
+  return buff[idx + 1], unpack_from("=h", buff, idx + 2)[0], 0, None
+
+def _operands_21c(buff, idx):
+  return buff[idx + 1], 0, 0, unpack_from("=H", buff, idx + 2)[0]
+
+def _operands_23x(buff, idx):
+  return buff[idx + 1], buff[idx + 2], buff[idx + 3], None
+
+def _operands_22b(buff, idx):
+  return buff[idx + 1], buff[idx + 2], _s8(buff[idx + 3]), None
+
+def _operands_22t(buff, idx):
+  x = buff[idx + 1]
+  return x & 0xf, x >> 4, unpack_from("=h", buff, idx + 2)[0], None
+
+def _operands_22c(buff, idx):
+  x = buff[idx + 1]
+  return x & 0xf, x >> 4, 0, unpack_from("=H", buff, idx + 2)[0]
+
+def _operands_30t(buff, idx):
+  return unpack_from("=i", buff, idx + 2)[0], 0, 0, None
+
+def _operands_32x(buff, idx):
+  AAAA, BBBB = unpack_from("=HH", buff, idx + 2)
+  return AAAA, BBBB, 0, None
+
+def _operands_AA_s32(buff, idx):
+  return buff[idx + 1], unpack_from("=i", buff, idx + 2)[0], 0, None
+
+def _operands_31c(buff, idx):
+  return buff[idx + 1], 0, 0, unpack_from("=I", buff, idx + 2)[0]
+
+def _operands_35c(buff, idx):
+  x = buff[idx + 1]
+  BBBB, regs = unpack_from("=HH", buff, idx + 2)
+  return x >> 4, regs | ((x & 0xf) << 16), 0, BBBB
+
+def _operands_3rc(buff, idx):
+  BBBB, CCCC = unpack_from("=HH", buff, idx + 2)
+  return buff[idx + 1], CCCC, 0, BBBB
+
+def _operands_41c(buff, idx):
+  BBBBBBBB, AAAA = unpack_from("=IH", buff, idx + 2)
+  return AAAA, 0, 0, BBBBBBBB
+
+def _operands_51l(buff, idx):
+  return buff[idx + 1], unpack_from("=q", buff, idx + 2)[0], 0, None
+
+def _operands_52c(buff, idx):
+  CCCCCCCC, AAAA, BBBB = unpack_from("=IHH", buff, idx + 2)
+  return AAAA, BBBB, 0, CCCCCCCC
+
+def _operands_5rc(buff, idx):
+  BBBBBBBB, AAAA, CCCC = unpack_from("=IHH", buff, idx + 2)
+  return AAAA, CCCC, 0, BBBBBBBB
+
+FORMAT_OPERANDS = {
+    InstructionInvalid: _operands_10x, Instruction10x: _operands_10x,
+    Instruction12x: _operands_12x, Instruction11n: _operands_11n,
+    Instruction11x: _operands_11x, Instruction10t: _operands_10t,
+    Instruction20t: _operands_20t, Instruction20bc: _operands_AA_u16,
+    Instruction22x: _operands_AA_u16, Instruction21t: _operands_AA_s16,
+    Instruction21s: _operands_AA_s16, Instruction21h: _operands_AA_s16,
+    Instruction21c: _operands_21c, Instruction23x: _operands_23x,
+    Instruction22b: _operands_22b, Instruction22t: _operands_22t,
+    Instruction22s: _operands_22t, Instruction22c: _operands_22c,
+    Instruction22cs: _operands_22c,
+    Instruction30t: _operands_30t, Instruction32x: _operands_32x,
+    Instruction31i: _operands_AA_s32, Instruction31t: _operands_AA_s32,
+    Instruction31c: _operands_31c, Instruction35c: _operands_35c,
+    Instruction35ms: _operands_35c, Instruction35mi: _operands_35c,
+    Instruction3rc: _operands_3rc, Instruction3rms: _operands_3rc,
+    Instruction3rmi: _operands_3rc,
+    Instruction41c: _operands_41c, Instruction40sc: _operands_41c,
+    Instruction51l: _operands_51l, Instruction52c: _operands_52c,
+    Instruction5rc: _operands_5rc,
+}
+
+def get_payload_operands(buff, idx):
+  """
+    Return the (length in bytes, A, B, C) slots of the payload at buff[idx]:
+    the number of elements, then the element width of a fill-array-data
+    payload or the first key of a packed-switch
+
+    :rtype: tuple
+  """
+  ident, size = unpack_from("=HH", buff, idx)
+  if ident == 0x0300:
+    element_width = size
+    size = unpack_from("=I", buff, idx + 4)[0]
+    return ((size * element_width + 1) // 2 + 4) * 2, size, element_width, 0
+  elif ident == 0x0100:
+    return PackedSwitch.format_general_size + size * 4, size, unpack_from("=i", buff, idx + 4)[0], 0
+  length = SparseSwitch.format_general_size + size * 8
+  if idx + length > len(buff):
+    raise error("truncated sparse-switch-payload")
+  return length, size, 0, 0
+
+INVALID_OPCODE = (InstructionInvalid, "AG:invalid_instruction", None, 1)
+
+def _compile_opcodes(opcodes, key):
+  # flatten an opcode dict into 256 (decoder, name, kind, length in code units) tuples
+  table = [INVALID_OPCODE] * 256
+  for op_value, (decoder, desc) in opcodes.items():
+    kind = desc[1] if len(desc) > 1 else None
+    table[key(op_value)] = (decoder, desc[0], kind, FORMAT_LENGTHS[decoder])
+  return tuple(table)
+
+# classic opcodes, indexed by the low byte of the first code unit
+DALVIK_OPCODES_TABLE = _compile_opcodes(DALVIK_OPCODES_FORMAT, lambda op_value: op_value)
+
+# extended (0x01ff-0x26ff) and optimized (0xf2ff-0xffff) opcodes share the
+# 0xff low byte, they are indexed by the high byte; a 0xff with a zero high
+# byte is not an extended opcode (0x00ff const-class/jumbo never shipped)
+DALVIK_OPCODES_EXTENDED_TABLE = _compile_opcodes(DALVIK_OPCODES_EXTENDED_WIDTH, lambda op_value: op_value >> 8)
+DALVIK_OPCODES_OPTIMIZED_TABLE = _compile_opcodes(DALVIK_OPCODES_OPTIMIZED, lambda op_value: op_value >> 8)
+
+# payloads (0x0100, 0x0200, 0x0300) have a 0x00 low byte, indexed by the high byte
+DALVIK_PAYLOAD_TABLE = tuple(DALVIK_OPCODES_PAYLOAD.get(i << 8, [None])[0] for i in range(0, 256))
+
+def get_opcode_entry(op_value):
+  """
+    Return the (decoder, name, kind, length) entry of an opcode
+
+    :param op_value: the opcode, a byte or a 16-bit extended/optimized opcode
+    :type op_value: int
+
+    :rtype: tuple
+  """
+  # only a 0xff with a nonzero high byte is extended, a plain 0xff is the
+  # invalid entry of the classic table
+  if op_value > 0xff:
+    if op_value >= 0xf2ff:
+      return DALVIK_OPCODES_OPTIMIZED_TABLE[op_value >> 8]
+    return DALVIK_OPCODES_EXTENDED_TABLE[op_value >> 8]
+  return DALVIK_OPCODES_TABLE[op_value]
+
+def get_instruction(cm, op_value, buff, odex=False):
+  return DALVIK_OPCODES_TABLE[op_value][0](cm, buff)
+
+def get_extented_instruction(cm, op_value, buff):
+  return DALVIK_OPCODES_EXTENDED_TABLE[op_value >> 8][0](cm, buff)
+
+def get_optimized_instruction(cm, op_value, buff):
+  return DALVIK_OPCODES_OPTIMIZED_TABLE[op_value >> 8][0](cm, buff)
+
+def get_instruction_payload(op_value, buff):
+  return DALVIK_PAYLOAD_TABLE[op_value >> 8](buff)
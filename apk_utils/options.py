@@ -1,7 +1,9 @@
 import os
 import sys
+import struct
 import logging
 import logging.handlers
+from collections import namedtuple, OrderedDict
 
 def apktool_win(path, indir, outdir):
     bat = indir + '\\tool\\apktool.bat'
@@ -60,9 +62,140 @@ class Logger(object):
         logger.setLevel(logging.INFO)
         return logger
 
+def record(name, layout):
+    """
+        Build a record type for a fixed little-endian layout
+
+        The layout is compiled once into a single :class:`struct.Struct`, the
+        returned class is a slotted namedtuple whose `_unpack_from(buff, off)`
+        decodes every field in one call.
+
+        :param name: the name of the record
+        :type name: string
+        :param layout: (field name, struct format) pairs, a field named None is
+            padding: its bytes are skipped and it is not a field of the record
+        :type layout: list
+
+        :rtype: a namedtuple subclass
+    """
+    st = struct.Struct("<" + "".join(fmt if field is not None else "%dx" % struct.calcsize("<" + fmt)
+                                     for field, fmt in layout))
+    base = namedtuple(name, [field for field, _ in layout if field is not None])
+
+    def _unpack_from(cls, buff, offset=0):
+        return tuple.__new__(cls, st.unpack_from(buff, offset))
+
+    return type(name, (base,), {
+        "__slots__": (),
+        "_struct": st,
+        "_size": st.size,
+        "_unpack_from": classmethod(_unpack_from),
+    })
+
+class LRUCache(object):
+    """
+        A mapping which keeps only the `size` most recently used entries
+
+        With a weight function, `size` bounds the total weight of the entries
+        instead of their number and the least recently used ones are evicted
+        until the total fits.
+
+        :param size: the maximum number of entries (or total weight), None for no bound and 0 to disable the cache
+        :type size: int
+        :param weight: a function returning the weight of a value
+        :param evicted: a function called with (key, value) for every entry evicted or cleared
+    """
+    def __init__(self, size, weight=None, evicted=None):
+        self.size = size
+        self.weight = weight
+        self.evicted = evicted
+        self.total = 0
+        self.__items = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self.__items[key]
+        except KeyError:
+            return default
+        self.__items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.size == 0:
+            return
+        if key in self.__items:
+            self.pop(key)
+        weight = self.__weigh(value)
+        # a value heavier than the whole cache would only flush it
+        if self.size is not None and weight > self.size:
+            return
+        self.__items[key] = value
+        self.total += weight
+        self.__evict()
+
+    def pop(self, key, default=None):
+        try:
+            value = self.__items.pop(key)
+        except KeyError:
+            return default
+        self.total -= self.__weigh(value)
+        return value
+
+    def resize(self, size):
+        """
+            Change the bound and evict what no longer fits
+
+            :param size: the maximum number of entries (or total weight)
+            :type size: int
+        """
+        self.size = size
+        if size == 0:
+            self.clear()
+        self.__evict()
+
+    def clear(self):
+        items = self.__items
+        self.__items = OrderedDict()
+        self.total = 0
+        if self.evicted is not None:
+            for key, value in items.items():
+                self.evicted(key, value)
+
+    def __evict(self):
+        if self.size is None:
+            return
+        while self.__items and (self.total if self.weight else len(self.__items)) > self.size:
+            key, value = self.__items.popitem(last=False)
+            self.total -= self.__weigh(value)
+            if self.evicted is not None:
+                self.evicted(key, value)
+
+    def __weigh(self, value):
+        if self.weight is None:
+            return 1
+        return self.weight(value)
+
+    def __contains__(self, key):
+        return key in self.__items
+
+    def __len__(self):
+        return len(self.__items)
+
+_U8  = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_S32 = struct.Struct("<i")
+_U64 = struct.Struct("<Q")
+
 class ByteCode(object):
+    """
+        A cursor over a raw buffer (bytes, bytearray, mmap or memoryview).
+
+        Every read hands back a memoryview slice or a decoded value, the
+        underlying buffer is never copied.
+    """
     def __init__(self, rawBinary):
-        self.__buff = rawBinary
+        self.__buff = memoryview(rawBinary)
         self.__index = 0
 
     def read(self, size):
@@ -74,6 +207,97 @@ class ByteCode(object):
     def readat(self, off):
         return self.__buff[off:]
 
+    def read_struct(self, st):
+        """
+            Decode a fixed-size record at the current index
+
+            :param st: the layout of the record
+            :type st: :class:`struct.Struct`
+
+            :rtype: tuple
+        """
+        value = st.unpack_from(self.__buff, self.__index)
+        self.__index += st.size
+        return value
+
+    def read_record(self, rec):
+        """
+            Decode a record built by :func:`record` at the current index
+
+            :rtype: an instance of `rec`
+        """
+        value = rec._unpack_from(self.__buff, self.__index)
+        self.__index += rec._size
+        return value
+
+    def unpack_at(self, st, off):
+        """
+            Decode a fixed-size record at `off` without moving the index
+
+            :rtype: tuple
+        """
+        return st.unpack_from(self.__buff, off)
+
+    def read_u8(self):
+        value = _U8.unpack_from(self.__buff, self.__index)[0]
+        self.__index += 1
+        return value
+
+    def read_u16(self):
+        value = _U16.unpack_from(self.__buff, self.__index)[0]
+        self.__index += 2
+        return value
+
+    def read_u32(self):
+        value = _U32.unpack_from(self.__buff, self.__index)[0]
+        self.__index += 4
+        return value
+
+    def read_s32(self):
+        value = _S32.unpack_from(self.__buff, self.__index)[0]
+        self.__index += 4
+        return value
+
+    def read_u64(self):
+        value = _U64.unpack_from(self.__buff, self.__index)[0]
+        self.__index += 8
+        return value
+
+    def read_uleb128(self):
+        buff = self.__buff
+        idx = self.__index
+        result = 0
+        shift = 0
+        while True:
+            cur = buff[idx]
+            idx += 1
+            result |= (cur & 0x7f) << shift
+            if cur < 0x80 or shift >= 28:
+                break
+            shift += 7
+        self.__index = idx
+        return result
+
+    def read_uleb128p1(self):
+        return self.read_uleb128() - 1
+
+    def read_sleb128(self):
+        buff = self.__buff
+        idx = self.__index
+        result = 0
+        shift = 0
+        while True:
+            cur = buff[idx]
+            idx += 1
+            result |= (cur & 0x7f) << shift
+            shift += 7
+            if cur < 0x80 or shift >= 35:
+                break
+        if cur & 0x40:
+            result -= 1 << shift
+        self.__index = idx
+        return result
+
     def set_idx(self, index):
         self.__index = index
 
@@ -84,4 +308,4 @@ class ByteCode(object):
         return self.__buff
 
     def len_buff(self):
-        return len(self.__buff)
\ No newline at end of file
+        return len(self.__buff)
@@ -0,0 +1,95 @@
+"""
+    Peak memory and time of a whole-app disassembly
+
+    Every method of every dex of an APK (or of a single dex) is disassembled
+    and kept alive, either as slotted instruction objects or as
+    :class:`DCodeColumns`. Run each mode in its own process, the peak RSS of
+    a process never goes down:
+
+        python benchmarks/bench_disasm.py objects app.apk
+        python benchmarks/bench_disasm.py columns app.apk
+
+    Without a path, a synthetic stream of random fixed-size instructions is
+    used instead; its numbers say nothing about a real application.
+"""
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from apk_utils.apk import APK
+from apk_utils.dexFile import DalvikVMFormat, DCodeColumns, LinearSweepAlgorithm
+from apk_utils.file import File
+from apk_utils.instruction import DALVIK_OPCODES_TABLE
+
+SYNTHETIC_OPCODES = [0x01, 0x0e, 0x12, 0x13, 0x14, 0x15, 0x18, 0x1a, 0x22, 0x38, 0x52, 0x59, 0x6e, 0x70, 0x90, 0xd8]
+
+def peakRss():
+    # kilobytes on linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def iterCodes(path):
+    fileInfo = File(path, useMmap=True)
+    if path.endswith(".dex"):
+        vms = [DalvikVMFormat(fileInfo)]
+    else:
+        apk = APK(fileInfo)
+        vms = [apk.getDalvikVMFormat(name) for name in apk.getDexNames()]
+
+    for vm in vms:
+        for classDef in vm.get_classes():
+            classData = classDef.get_class_data()
+            if classData == None:
+                continue
+            for method in classData.get_methods():
+                code = method.get_code()
+                if code != None:
+                    yield code.get_bc()
+
+def disassemble(code, mode):
+    if mode == "columns":
+        return code.get_columns()
+    return list(code.get_instructions())
+
+def synthetic(size=12000000, seed=7):
+    rand = random.Random(seed)
+    buff = bytearray()
+    while len(buff) < size:
+        op_value = rand.choice(SYNTHETIC_OPCODES)
+        length = DALVIK_OPCODES_TABLE[op_value][3] * 2
+        buff += bytes([op_value]) + bytes(rand.randrange(256) for _ in range(length - 1))
+    return bytes(buff)
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in ("objects", "columns"):
+        print("usage: %s objects|columns [app.apk|classes.dex]" % argv[0])
+        return 1
+    mode = argv[1]
+
+    if len(argv) > 2:
+        base = peakRss()
+        start = time.time()
+        kept = [disassemble(code, mode) for code in iterCodes(argv[2])]
+        count = sum(len(method) for method in kept)
+        source = argv[2]
+    else:
+        buff = synthetic()
+        base = peakRss()
+        start = time.time()
+        if mode == "columns":
+            kept = DCodeColumns(None, len(buff) // 2, buff)
+        else:
+            kept = list(LinearSweepAlgorithm.get_instructions(None, len(buff) // 2, memoryview(buff), 0))
+        count = len(kept)
+        source = "synthetic stream"
+
+    print("%s, %s: %d instructions, %.2fs, peak RSS +%.0f MB" % (
+        source, mode, count, time.time() - start, (peakRss() - base) / 1048576.0))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,270 @@
+"""
+    Builders of the small binary files the tests parse: binary XML, a
+    resources.arsc and a dex with a single method
+"""
+import struct
+
+ANDROID_URI = "http://schemas.android.com/apk/res/android"
+
+# resource ids of the android: attributes the builders name
+ANDROID_RES_IDS = {
+    "label": 0x01010001,
+    "name": 0x01010003,
+    "exported": 0x01010010,
+    "minSdkVersion": 0x0101020c,
+    "targetSdkVersion": 0x01010270,
+    "versionCode": 0x0101021b,
+    "versionName": 0x0101021c,
+}
+
+TYPE_REFERENCE = 0x01
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+TYPE_INT_BOOLEAN = 0x12
+
+def string_pool(strings, utf8=False):
+    offsets = []
+    data = b""
+    for s in strings:
+        offsets.append(len(data))
+        if utf8:
+            raw = s.encode("utf-8")
+            data += _utf8_length(len(s)) + _utf8_length(len(raw)) + raw + b"\0"
+        else:
+            raw = s.encode("utf-16-le")
+            data += struct.pack("<H", len(raw) // 2) + raw + b"\0\0"
+    while len(data) % 4:
+        data += b"\0"
+
+    start = 28 + 4 * len(strings)
+    return struct.pack("<IIIIIII", 0x001c0001, start + len(data), len(strings), 0,
+                       0x100 if utf8 else 0, start, 0) + \
+        b"".join(struct.pack("<I", off) for off in offsets) + data
+
+def _utf8_length(n):
+    return bytes([n]) if n < 0x80 else bytes([0x80 | (n >> 8), n & 0xff])
+
+def attribute(ns, name, raw, data_type, data):
+    return struct.pack("<iiiHBBI", ns, name, raw, 8, 0, data_type, data)
+
+def start_tag(name, attributes, line=1, ns=-1):
+    body = b"".join(attributes)
+    return struct.pack("<IIIiiiHHHHHH", 0x00100102, 36 + len(body), line, -1, ns, name,
+                       0x14, 0x14, len(attributes), 0, 0, 0) + body
+
+def end_tag(name, line=1, ns=-1):
+    return struct.pack("<IIIiii", 0x00100103, 24, line, -1, ns, name)
+
+def namespace(prefix, uri, end=False):
+    return struct.pack("<IIIiii", 0x00100101 if end else 0x00100100, 24, 1, -1, prefix, uri)
+
+def text(idx, line=1):
+    return struct.pack("<IIIiiII", 0x00100104, 28, line, -1, idx, 8, 0)
+
+def xml_file(chunks):
+    return struct.pack("<II", 0x00080003, 8 + len(chunks)) + chunks
+
+def axml(tree, utf8=False, texts=None):
+    """
+        A binary XML file
+
+        tree is (tag, [(android?, name, value)], [children]); a str value is a
+        string with its raw value, an int an int, a bool a boolean and a tuple
+        (type, data[, raw string]) a typed value as is. texts maps a tag to
+        the text put after its start tag.
+    """
+    names = []
+
+    def collect(node):
+        tag, attrs, children = node
+        for android, name, value in attrs:
+            if android and name not in names:
+                names.append(name)
+        for child in children:
+            collect(child)
+    collect(tree)
+
+    # the names with a resource id come first in the pool
+    strings = list(names)
+
+    def idx(s):
+        if s not in strings:
+            strings.append(s)
+        return strings.index(s)
+
+    prefix, uri = idx("android"), idx(ANDROID_URI)
+    body = []
+
+    def emit(node):
+        tag, attrs, children = node
+        encoded = []
+        for android, name, value in attrs:
+            ns = uri if android else -1
+            if isinstance(value, tuple):
+                raw = idx(value[2]) if len(value) > 2 else -1
+                encoded.append(attribute(ns, idx(name), raw, value[0], value[1]))
+            elif isinstance(value, bool):
+                encoded.append(attribute(ns, idx(name), -1, TYPE_INT_BOOLEAN, 0xffffffff if value else 0))
+            elif isinstance(value, int):
+                encoded.append(attribute(ns, idx(name), -1, TYPE_INT_DEC, value))
+            else:
+                encoded.append(attribute(ns, idx(name), idx(value), TYPE_STRING, idx(value)))
+        body.append(start_tag(idx(tag), encoded))
+        if texts and tag in texts:
+            body.append(text(idx(texts[tag])))
+        for child in children:
+            emit(child)
+        body.append(end_tag(idx(tag)))
+    emit(tree)
+
+    res_ids = struct.pack("<II", 0x00080180, 8 + 4 * len(names)) + \
+        b"".join(struct.pack("<I", ANDROID_RES_IDS[name]) for name in names)
+    chunks = string_pool(strings, utf8) + res_ids + namespace(prefix, uri) + \
+        b"".join(body) + namespace(prefix, uri, end=True)
+    return xml_file(chunks)
+
+def manifest(components=(), versionCode=1, minSdkVersion=21):
+    """
+        An AndroidManifest.xml, components is a list of (tag, name, exported)
+        where exported is an attribute value or None for no attribute
+    """
+    application = []
+    for tag, name, exported in components:
+        attrs = [(True, "name", name)]
+        if exported is not None:
+            attrs.append((True, "exported", exported))
+        application.append((tag, attrs, []))
+    return axml(("manifest", [(True, "versionCode", versionCode), (True, "versionName", "1.0"),
+                              (False, "package", "com.example.app")],
+                 [("uses-sdk", [(True, "minSdkVersion", minSdkVersion)], []),
+                  ("application", [(True, "label", "App")], application)]))
+
+def _config(language=b"", density=0):
+    return struct.pack("<IHH2s2sBBHBBBBHHHH", 28, 0, 0, language.ljust(2, b"\0"), b"\0\0",
+                       0, 0, density, 0, 0, 0, 0, 0, 0, 0, 0)
+
+def _type_chunk(type_id, entries, config, sparse=False):
+    # entries: (index, key, (type, data)), (index, key, ("compact", type, data))
+    # or (index, key, ("bag", [(name, type, data)]))
+    count = len(entries) if sparse else max(i for i, _, _ in entries) + 1
+    body = b""
+    offsets = {}
+    for i, key, value in entries:
+        offsets[i] = len(body)
+        if value[0] == "bag":
+            body += struct.pack("<HHIII", 16, 1, key, 0, len(value[1]))
+            body += b"".join(struct.pack("<IHBBI", name, 8, 0, t, d) for name, t, d in value[1])
+        elif value[0] == "compact":
+            body += struct.pack("<HHI", key, 0x0008 | value[1] << 8, value[2])
+        else:
+            body += struct.pack("<HHI", 8, 0, key) + struct.pack("<HBBI", 8, 0, value[0], value[1])
+    header_size = 20 + len(config)
+    if sparse:
+        index = b"".join(struct.pack("<HH", i, offsets[i] // 4) for i, _, _ in sorted(entries))
+    else:
+        index = b"".join(struct.pack("<I", offsets.get(i, 0xffffffff)) for i in range(count))
+    start = header_size + len(index)
+    return struct.pack("<HHIBBHII", 0x0201, header_size, start + len(body), type_id,
+                       1 if sparse else 0, 0, count, start) + config + index + body
+
+def arsc(compact=False):
+    """
+        A resources.arsc of package 0x7f: string/app_name (0x7f020000, "My App",
+        "Mon App" in fr, compact entries if compact), drawable/icon (0x7f030001,
+        sparse) and drawable/style (0x7f030000, a bag)
+    """
+    global_strings = string_pool(["My App", "Mon App", "res/drawable/icon.png"])
+    types = string_pool(["attr", "string", "drawable"])
+    keys = string_pool(["app_name", "icon", "style"])
+
+    def spec(type_id, count):
+        return struct.pack("<HHIBBHI", 0x0202, 16, 16 + 4 * count, type_id, 0, 0, count) + b"\0" * 4 * count
+
+    body = types + keys + spec(2, 1)
+    def value(data):
+        return ("compact", TYPE_STRING, data) if compact else (TYPE_STRING, data)
+
+    body += _type_chunk(2, [(0, 0, value(0))], _config())
+    body += _type_chunk(2, [(0, 0, value(1))], _config(b"fr"))
+    body += spec(3, 2) + _type_chunk(3, [(1, 1, (TYPE_STRING, 2))], _config(), sparse=True)
+    body += _type_chunk(3, [(0, 2, ("bag", [(0x01010001, TYPE_INT_DEC, 5), (0x01010002, TYPE_REFERENCE, 0x7f020000)]))],
+                        _config(density=480))
+
+    header_size = 0x11c
+    name = "com.example".encode("utf-16-le").ljust(256, b"\0")
+    package = struct.pack("<HHII", 0x0200, header_size, header_size + len(body), 0x7f) + name + \
+        struct.pack("<IIII", header_size, 0, header_size + len(types), 0) + body
+    return struct.pack("<HHII", 0x0002, 12, 12 + len(global_strings) + len(package), 1) + global_strings + package
+
+def _uleb(value):
+    out = b""
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if not value:
+            return out + bytes([byte])
+        out += bytes([byte | 0x80])
+
+def dex(insns=(0x0012, 0x001a, 0x0003, 0x000e)):
+    """
+        A dex with one class LFoo; whose method <init>()V has insns as code
+        units, by default: const/4 v0, 0; const-string v0, "Ljava/lang/Object;";
+        return-void
+    """
+    strings = ["<init>", "I", "LFoo;", "Ljava/lang/Object;", "V", "VI"]
+    types = ["I", "LFoo;", "Ljava/lang/Object;", "V"]
+    protos = [(strings.index("V"), types.index("V"))]
+    methods = [(types.index("LFoo;"), 0, strings.index("<init>"))]
+
+    off = 0x70
+    string_ids = off
+    off += 4 * len(strings)
+    type_ids = off
+    off += 4 * len(types)
+    proto_ids = off
+    off += 12 * len(protos)
+    method_ids = off
+    off += 8 * len(methods)
+    class_defs = off
+    off += 32
+    data_off = off
+
+    data = bytearray()
+    string_data = []
+    for s in strings:
+        string_data.append(off + len(data))
+        data += _uleb(len(s)) + s.encode("ascii") + b"\0"
+    while len(data) % 4:
+        data.append(0)
+
+    code_off = off + len(data)
+    data += struct.pack("<HHHHII", 1, 1, 0, 0, 0, len(insns)) + b"".join(struct.pack("<H", i) for i in insns)
+    while len(data) % 4:
+        data.append(0)
+
+    class_data = off + len(data)
+    # no field, one direct method: access public|constructor
+    data += _uleb(0) + _uleb(0) + _uleb(1) + _uleb(0) + _uleb(0) + _uleb(0x10001) + _uleb(code_off)
+    while len(data) % 4:
+        data.append(0)
+
+    map_off = off + len(data)
+    items = [(0x0, 1, 0), (0x1, len(strings), string_ids), (0x2, len(types), type_ids),
+             (0x3, len(protos), proto_ids), (0x5, len(methods), method_ids), (0x6, 1, class_defs),
+             (0x2002, len(strings), string_data[0]), (0x2001, 1, code_off), (0x2000, 1, class_data),
+             (0x1000, 1, map_off)]
+    data += struct.pack("<I", len(items)) + b"".join(struct.pack("<HHII", t, 0, n, o) for t, n, o in items)
+
+    body = b"".join(struct.pack("<I", o) for o in string_data)
+    body += b"".join(struct.pack("<I", strings.index(t)) for t in types)
+    body += b"".join(struct.pack("<III", shorty, ret, 0) for shorty, ret in protos)
+    body += b"".join(struct.pack("<HHI", *m) for m in methods)
+    body += struct.pack("<8I", types.index("LFoo;"), 1, types.index("Ljava/lang/Object;"), 0,
+                        0xffffffff, 0, class_data, 0)
+
+    header = struct.pack("<8sI20sIIIII", b"dex\n035\0", 0, b"\0" * 20, off + len(data), 0x70, 0x12345678, 0, 0)
+    header += struct.pack("<I", map_off)
+    for n, o in [(len(strings), string_ids), (len(types), type_ids), (len(protos), proto_ids), (0, 0),
+                 (len(methods), method_ids), (1, class_defs), (len(data), data_off)]:
+        header += struct.pack("<II", n, o)
+    return bytes(header + body + data)
@@ -0,0 +1,109 @@
+import random
+import struct
+import unittest
+
+from apk_utils.dexFile import DCode, DCodeColumns, LinearSweepAlgorithm, NO_INDEX
+from apk_utils.file import ParseError
+from apk_utils.instruction import DALVIK_OPCODES_TABLE, INVALID_OPCODE, Instruction
+
+# every classic opcode with a decoder, but nop whose high byte may announce a payload
+OPCODES = [op_value for op_value in range(1, 0x100) if DALVIK_OPCODES_TABLE[op_value] is not INVALID_OPCODE]
+
+PACKED_SWITCH = struct.pack("<HHi", 0x0100, 2, 10) + struct.pack("<ii", 4, 8)
+FILL_ARRAY_DATA = struct.pack("<HHI", 0x0300, 2, 3) + b"\x01\x02\x03\x04\x05\x06"
+
+def stream(rand, count):
+    buff = bytearray()
+    for _ in range(count):
+        op_value = rand.choice(OPCODES)
+        length = DALVIK_OPCODES_TABLE[op_value][3] * 2
+        buff += bytes([op_value]) + bytes(rand.randrange(256) for _ in range(length - 1))
+    return buff
+
+def ref_kind(obj):
+    # the base Instruction "raises" a string, a TypeError in python 3
+    try:
+        return obj.get_ref_kind()
+    except TypeError:
+        return None
+
+def sweep(buff, odex=False):
+    return list(LinearSweepAlgorithm.get_instructions(None, len(buff) // 2, memoryview(buff), 0, odex))
+
+class ColumnsTest(unittest.TestCase):
+    def assertSameInstructions(self, buff, odex=False):
+        objects = sweep(buff, odex)
+        columns = DCodeColumns(None, len(buff) // 2, memoryview(buff), odex=odex)
+        self.assertEqual(len(columns), len(objects))
+
+        off = 0
+        for pos, obj in enumerate(objects):
+            view = columns.get(pos)
+            self.assertEqual(view.offset, off)
+            self.assertEqual(view.length, obj.get_length())
+            self.assertEqual(view.op_value, obj.get_op_value())
+            self.assertEqual(view.get_name(), obj.get_name())
+            if isinstance(obj, Instruction):
+                self.assertEqual(view.get_kind(), obj.get_kind())
+                self.assertEqual(None if view.ref == NO_INDEX else view.ref, ref_kind(obj))
+                decoded = view.get_instruction()
+                self.assertIs(type(decoded), type(obj))
+                self.assertEqual(decoded.get_raw(), obj.get_raw())
+            off += obj.get_length()
+
+    def test_random_streams(self):
+        rand = random.Random(23)
+        for _ in range(300):
+            self.assertSameInstructions(stream(rand, 40))
+
+    def test_payloads(self):
+        rand = random.Random(5)
+        buff = stream(rand, 10)
+        self.assertSameInstructions(buff + PACKED_SWITCH + stream(rand, 3) + FILL_ARRAY_DATA)
+
+    def test_0xff(self):
+        # a plain 0xff, 0xff with a zero high byte, an extended and an unknown extended opcode
+        for odex in (False, True):
+            for code in (b"\xff", b"\xff\x00", b"\xff\x01", b"\xff\x27", b"\xff\xf2"):
+                buff = bytearray(code.ljust(2, b"\x00")) + bytes(12) + b"\x0e\x00"
+                self.assertSameInstructions(buff, odex)
+
+        columns = DCodeColumns(None, 4, b"\xff\x00\x0e\x00\x0e\x00\x0e\x00")
+        self.assertIs(columns.get_entry(0), INVALID_OPCODE)
+        self.assertEqual(columns.get(0).length, 2)
+
+    def test_truncated_instruction(self):
+        # const-wide (5 code units) cut after 2
+        buff = b"\x0e\x00\x18\x00\x01\x00"
+        with self.assertRaises(ParseError):
+            sweep(buff)
+        with self.assertRaises(ParseError):
+            DCodeColumns(None, len(buff) // 2, buff)
+        with self.assertRaises(ParseError):
+            sweep(b"\x0e\x00" + PACKED_SWITCH[:-2])
+        with self.assertRaises(ParseError):
+            DCodeColumns(None, 10, b"\x0e\x00" + PACKED_SWITCH[:-2])
+
+class OffsetsTest(unittest.TestCase):
+    def test_offsets_match_the_sweep(self):
+        rand = random.Random(7)
+        for _ in range(100):
+            buff = bytes(stream(rand, 30) + PACKED_SWITCH)
+            objects = sweep(buff)
+            code = DCode(None, 0, len(buff) // 2, buff)
+
+            expected = []
+            off = 0
+            for obj in objects:
+                expected.append(off)
+                off += obj.get_length()
+            self.assertEqual(list(code.get_offsets()), expected)
+
+            for pos, off in enumerate(expected):
+                self.assertEqual(code.off_to_pos(off), pos)
+                self.assertEqual(code.get_ins_off(off).get_raw(), objects[pos].get_raw())
+            self.assertEqual(code.off_to_pos(expected[-1] + 1), -1)
+            self.assertIsNone(code.get_ins_off(len(buff)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import gc
+import threading
+import unittest
+import weakref
+
+import builders
+from apk_utils import dexFile
+from apk_utils.dexFile import DalvikVMFormat, DCode, AlwaysCache, CacheAfterUses, NeverCache, INSTRUCTION_CACHE
+from apk_utils.file import File
+from apk_utils.options import LRUCache
+
+# const/4 v0, 0; return-void
+CODE = b"\x12\x00\x0e\x00"
+
+def method_code(vm):
+    for classDef in vm.get_classes():
+        for method in classDef.get_class_data().get_methods():
+            return method.get_code().get_bc()
+
+class LRUCacheTest(unittest.TestCase):
+    def test_evicted_callback(self):
+        evicted = []
+        cache = LRUCache(3, len, lambda key, value: evicted.append(key))
+        cache.put("a", [1])
+        cache.put("b", [1, 2])
+        cache.get("a")
+        cache.put("c", [1])
+        self.assertEqual(evicted, ["b"])
+        self.assertEqual(cache.total, 2)
+
+        cache.clear()
+        self.assertEqual(sorted(evicted), ["a", "b", "c"])
+        self.assertEqual(cache.total, 0)
+
+    def test_value_heavier_than_the_cache(self):
+        cache = LRUCache(2, len)
+        cache.put("a", [1])
+        cache.put("b", [1, 2, 3])
+        self.assertNotIn("b", cache)
+        self.assertIn("a", cache)
+
+class InstructionCacheTest(unittest.TestCase):
+    def setUp(self):
+        INSTRUCTION_CACHE.clear()
+        INSTRUCTION_CACHE.set_policy(AlwaysCache())
+        INSTRUCTION_CACHE.set_size(dexFile.INSTRUCTION_CACHE_SIZE)
+
+    def tearDown(self):
+        INSTRUCTION_CACHE.clear()
+        INSTRUCTION_CACHE.set_policy(CacheAfterUses())
+        INSTRUCTION_CACHE.set_size(dexFile.INSTRUCTION_CACHE_SIZE)
+
+    def test_cached_instructions_are_reused(self):
+        code = DCode(None, 0, 2, CODE)
+        first = list(code.get_instructions())
+        self.assertEqual([i.get_name() for i in first], ["const/4", "return-void"])
+        self.assertTrue(all(a is b for a, b in zip(first, code.get_instructions())))
+        self.assertEqual(INSTRUCTION_CACHE.get_size(), 2)
+
+    def test_never_cache(self):
+        INSTRUCTION_CACHE.set_policy(NeverCache())
+        code = DCode(None, 0, 2, CODE)
+        list(code.get_instructions())
+        self.assertIsNone(code.get_cached_instructions())
+        self.assertEqual(INSTRUCTION_CACHE.get_size(), 0)
+
+    def test_cache_after_uses(self):
+        INSTRUCTION_CACHE.set_policy(CacheAfterUses(uses=2, size=None))
+        code = DCode(None, 0, 2, CODE)
+        for _ in range(2):
+            list(code.get_instructions())
+            self.assertIsNone(code.get_cached_instructions())
+        list(code.get_instructions())
+        self.assertIsNotNone(code.get_cached_instructions())
+
+    def test_least_recently_used_method_is_evicted(self):
+        INSTRUCTION_CACHE.set_size(4)
+        codes = [DCode(None, 0, 2, CODE) for _ in range(3)]
+        list(codes[0].get_instructions())
+        list(codes[1].get_instructions())
+        codes[0].get_cached_instructions()
+        list(codes[2].get_instructions())
+
+        self.assertIsNotNone(codes[0].get_cached_instructions())
+        self.assertIsNone(codes[1].get_cached_instructions())
+        self.assertIsNone(codes[1].kept_instructions)
+        self.assertEqual(INSTRUCTION_CACHE.get_size(), 4)
+
+        INSTRUCTION_CACHE.set_size(0)
+        self.assertTrue(all(code.kept_instructions is None for code in codes))
+        self.assertEqual(INSTRUCTION_CACHE.get_size(), 0)
+
+    def test_collected_method_is_released(self):
+        code = DCode(None, 0, 2, CODE)
+        list(code.get_instructions())
+        del code
+        gc.collect()
+        self.assertEqual(INSTRUCTION_CACHE.get_size(), 0)
+        self.assertEqual(INSTRUCTION_CACHE.finalizers, {})
+
+    def test_cache_does_not_keep_the_dex_alive(self):
+        vm = DalvikVMFormat(File("classes.dex", rawBinary=builders.dex()))
+        self.assertEqual(len(list(method_code(vm).get_instructions())), 3)
+        cm = weakref.ref(vm.get_class_manager())
+
+        del vm
+        gc.collect()
+        self.assertIsNone(cm())
+        self.assertEqual(INSTRUCTION_CACHE.get_size(), 0)
+
+    def test_instructions_outlive_the_dex(self):
+        vm = DalvikVMFormat(File("classes.dex", rawBinary=builders.dex()))
+        instructions = list(method_code(vm).get_instructions())
+        del vm
+        gc.collect()
+        # no ReferenceError: the instructions hold the ClassManager themselves
+        self.assertEqual(instructions[1].get_output(), "v0, 'Ljava/lang/Object;'")
+
+    def test_threads(self):
+        INSTRUCTION_CACHE.set_size(10)
+        codes = [DCode(None, 0, 2, CODE) for _ in range(8)]
+        errors = []
+
+        def work():
+            try:
+                for n in range(300):
+                    for code in codes:
+                        self.assertEqual(len(list(code.get_instructions())), 2)
+                        if n % 7 == 0:
+                            INSTRUCTION_CACHE.pop(code)
+            except Exception as why:
+                errors.append(why)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        held = sum(len(code.kept_instructions or []) for code in codes)
+        self.assertEqual(INSTRUCTION_CACHE.get_size(), held)
+        self.assertLessEqual(held, 10)
+
+if __name__ == "__main__":
+    unittest.main()
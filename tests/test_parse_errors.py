@@ -0,0 +1,127 @@
+import random
+import struct
+import unittest
+
+import builders
+from apk_utils.arsc import ResourceTable
+from apk_utils.file import File, AndroidManifest, ParseBudget, ParseError
+
+RESOURCE_IDS = [0x7f020000, 0x7f030001, 0x7f030000, 0x7f010000]
+
+def decode(raw, budget=None):
+    manifest = AndroidManifest(File("AndroidManifest.xml", rawBinary=raw), budget)
+    events = list(manifest.iterEvents())
+    manifest.summarize()
+    return events
+
+def resolve_all(raw, budget=None):
+    table = ResourceTable(File("resources.arsc", rawBinary=raw), budget)
+    return [table.resolve(resId) for resId in RESOURCE_IDS]
+
+def mutations(raw, count, seed):
+    rand = random.Random(seed)
+    for _ in range(count):
+        mutated = bytearray(raw)
+        for _ in range(rand.randint(1, 4)):
+            mutated[rand.randrange(len(mutated))] = rand.randrange(256)
+        if rand.random() < 0.2:
+            mutated = mutated[:rand.randrange(8, len(mutated))]
+        yield bytes(mutated)
+
+class BinaryXmlTest(unittest.TestCase):
+    def assertParseError(self, raw):
+        with self.assertRaises(ParseError):
+            decode(raw, ParseBudget())
+
+    def test_valid_file(self):
+        self.assertTrue(decode(builders.manifest(), ParseBudget()))
+
+    def test_file_too_small(self):
+        self.assertParseError(b"\x03\x00")
+
+    def test_chunk_smaller_than_its_record(self):
+        self.assertParseError(builders.xml_file(struct.pack("<III", 0x001c0001, 12, 0)))
+        self.assertParseError(builders.xml_file(builders.string_pool(["a"]) + struct.pack("<III", 0x00100102, 12, 0)))
+
+    def test_string_count_overflows_the_chunk(self):
+        pool = bytearray(builders.string_pool(["abc"]))
+        struct.pack_into("<I", pool, 8, 50)
+        self.assertParseError(builders.xml_file(bytes(pool)))
+
+    def test_forged_string_offset(self):
+        pool = bytearray(builders.string_pool(["abc", "d"]))
+        struct.pack_into("<I", pool, 28, 0x100000)
+        self.assertParseError(builders.xml_file(bytes(pool) + builders.start_tag(0, []) + builders.end_tag(0)))
+
+    def test_typed_string_out_of_the_pool(self):
+        attr = builders.attribute(-1, 0, -1, builders.TYPE_STRING, 999)
+        self.assertParseError(builders.xml_file(builders.string_pool(["a"]) + builders.start_tag(0, [attr])))
+
+    def test_missing_names(self):
+        pool = builders.string_pool(["a", "b"])
+        nameless_tag = builders.start_tag(-1, []) + builders.end_tag(-1)
+        nameless_attr = builders.start_tag(0, [builders.attribute(-1, -1, 1, builders.TYPE_STRING, 1)]) + builders.end_tag(0)
+        for body in (nameless_tag, nameless_attr, builders.start_tag(5000, [])):
+            self.assertParseError(builders.xml_file(pool + body))
+
+    def test_missing_names_without_budget(self):
+        # the nameless tag and attribute are dropped, their siblings are kept
+        pool = builders.string_pool(["root", "a", "b"])
+        body = builders.start_tag(0, [builders.attribute(-1, -1, 2, builders.TYPE_STRING, 2),
+                                      builders.attribute(-1, 1, 2, builders.TYPE_STRING, 2)])
+        body += builders.start_tag(-1, []) + builders.end_tag(-1) + builders.end_tag(0)
+        events = decode(builders.xml_file(pool + body))
+        self.assertEqual([type(event).__name__ for event in events], ["StartTag", "EndTag"])
+        self.assertEqual([attr.name for attr in events[0].attributes], ["a"])
+
+    def test_too_many_attributes(self):
+        with self.assertRaises(ParseError) as caught:
+            decode(builders.manifest(), ParseBudget(maxAttributes=2))
+        self.assertEqual(caught.exception.limit, 2)
+
+    def test_fuzz_raises_only_parse_errors(self):
+        for raw in mutations(builders.manifest([("activity", "A", True)]), 1500, 20):
+            try:
+                decode(raw, ParseBudget())
+            except ParseError:
+                pass
+
+class ResourceTableTest(unittest.TestCase):
+    def test_valid_file(self):
+        self.assertTrue(all(resolve_all(builders.arsc(), ParseBudget())[:3]))
+
+    def test_compact_entries(self):
+        compact = resolve_all(builders.arsc(compact=True), ParseBudget())
+        self.assertEqual(compact, resolve_all(builders.arsc(), ParseBudget()))
+        self.assertEqual((compact[0].name, compact[0].value), ("app_name", "My App"))
+
+    def test_file_too_small(self):
+        with self.assertRaises(ParseError):
+            resolve_all(b"\x02\x00\x0c\x00", ParseBudget())
+
+    def test_forged_entry_offset(self):
+        raw = bytearray(builders.arsc())
+        # the offset of entry 0 in the first type chunk of type 2
+        chunk = raw.find(struct.pack("<HH", 0x0201, 48))
+        struct.pack_into("<I", raw, chunk + 48, 0x10000)
+        with self.assertRaises(ParseError):
+            resolve_all(bytes(raw), ParseBudget())
+        self.assertIsNone(resolve_all(bytes(raw))[0])
+
+    def test_forged_key_index(self):
+        raw = bytearray(builders.arsc())
+        key = raw.find(struct.pack("<HHI", 16, 1, 2))
+        struct.pack_into("<I", raw, key + 4, 77)
+        with self.assertRaises(ParseError):
+            resolve_all(bytes(raw), ParseBudget())
+        self.assertIsNone(resolve_all(bytes(raw))[2])
+
+    def test_fuzz_raises_only_parse_errors(self):
+        for raw in mutations(builders.arsc(), 1500, 18):
+            try:
+                resolve_all(raw, ParseBudget())
+            except ParseError:
+                pass
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,15 @@
+import unittest
+
+from apk_utils.options import record
+
+class RecordTest(unittest.TestCase):
+    def test_padding_is_skipped(self):
+        Header = record("Header", [("type", "H"), (None, "B"), (None, "I"), ("size", "I")])
+        self.assertEqual(Header._size, 11)
+        self.assertEqual(Header._fields, ("type", "size"))
+
+        header = Header._unpack_from(b"\xff\x01\x00\x00\xaa\xbb\xcc\xdd\x10\x00\x00\x00", 1)
+        self.assertEqual((header.type, header.size), (1, 16))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+import builders
+from apk_utils.file import File, AndroidManifest, decodeValue, formatValue, StringPool, TYPE_STRING
+
+def summarize(raw):
+    return AndroidManifest(File("AndroidManifest.xml", rawBinary=raw)).summarize()
+
+class ManifestSummaryTest(unittest.TestCase):
+    def test_versions_are_ints(self):
+        summary = summarize(builders.manifest(versionCode=42, minSdkVersion=21))
+        self.assertEqual(summary.package, "com.example.app")
+        self.assertEqual(summary.versionName, "1.0")
+        self.assertIs(type(summary.versionCode), int)
+        self.assertEqual(summary.versionCode, 42)
+        self.assertEqual(summary.minSdkVersion, 21)
+        self.assertIsNone(summary.targetSdkVersion)
+
+    def test_versions_given_as_strings(self):
+        summary = summarize(builders.manifest(versionCode="7", minSdkVersion="P"))
+        self.assertEqual(summary.versionCode, 7)
+        self.assertIsNone(summary.minSdkVersion)
+
+    def test_typed_value_wins_over_the_raw_string(self):
+        summary = summarize(builders.manifest(versionCode=(builders.TYPE_INT_DEC, 3, "5")))
+        self.assertEqual(summary.versionCode, 3)
+
+    def test_exported(self):
+        components = [
+            ("activity", "BooleanFalse", False),
+            ("activity", "BooleanTrue", True),
+            ("activity", "StringFalse", "false"),
+            ("activity", "StringTrue", "true"),
+            ("service", "TypedFalseRawTrue", (builders.TYPE_INT_BOOLEAN, 0, "true")),
+            ("receiver", "Reference", (builders.TYPE_REFERENCE, 0x7f050000)),
+            ("provider", "Absent", None),
+        ]
+        summary = summarize(builders.manifest(components))
+        self.assertEqual(summary.exported, [("activity", "BooleanTrue"), ("activity", "StringTrue")])
+
+    def test_exported_by_intent_filter(self):
+        # an unresolved reference counts as absent: an intent-filter exports the component
+        raw = builders.axml(("manifest", [(False, "package", "p")], [("application", [], [
+            ("activity", [(True, "name", "Reference"), (True, "exported", (builders.TYPE_REFERENCE, 0x7f050000))],
+             [("intent-filter", [], [])]),
+            ("activity", [(True, "name", "Closed"), (True, "exported", False)], [("intent-filter", [], [])]),
+            ("activity", [(True, "name", "Implicit")], [("intent-filter", [], [])]),
+        ])]))
+        self.assertEqual(summarize(raw).exported, [("activity", "Reference"), ("activity", "Implicit")])
+
+class TypedStringTest(unittest.TestCase):
+    def test_string_index_out_of_the_pool(self):
+        pool = StringPool(builders.string_pool(["a"]))
+        self.assertEqual(decodeValue(TYPE_STRING, 0, pool), "a")
+        self.assertIsNone(decodeValue(TYPE_STRING, 5, pool))
+        self.assertIsNone(decodeValue(TYPE_STRING, 0))
+        self.assertEqual(formatValue(TYPE_STRING, 5, pool), "")
+
+if __name__ == "__main__":
+    unittest.main()
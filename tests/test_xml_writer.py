@@ -0,0 +1,92 @@
+import io
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from xml.etree import ElementTree
+
+import builders
+from apk_utils.file import File, AndroidManifest, ParseBudget, ParseError, XmlWriter, \
+    StartNamespace, EndNamespace, StartTag, EndTag, Attribute, TYPE_STRING
+
+ANDROID = "{%s}" % builders.ANDROID_URI
+
+TREE = ("manifest", [(True, "versionCode", 3), (False, "package", "com.example.app")], [
+    ("uses-sdk", [(True, "minSdkVersion", 21)], []),
+    ("application", [(True, "label", 'Ünïcode "quoted" <&>\n')], [
+        ("activity", [(True, "name", "A"), (True, "exported", True)], []),
+        ("meta-data", [(True, "name", "B"), (True, "label", (builders.TYPE_REFERENCE, 0x7f010000))], []),
+    ]),
+])
+
+def manifest(raw):
+    return AndroidManifest(File("AndroidManifest.xml", rawBinary=raw))
+
+class XmlWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "AndroidManifest.xml")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_round_trip(self):
+        manifest(builders.axml(TREE, texts={"application": "some text"})).writeXml(self.path)
+        root = ElementTree.parse(self.path).getroot()
+
+        self.assertEqual(root.tag, "manifest")
+        self.assertEqual(root.get("package"), "com.example.app")
+        self.assertEqual(root.get(ANDROID + "versionCode"), "3")
+        self.assertEqual(root[0].get(ANDROID + "minSdkVersion"), "21")
+
+        application = root[1]
+        self.assertEqual(application.get(ANDROID + "label"), 'Ünïcode "quoted" <&>\n')
+        self.assertEqual(application.text.strip(), "some text")
+        self.assertEqual([child.tag for child in application], ["activity", "meta-data"])
+        self.assertEqual(application[0].get(ANDROID + "exported"), "true")
+        self.assertEqual(application[1].get(ANDROID + "label"), "@7f010000")
+
+    def test_analyze_writes_the_same_document(self):
+        raw = builders.axml(TREE, utf8=True)
+        manifest(raw).writeXml(self.path)
+        with open(self.path, encoding="utf-8") as f:
+            written = f.read()
+
+        other = os.path.join(self.dir, "analyzed.xml")
+        manifest(raw).analyze(quiet=True, outFile=other)
+        with open(other, encoding="utf-8") as f:
+            self.assertEqual(f.read(), written)
+
+    def test_undeclared_namespace_gets_a_free_prefix(self):
+        out = io.StringIO()
+        writer = XmlWriter(out)
+        writer.write(StartNamespace(1, "ns1", "urn:a"))
+        writer.write(StartTag(1, None, "root", [
+            Attribute("urn:b", "x", "1", TYPE_STRING, 0, "1"),
+            Attribute("urn:c", "y", "2", TYPE_STRING, 0, "2"),
+            Attribute("urn:a", "z", "3", TYPE_STRING, 0, "3"),
+        ]))
+        writer.write(EndTag(1, None, "root"))
+        writer.write(EndNamespace(1, "ns1", "urn:a"))
+
+        root = ElementTree.fromstring(out.getvalue().encode("utf-8"))
+        self.assertEqual(root.attrib, {"{urn:b}x": "1", "{urn:c}y": "2", "{urn:a}z": "3"})
+
+    def test_failed_parse_leaves_no_file(self):
+        raw = builders.axml(TREE)
+        # a start tag that claims more attributes than it holds
+        tag = raw.find(struct.pack("<I", 0x00100102))
+        truncated = raw[:tag + 28] + struct.pack("<H", 500) + raw[tag + 30:]
+        with self.assertRaises(ParseError):
+            AndroidManifest(File("m", rawBinary=truncated), ParseBudget()).analyze(quiet=True, outFile=self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_unwritable_output_keeps_the_open_error(self):
+        path = os.path.join(self.dir, "missing", "AndroidManifest.xml")
+        with self.assertRaises(FileNotFoundError) as caught:
+            manifest(builders.axml(TREE)).analyze(quiet=True, outFile=path)
+        self.assertEqual(caught.exception.filename, path)
+
+if __name__ == "__main__":
+    unittest.main()